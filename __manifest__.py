@@ -1,18 +1,24 @@
 # -*- coding: utf-8 -*-
 {
     "name": "Point of Sale - Multi Currency",
-    "version": "19.0.1.0.0",
+    "version": "19.0.1.2.0",
     "author": "Odoo Community",
     "website": "https://www.odoo.com",
     "license": "LGPL-3",
     "category": "Point of Sale",
     "depends": ["point_of_sale", "account"],
     "data": [
-        # "security/ir.model.access.csv",
+        "security/ir.model.access.csv",
+        "security/pos_multi_security.xml",
         "views/pos_config_views.xml",
         "views/pos_payment_views.xml",
         "views/pos_order_views.xml",
         "views/pos_session_views.xml",
+        "views/pos_multi_currency_rate_provider_views.xml",
+        "report/pos_multi_currency_payment_report_views.xml",
+        "report/pos_multi_currency_rate_anomaly_views.xml",
+        "wizard/pos_multi_currency_rate_import_views.xml",
+        "data/ir_cron_data.xml",
         # "data/pos_multi_currency_data.xml",
     ],
     "assets": {
@@ -21,6 +27,7 @@
             "pos_multi/static/src/css/multi_currency.css",
             # Utils (no deps – must come first)
             "pos_multi/static/src/js/utils/currency_utils.js",
+            "pos_multi/static/src/js/utils/rate_cache.js",
             # Models
             "pos_multi/static/src/js/models/pos_payment_multi_currency.js",
             "pos_multi/static/src/js/models/pos_config_multi_currency.js",
@@ -31,6 +38,8 @@
             "pos_multi/static/src/js/popups/rate_edit_popup.js",
             "pos_multi/static/src/js/popups/statistics_popup.xml",
             "pos_multi/static/src/js/popups/statistics_popup.js",
+            "pos_multi/static/src/js/popups/closing_popup_multi_currency.xml",
+            "pos_multi/static/src/js/popups/closing_popup_multi_currency.js",
             # Components (XML + JS pairs)
             "pos_multi/static/src/js/components/multi_currency_badge.xml",
             "pos_multi/static/src/js/components/multi_currency_badge.js",
@@ -0,0 +1 @@
+from . import pos_multi_import_rates
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+``odoo-bin pos_multi_import_rates -d <db> --rate-file rates.csv [...]``
+
+Bulk-load exchange rate files with the same importer as the wizard
+(``res.currency.rate._pos_multi_bulk_import``), in one transaction.
+"""
+import logging
+import optparse
+import sys
+from pathlib import Path
+
+from odoo import SUPERUSER_ID, api
+from odoo.cli import Command
+from odoo.modules.registry import Registry
+from odoo.tools import config
+
+from ..tools import rate_import
+
+_logger = logging.getLogger(__name__)
+
+
+class PosMultiImportRates(Command):
+    """Bulk import exchange rates from CSV/JSON files"""
+    name = "pos_multi_import_rates"
+
+    def run(self, args):
+        parser = config.parser
+        parser.prog = f"{Path(sys.argv[0]).name} {self.name}"
+        group = optparse.OptionGroup(parser, "Exchange rate import")
+        group.add_option(
+            "--rate-file", dest="rate_files", action="append", default=[],
+            help="CSV or JSON rate file, may be repeated",
+        )
+        group.add_option(
+            "--rate-company", dest="rate_company_id", type="int",
+            help="Company id of the rates without company_id (default: shared rates)",
+        )
+        parser.add_option_group(group)
+        opt = config.parse_config(args, setup_logging=True)
+        dbname = config["db_name"]
+        if isinstance(dbname, (list, tuple)):
+            dbname = dbname[0] if dbname else None
+        if not dbname or not opt.rate_files:
+            parser.print_help()
+            sys.exit(1)
+
+        with Registry(dbname).cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            company = env["res.company"].browse(opt.rate_company_id or [])
+            for path in opt.rate_files:
+                path = Path(path)
+                try:
+                    rows = rate_import.iter_rate_rows(
+                        path.read_bytes(), rate_import.guess_format(path.name)
+                    )
+                    result = env["res.currency.rate"]._pos_multi_bulk_import(
+                        rows, company=company
+                    )
+                except (OSError, ValueError) as e:
+                    cr.rollback()
+                    sys.exit(f"{path}: {e}")
+                _logger.info(
+                    "%s: %d rates read, %d created, %d updated, %d unchanged%s",
+                    path, result["rows"], result["inserted"], result["updated"],
+                    result["unchanged"],
+                    ", skipped unknown currencies %s" % ", ".join(result["unknown_currencies"])
+                    if result["unknown_currencies"] else "",
+                )
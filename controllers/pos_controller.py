@@ -1,7 +1,17 @@
 # -*- coding: utf-8 -*-
-from odoo import http
-from odoo.http import request
+from odoo import http, api
+from odoo.http import request, content_disposition
+from odoo.modules.registry import Registry
+import csv
+import io
 import json
+import tempfile
+
+import xlsxwriter
+
+from ..tools import instrumentation, replica
+
+EXPORT_CHUNK_SIZE = 5000
 
 
 class PosMultiCurrencyController(http.Controller):
@@ -14,71 +24,197 @@ class PosMultiCurrencyController(http.Controller):
     )
     def get_rates(self, **kwargs):
         """
-        Return latest exchange rates for all active currencies relative to
-        the company currency.  Called once when POS session opens and can be
-        polled periodically.
+        Return latest exchange rates of a POS config's currencies relative
+        to its company currency.  Open sessions receive rate changes over
+        the bus, so this is only needed to (re)synchronise: pass back
+        ``since_version``, ``since_date`` and ``currency_ids`` from the
+        previous answer to receive only the rates that changed (or
+        ``unchanged: true``).
 
         Returns:
-            {currency_id: rate_to_company_currency, ...}
+            {"rates": {currency_id: rate_to_company_currency, ...},
+             "base_currency_id": int, "version": int, "date": str,
+             "unchanged": bool, "partial": bool}
         """
-        company = request.company
-        base_currency = company.currency_id
-        # Fetch all active currencies
-        currencies = request.env["res.currency"].search([("active", "=", True)])
-        rates = {}
-        for cur in currencies:
-            if cur.id == base_currency.id:
-                rates[cur.id] = 1.0
-            else:
-                # Use Odoo's built-in rate: rate means 1 unit of company currency = rate units of cur
-                # We want: 1 unit of base_currency -> how many units of cur
-                # That is exactly what Odoo stores as cur.rate
-                rates[cur.id] = cur.rate or 1.0
-        return {"rates": rates, "base_currency_id": base_currency.id}
+        config_id = kwargs.get("config_id")
+        if not config_id:
+            return {"error": "config_id is required"}
+
+        config = request.env["pos.config"].browse(config_id)
+        if not config.exists():
+            return {"error": "Config not found"}
+
+        return config.get_multi_currency_rates(
+            since_version=kwargs.get("since_version"),
+            since_date=kwargs.get("since_date"),
+            currency_ids=kwargs.get("currency_ids"),
+        )
 
     @http.route(
         "/pos/multi_currency/statistics",
         type="json",
         auth="user",
         methods=["POST"],
+        readonly=True,
     )
     def get_statistics(self, **kwargs):
         """
         Return multi-currency payment statistics for the current session.
         Groups payments by currency and aggregates amounts.
+
+        Besides ``session_id``, accepts ``session_ids``, ``config_ids``,
+        ``date_from`` and ``date_to`` to aggregate across many sessions.
+        Served by the database replica when fresh enough (see
+        ``tools.replica``).
         """
         session_id = kwargs.get("session_id")
-        if not session_id:
+        session_ids = kwargs.get("session_ids") or []
+        config_ids = kwargs.get("config_ids") or []
+        date_from = kwargs.get("date_from")
+        date_to = kwargs.get("date_to")
+        if not (session_id or session_ids or config_ids or date_from or date_to):
             return {"error": "session_id is required"}
 
-        env = request.env
-        # Ensure user has access
-        session = env["pos.session"].browse(session_id)
-        if not session.exists():
-            return {"error": "Session not found"}
-
-        payments = env["pos.payment"].search([
-            ("session_id", "=", session_id),
-            ("payment_currency_id", "!=", False),
-        ])
-
-        stats = {}
-        for p in payments:
-            cid = p.payment_currency_id.id
-            cname = p.payment_currency_id.name
-            if cid not in stats:
-                stats[cid] = {
-                    "currency_id": cid,
-                    "currency_name": cname,
-                    "total_amount": 0.0,
-                    "total_base_amount": 0.0,
-                    "transaction_count": 0,
-                    "manually_edited_count": 0,
-                }
-            stats[cid]["total_amount"] += p.payment_currency_amount
-            stats[cid]["total_base_amount"] += p.amount  # amount in order currency
-            stats[cid]["transaction_count"] += 1
-            if p.rate_manually_edited:
-                stats[cid]["manually_edited_count"] += 1
-
-        return {"statistics": list(stats.values()), "session_id": session_id}
+        if session_id:
+            session_ids = list(session_ids) + [session_id]
+
+        with replica.reporting_env(request.env, session_ids=session_ids, date_to=date_to) as env:
+            # Ensure user has access
+            if session_id and not env["pos.session"].browse(session_id).exists():
+                return {"error": "Session not found"}
+            statistics = env["pos.payment"]._get_multi_currency_statistics(
+                session_ids=session_ids,
+                config_ids=config_ids,
+                date_from=date_from,
+                date_to=date_to,
+            )
+        return {"statistics": statistics, "session_id": session_id}
+
+    # ─── Instrumentation ────────────────────────────────────────────
+
+    @http.route(
+        "/pos/multi_currency/metrics",
+        type="json",
+        auth="user",
+        methods=["POST"],
+    )
+    def get_metrics(self, config_ids=None, reset=False, **kwargs):
+        """
+        Return the hot-path metrics (call count, SQL query count, latency
+        histogram per POS config) collected by the worker serving the
+        request.  Pass ``reset: true`` to clear them after reading.
+        Restricted to POS managers.
+
+        Metrics are kept per process: with several workers, each request
+        is answered (and reset) by whichever worker serves it, identified
+        by ``worker_pid`` in the response.  Aggregate across workers by
+        polling until every pid has been seen.
+        """
+        if not request.env.user.has_group("point_of_sale.group_pos_manager"):
+            return {"error": "Access denied"}
+        result = instrumentation.get_metrics(
+            request.db, config_ids=config_ids, reset=bool(reset)
+        )
+        result["sample_rate"] = instrumentation.get_sample_rate(request.env)
+        return result
+
+    # ─── Streaming export ───────────────────────────────────────────
+
+    @http.route(
+        "/pos/multi_currency/export",
+        type="http",
+        auth="user",
+        methods=["GET"],
+        readonly=True,
+    )
+    def export_payments(self, format="csv", config_ids=None, session_ids=None,
+                        currency_ids=None, date_from=None, date_to=None,
+                        manual_only=None, **kwargs):
+        """
+        Stream foreign currency payments as CSV or XLSX.
+
+        Rows are fetched in keyset-paginated chunks on a dedicated cursor
+        while the response is being sent, so memory stays constant for
+        large date ranges.  Id filters are comma-separated lists.
+        Read from the database replica when fresh enough (see
+        ``tools.replica``).  Restricted to POS managers.
+        """
+        if not request.env.user.has_group("point_of_sale.group_pos_manager"):
+            return request.not_found()
+        if format not in ("csv", "xlsx"):
+            return request.not_found()
+
+        def parse_ids(value):
+            return [int(v) for v in value.split(",") if v.strip()] if value else None
+
+        filters = {
+            "config_ids": parse_ids(config_ids),
+            "session_ids": parse_ids(session_ids),
+            "currency_ids": parse_ids(currency_ids),
+            "date_from": date_from or None,
+            "date_to": date_to or None,
+            "manual_only": manual_only in ("1", "true", "True"),
+        }
+        # The request cursor is closed before the body is streamed, so the
+        # generator works on its own (single snapshot) cursor.
+        db, uid, context = request.db, request.env.uid, dict(request.env.context)
+
+        def iter_chunks():
+            with Registry(db).cursor(readonly=True) as cr:
+                env = api.Environment(cr, uid, context)
+                with replica.reporting_env(
+                    env, session_ids=filters["session_ids"], date_to=filters["date_to"]
+                ) as env:
+                    Payment = env["pos.payment"]
+                    yield Payment._get_multi_currency_export_header()
+                    yield from Payment._iter_multi_currency_export_rows(
+                        chunk_size=EXPORT_CHUNK_SIZE, **filters
+                    )
+
+        if format == "csv":
+            body = self._stream_csv(iter_chunks())
+            content_type = "text/csv;charset=utf-8"
+        else:
+            body = self._stream_xlsx(iter_chunks())
+            content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+        return http.Response(
+            body,
+            headers=[
+                ("Content-Type", content_type),
+                ("Content-Disposition", content_disposition(f"multi_currency_payments.{format}")),
+            ],
+            direct_passthrough=True,
+        )
+
+    def _stream_csv(self, chunks):
+        header = next(chunks)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode("utf-8")
+
+    def _stream_xlsx(self, chunks):
+        # XLSX is a zip archive: it is written row by row to a temporary
+        # file (constant_memory flushes each row) and streamed afterwards.
+        with tempfile.TemporaryFile() as tmp:
+            workbook = xlsxwriter.Workbook(tmp, {
+                "constant_memory": True,
+                "default_date_format": "yyyy-mm-dd hh:mm:ss",
+            })
+            sheet = workbook.add_worksheet("Payments")
+            sheet.write_row(0, 0, next(chunks))
+            row_index = 1
+            for rows in chunks:
+                for row in rows:
+                    sheet.write_row(row_index, 0, row)
+                    row_index += 1
+            workbook.close()
+            tmp.seek(0)
+            while block := tmp.read(64 * 1024):
+                yield block
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""Backfill the session currency ledger from existing payments."""
+from odoo import api, SUPERUSER_ID
+
+BATCH_SIZE = 1000
+
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    Payment = env["pos.payment"]
+    payment_ids = Payment.search([("payment_currency_id", "!=", False)]).ids
+    for start in range(0, len(payment_ids), BATCH_SIZE):
+        payments = Payment.browse(payment_ids[start:start + BATCH_SIZE])
+        Payment._post_multi_currency_ledger_entries(
+            payments._prepare_multi_currency_ledger_vals()
+        )
+        env.invalidate_all()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Convert pos_order.foreign_currency_details JSON into pos.order.currency.summary rows."""
+from odoo.tools.sql import column_exists
+
+
+def migrate(cr, version):
+    if not column_exists(cr, "pos_order", "foreign_currency_details"):
+        return
+
+    cr.execute(
+        """
+        INSERT INTO pos_order_currency_summary (
+            order_id, session_id, currency_id,
+            total_foreign_amount, total_base_amount, payment_count,
+            min_rate, max_rate, average_rate, manual_edits,
+            create_uid, create_date, write_uid, write_date
+        )
+        SELECT o.id,
+               o.session_id,
+               c.id,
+               COALESCE((d.value->>'total_foreign_amount')::float8, 0.0),
+               COALESCE((d.value->>'total_base_amount')::float8, 0.0),
+               COALESCE((d.value->>'payment_count')::int, 0),
+               COALESCE(rates.min_rate, 0.0),
+               COALESCE(rates.max_rate, 0.0),
+               COALESCE((d.value->>'average_rate')::float8, 0.0),
+               COALESCE((d.value->>'manual_edits')::int, 0),
+               1, NOW() AT TIME ZONE 'UTC', 1, NOW() AT TIME ZONE 'UTC'
+          FROM pos_order o
+          CROSS JOIN LATERAL jsonb_each(o.foreign_currency_details::jsonb) d
+          JOIN res_currency c ON c.id::text = d.key
+          CROSS JOIN LATERAL (
+              SELECT MIN((r->>'rate')::float8) AS min_rate,
+                     MAX((r->>'rate')::float8) AS max_rate
+                FROM jsonb_array_elements(
+                         COALESCE(d.value->'rates_used', '[]'::jsonb)
+                     ) r
+          ) rates
+         WHERE jsonb_typeof(o.foreign_currency_details::jsonb) = 'object'
+        ON CONFLICT (order_id, currency_id) DO NOTHING
+        """
+    )
+    cr.execute("ALTER TABLE pos_order DROP COLUMN foreign_currency_details")
@@ -3,4 +3,10 @@ from . import pos_payment
 from . import pos_payment_method
 from . import res_currency
 from . import pos_order
+from . import pos_order_currency_summary
+from . import pos_order_line
 from . import pos_session
+from . import pos_session_currency_cash
+from . import pos_session_currency_ledger
+from . import pos_multi_currency_rate_provider
+from . import ir_config_parameter
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api, tools
+
+from ..tools import instrumentation
+
+
+class IrConfigParameter(models.Model):
+    _inherit = "ir.config_parameter"
+
+    @api.model
+    @tools.ormcache()
+    def _get_pos_multi_sample_rate(self):
+        """
+        Sample rate of the pos_multi instrumentation, read on every call of
+        an instrumented method.  Cached until a parameter changes (writing
+        parameters clears the cache).
+        """
+        return instrumentation.parse_sample_rate(
+            self.sudo().get_param(instrumentation.PARAM_SAMPLE_RATE)
+        )
@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
+import time
+
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
 
+from ..tools import replica
+from ..tools.instrumentation import instrumented
+
 
 class PosConfig(models.Model):
     _inherit = "pos.config"
@@ -36,6 +41,38 @@ class PosConfig(models.Model):
         help="If set, all amounts on receipts will be displayed in this currency, "
             "regardless of the order's base currency.",
     )
+    multi_currency_rate_tolerance = fields.Float(
+        string="Rate Tolerance (%)",
+        default=50.0,
+        help="Maximum deviation between the exchange rate used in the POS and the "
+             "market rate at the payment date, checked when orders are synced.",
+    )
+    multi_currency_rate_policy = fields.Selection(
+        [("flag", "Flag the payment"), ("reject", "Reject the order")],
+        string="Rate Deviation Policy",
+        default="flag",
+        required=True,
+        help="What to do with synced payments whose rate or amount is outside the tolerance.",
+    )
+    multi_currency_rate_ttl = fields.Integer(
+        string="Rate Staleness (minutes)",
+        default=60,
+        help="Exchange rates not confirmed by the server for longer than this are "
+             "flagged as stale on the terminal. 0 disables the warning.",
+    )
+    multi_currency_data_version = fields.Integer(
+        readonly=True,
+        copy=False,
+        default=0,
+        help="Technical: drawn from a sequence whenever the cached multi-currency "
+             "POS data of this config changes. Part of the cache key.",
+    )
+
+    def init(self):
+        super().init()
+        self.env.cr.execute(
+            "CREATE SEQUENCE IF NOT EXISTS pos_multi_config_data_version_seq"
+        )
 
     # ─── Validation ──────────────────────────────────────────────────
 
@@ -63,6 +100,18 @@ class PosConfig(models.Model):
                     "when multi currency is enabled."
                 )
 
+    @api.constrains("multi_currency_rate_ttl")
+    def _check_multi_currency_rate_ttl(self):
+        for rec in self:
+            if rec.multi_currency_rate_ttl < 0:
+                raise ValidationError("The rate staleness delay cannot be negative.")
+
+    @api.constrains("multi_currency_rate_tolerance")
+    def _check_multi_currency_rate_tolerance(self):
+        for rec in self:
+            if rec.multi_currency_rate_tolerance < 0:
+                raise ValidationError("The rate tolerance cannot be negative.")
+
     # ─── Load currencies into POS ────────────────────────────────────
 
     def _get_pos_base_models_to_load(self):
@@ -109,6 +158,10 @@ class PosConfig(models.Model):
     def _load_pos_data_read(self, records, config):
         """
         Override to add multi-currency configuration to POS config data.
+
+        The whole multi-currency block (permissions, currencies and the
+        rate snapshot) is shipped here so the POS starts without any
+        extra RPC.
         """
         read_records = super()._load_pos_data_read(records, config)
         
@@ -116,176 +169,301 @@ class PosConfig(models.Model):
             return read_records
         
         record = read_records[0]
+        data = config._get_multi_currency_pos_data()
         
         # Add multi-currency config
-        record['multi_currency_enabled'] = config.multi_currency_enabled
-        record['multi_currency_allow_rate_edit'] = config.multi_currency_allow_rate_edit
-        record['multi_currency_ids'] = config.multi_currency_ids.mapped('id') if config.multi_currency_enabled else []
+        record['multi_currency_enabled'] = data['enabled']
+        record['multi_currency_allow_rate_edit'] = data['allow_rate_edit']
+        record['multi_currency_ids'] = config.multi_currency_ids.ids if data['enabled'] else []
         
-        # ADD THIS: Receipt currency configuration
-        if config.multi_currency_receipt_currency_id:
-            record['multi_currency_receipt_currency_id'] = config.multi_currency_receipt_currency_id.id
-            record['multi_currency_receipt_currency_name'] = config.multi_currency_receipt_currency_id.name
-            record['multi_currency_receipt_currency_symbol'] = config.multi_currency_receipt_currency_id.symbol
-            record['multi_currency_receipt_currency_rounding'] = config.multi_currency_receipt_currency_id.rounding
+        # Receipt currency configuration
+        receipt_currency = data['receipt_currency']
+        if receipt_currency:
+            record['multi_currency_receipt_currency_id'] = receipt_currency['id']
+            record['multi_currency_receipt_currency_name'] = receipt_currency['name']
+            record['multi_currency_receipt_currency_symbol'] = receipt_currency['symbol']
+            record['multi_currency_receipt_currency_rounding'] = receipt_currency['rounding']
         else:
             record['multi_currency_receipt_currency_id'] = False
         
-        # Permission check
-        can_edit = False
-        if config.multi_currency_allow_rate_edit and config.multi_currency_rate_edit_group_id:
-            can_edit = self.env.user.has_group(
-                config.multi_currency_rate_edit_group_id.full_name
-            )
-        record['multi_currency_can_edit_rate'] = can_edit
+        record['multi_currency_can_edit_rate'] = data['can_edit_rate']
+        record['multi_currency_data'] = data
         
         return read_records
 
-    # ─── RPC methods called by the POS frontend ──────────────────────
-    
-    def get_multi_currency_config(self):
+    # ─── Multi-currency POS data ─────────────────────────────────────
+
+    # Fields whose change alters the cached per-(config, user) data
+    _MULTI_CURRENCY_POS_DATA_FIELDS = {
+        "multi_currency_enabled",
+        "multi_currency_ids",
+        "multi_currency_allow_rate_edit",
+        "multi_currency_rate_edit_group_id",
+        "multi_currency_receipt_currency_id",
+        "multi_currency_rate_ttl",
+        "multi_currency_rate_tolerance",
+        "journal_id",
+        "company_id",
+    }
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self._MULTI_CURRENCY_POS_DATA_FIELDS.intersection(vals):
+            self._bump_multi_currency_data_version()
+        return res
+
+    def _bump_multi_currency_data_version(self):
         """
-        Return multi-currency configuration and available currencies for this POS.
-        Called by the POS frontend on initialization.
-        
+        Invalidate the cached multi-currency POS data of these configs.
+
+        Only this cache is affected: the version is part of its key, where
+        clearing the registry cache would drop every ormcache of every
+        worker.  Versions come from a sequence, so a rolled back version is
+        never reused for other data.
+        """
+        if not self:
+            return
+        self.env.cr.execute(
+            """
+            UPDATE pos_config
+               SET multi_currency_data_version = nextval('pos_multi_config_data_version_seq')
+             WHERE id = ANY(%s)
+            """,
+            [self.ids],
+        )
+        self.invalidate_recordset(["multi_currency_data_version"])
+
+    def _multi_currency_can_edit_rate(self):
+        """
+        Whether the current user may edit exchange rates in this POS:
+        rate editing must be allowed and the user must be a POS manager
+        or a member of the configured rate edit group.
+        """
+        self.ensure_one()
+        if not self.multi_currency_allow_rate_edit:
+            return False
+        user = self.env.user
+        if user.has_group("point_of_sale.group_pos_manager"):
+            return True
+        group = self.multi_currency_rate_edit_group_id
+        return bool(group) and group in user.all_group_ids
+
+    @api.model
+    def _serialize_multi_currency(self, currency):
+        return {
+            "id": currency.id,
+            "name": currency.name,
+            "symbol": currency.symbol,
+            "rounding": currency.rounding,
+            "decimal_places": currency.decimal_places,
+            "position": currency.position,
+        }
+
+    @api.model
+    @tools.ormcache("config_id", "data_version", "self.env.uid")
+    def _get_multi_currency_pos_data_cached(self, config_id, data_version):
+        config = self.browse(config_id)
+        base_currency = config.currency_id
+        if config.multi_currency_enabled and config.multi_currency_ids:
+            currencies = config.multi_currency_ids | base_currency
+        else:
+            currencies = base_currency
+        receipt_currency = config.multi_currency_receipt_currency_id
+        return {
+            "enabled": config.multi_currency_enabled,
+            "allow_rate_edit": config.multi_currency_allow_rate_edit,
+            "can_edit_rate": config._multi_currency_can_edit_rate(),
+            "rate_ttl": config.multi_currency_rate_ttl,
+            "rate_tolerance": config.multi_currency_rate_tolerance / 100.0,
+            "base_currency": base_currency and self._serialize_multi_currency(base_currency),
+            "receipt_currency": receipt_currency and self._serialize_multi_currency(receipt_currency),
+            "currencies": [self._serialize_multi_currency(currency) for currency in currencies],
+        }
+
+    def _get_multi_currency_pos_data(self):
+        """
+        Return the multi-currency block of this POS for the current user.
+
+        The serialized configuration is cached per (config, user) and only
+        rebuilt when the config, its currencies or the user's groups change;
+        rates come from the (separately cached) rate snapshot.
+
         Returns:
             dict: {
                 "enabled": bool,
                 "allow_rate_edit": bool,
                 "can_edit_rate": bool,
-                "base_currency": {id, name, symbol, ...},
-                "currencies": [{id, name, symbol, rate, ...}]
+                "rate_ttl": int,  # minutes, 0 = never stale
+                "rate_tolerance": float,  # max. relative deviation from market
+                "base_currency": {id, name, symbol, rate, ...} or None,
+                "receipt_currency": {id, name, symbol, rate, ...} or None,
+                "currencies": [{id, name, symbol, rate, ...}],
+                "rates": get_multi_currency_rates() result,
             }
         """
         self.ensure_one()
-        
-        result = {
-            "enabled": self.multi_currency_enabled,
-            "allow_rate_edit": self.multi_currency_allow_rate_edit,
-            "can_edit_rate": False,
-            "base_currency": None,
-            "currencies": [],
-            "receipt_currency": None,
-        }
-        
-        # Check if user can edit rates
-        if self.multi_currency_allow_rate_edit:
-            # Check if user is POS Manager/Administrator
-            is_pos_manager = self.env.user.has_group('point_of_sale.group_pos_manager')
-            
-            # Check if user is in the specific rate edit group (if configured)
-            has_rate_group = False
-            if self.multi_currency_rate_edit_group_id:
-                has_rate_group = self.env.user.has_group(
-                    self.multi_currency_rate_edit_group_id.full_name
-                )
-            
-        # User can edit if they're a POS manager OR in the specific group
-        result["can_edit_rate"] = is_pos_manager or has_rate_group
-        
-        # Get base currency
-        base_currency = self.currency_id
-        if base_currency:
-            result["base_currency"] = {
-                "id": base_currency.id,
-                "name": base_currency.name,
-                "symbol": base_currency.symbol,
-                "rounding": base_currency.rounding,
-                "rate": base_currency.rate,
-                "decimal_places": base_currency.decimal_places,
-                "position": base_currency.position,
-            }
-            
-        # Get receipt currency config
-        if self.multi_currency_receipt_currency_id:
-            result["receipt_currency"] = {
-            "id": self.multi_currency_receipt_currency_id.id,
-            "name": self.multi_currency_receipt_currency_id.name,
-            "symbol": self.multi_currency_receipt_currency_id.symbol,
-            "rounding": self.multi_currency_receipt_currency_id.rounding,
-            "rate": self.multi_currency_receipt_currency_id.rate,
-            "decimal_places": self.multi_currency_receipt_currency_id.decimal_places,
-            "position": self.multi_currency_receipt_currency_id.position,
+        data = self._get_multi_currency_pos_data_cached(self.id, self.multi_currency_data_version)
+        snapshot = self.get_multi_currency_rates()
+
+        def with_rate(currency):
+            if not currency:
+                return None
+            return {**currency, "rate": snapshot["rates"].get(currency["id"], 1.0)}
+
+        return {
+            **data,
+            "base_currency": with_rate(data["base_currency"]),
+            "receipt_currency": with_rate(data["receipt_currency"]),
+            "currencies": [with_rate(currency) for currency in data["currencies"]],
+            "rates": snapshot,
         }
 
+    # ─── RPC methods called by the POS frontend ──────────────────────
+    
+    @instrumented("pos.config.get_multi_currency_config")
+    def get_multi_currency_config(self):
+        """
+        Return multi-currency configuration and available currencies for this POS.
+        The same data is already part of the POS session load; this is kept
+        for clients that need to reload it.
         
-        # Get all configured currencies
-        if self.multi_currency_enabled and self.multi_currency_ids:
-            currency_ids = self.multi_currency_ids | base_currency
-            for currency in currency_ids:
-                result["currencies"].append({
-                    "id": currency.id,
-                    "name": currency.name,
-                    "symbol": currency.symbol,
-                    "rounding": currency.rounding,
-                    "rate": currency.rate,
-                    "decimal_places": currency.decimal_places,
-                    "position": currency.position,
-                })
-        elif base_currency:
-            # Only base currency
-            result["currencies"].append(result["base_currency"])
-        
-        return result
+        Returns:
+            dict: see ``_get_multi_currency_pos_data``
+        """
+        self.ensure_one()
+        return self._get_multi_currency_pos_data()
 
-    def get_multi_currency_rates(self):
+    def _get_multi_currency_rate_currencies(self):
+        """Currencies whose rates this POS needs: its allowed set plus base currencies."""
+        self.ensure_one()
+        currencies = self.currency_id | self.company_id.currency_id
+        if self.multi_currency_enabled:
+            currencies |= self.multi_currency_ids
+        if self.multi_currency_receipt_currency_id:
+            currencies |= self.multi_currency_receipt_currency_id
+        return currencies
+
+    @instrumented("pos.config.get_multi_currency_rates")
+    def get_multi_currency_rates(self, since_version=None, since_date=None, currency_ids=None):
         """
-        Return live exchange rates for all active currencies relative to
-        the company currency.  Called once on session open; can be polled.
+        Return exchange rates for this POS relative to its company currency.
+        Called once on session open; later changes are pushed over the bus
+        (see ``_notify_multi_currency_rate_change``).
+
+        Rates come from a cached, versioned snapshot of the config's
+        currency set.  Terminals send back the ``version`` and ``date`` they
+        already hold (and the currency ids they know) to get either an
+        "unchanged" answer or only the currencies whose rates changed.
+
+        Args:
+            since_version (int): Snapshot version held by the caller.
+            since_date (str): Snapshot date held by the caller.
+            currency_ids (list): Currency IDs the caller already has rates for.
 
         Returns:
-            dict: {"rates": {currency_id: rate}, "base_currency_id": int}
+            dict: {"rates": {currency_id: rate}, "base_currency_id": int,
+                   "version": int, "date": str, "fetched_at": float,
+                   "unchanged": bool, "partial": bool}
                   rate means: 1 unit of company currency = rate units of currency.
         """
-        base = self.env.company.currency_id
-        currencies = self.env["res.currency"].search([("active", "=", True)])
-        rates = {}
-        for cur in currencies:
-            rates[cur.id] = 1.0 if cur.id == base.id else (cur.rate or 1.0)
-        return {"rates": rates, "base_currency_id": base.id}
-
-    def get_multi_currency_statistics(self, session_id):
+        self.ensure_one()
+        snapshot = self.env["res.currency"]._get_pos_rate_snapshot(
+            self.company_id, self._get_multi_currency_rate_currencies()
+        )
+        result = {
+            "rates": snapshot["rates"],
+            "base_currency_id": snapshot["base_currency_id"],
+            "version": snapshot["version"],
+            "date": snapshot["date"],
+            # Server time of the answer (epoch seconds), lets terminals
+            # tell how old a snapshot stored with the session data is
+            "fetched_at": time.time(),
+            "unchanged": False,
+            "partial": False,
+        }
+        # A new day or a changed currency set may change effective rates
+        # without any version bump: only answer incrementally when neither
+        # happened.
+        known_currency_ids = set(currency_ids or [])
+        if (
+            since_version is None
+            or since_date != snapshot["date"]
+            or not set(snapshot["rates"]) <= known_currency_ids
+        ):
+            return result
+
+        if since_version >= snapshot["version"]:
+            result.update(rates={}, unchanged=True)
+            return result
+
+        result.update(
+            rates={
+                currency_id: rate
+                for currency_id, rate in snapshot["rates"].items()
+                if snapshot["versions"][currency_id] > since_version
+            },
+            partial=True,
+        )
+        return result
+
+    @api.model
+    def _notify_multi_currency_rate_change(self, currencies):
         """
-        Return per-currency payment statistics for the given session.
+        Send the new rate snapshot over the bus to every open session
+        whose POS uses one of ``currencies``.
+        """
+        if not currencies:
+            return
+        sessions = self.env["pos.session"].sudo().search([
+            ("state", "!=", "closed"),
+            ("config_id.multi_currency_enabled", "=", True),
+        ])
+        for config in sessions.config_id:
+            if not config._get_multi_currency_rate_currencies() & currencies:
+                continue
+            # The config's currency set is small: a full snapshot is compact
+            # and lets terminals that missed a notification catch up.
+            config._notify("MULTI_CURRENCY_RATES", config.get_multi_currency_rates())
+
+    @api.readonly
+    @instrumented("pos.config.get_multi_currency_statistics")
+    def get_multi_currency_statistics(self, session_id=None, session_ids=None,
+                                      config_ids=None, date_from=None, date_to=None):
+        """
+        Return per-currency payment statistics.
+
+        The popup passes a single ``session_id``; HQ reporting can pass
+        several sessions, configs and/or a payment date range instead and
+        get the totals across all of them in one call.
+
+        Read-only: served by the database replica when one is configured,
+        unless it is too stale for the requested sessions (see
+        ``tools.replica``).
 
         Args:
             session_id (int): The pos.session ID.
+            session_ids (list): Additional pos.session IDs.
+            config_ids (list): pos.config IDs whose sessions are included.
+            date_from (str): Lower payment_date bound (inclusive).
+            date_to (str): Upper payment_date bound (inclusive).
 
         Returns:
             dict: {"statistics": [...], "session_id": int}
         """
-        if not session_id:
-            return {"statistics": [], "session_id": False}
-
-        session = self.env["pos.session"].browse(session_id)
-        if not session.exists():
-            return {"statistics": [], "session_id": session_id}
+        session_ids = list(session_ids or [])
+        if session_id:
+            session_ids.append(session_id)
 
-        payments = self.env["pos.payment"].search(
-            [
-                ("session_id", "=", session_id),
-                ("payment_currency_id", "!=", False),
-            ]
-        )
+        if not (session_ids or config_ids or date_from or date_to):
+            return {"statistics": [], "session_id": False}
 
-        # Aggregate
-        stats = {}  # keyed by currency id
-        for p in payments:
-            cid = p.payment_currency_id.id
-            if cid not in stats:
-                stats[cid] = {
-                    "currency_id": cid,
-                    "currency_name": p.payment_currency_id.name,
-                    "total_amount": 0.0,
-                    "total_base_amount": 0.0,
-                    "transaction_count": 0,
-                    "manually_edited_count": 0,
-                }
-            stats[cid]["total_amount"] += p.payment_currency_amount
-            stats[cid]["total_base_amount"] += p.amount
-            stats[cid]["transaction_count"] += 1
-            if p.rate_manually_edited:
-                stats[cid]["manually_edited_count"] += 1
-
-        return {"statistics": list(stats.values()), "session_id": session_id}
-    
\ No newline at end of file
+        with replica.reporting_env(self.env, session_ids=session_ids, date_to=date_to) as env:
+            if session_id and not env["pos.session"].browse(session_id).exists():
+                return {"statistics": [], "session_id": session_id}
+            statistics = env["pos.payment"]._get_multi_currency_statistics(
+                session_ids=session_ids,
+                config_ids=config_ids,
+                date_from=date_from,
+                date_to=date_to,
+            )
+        return {"statistics": statistics, "session_id": session_id or False}
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from lxml import etree
+
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+_logger = logging.getLogger(__name__)
+
+ECB_NAMESPACE = {"ecb": "http://www.ecb.int/vocabulary/2002-08-01/eurofxref"}
+
+
+class PosMultiCurrencyRateProvider(models.Model):
+    """
+    External source of exchange rates, fetched on schedule.
+
+    Each provider type is implemented by an adapter method
+    ``_fetch_rates_<provider_type>(params)``; other modules add types with
+    ``selection_add`` and their own adapter.  Adapters run in worker
+    threads, concurrently and each with its own timeout: they only get
+    the plain ``params`` dict (see ``_get_fetch_params``) and must not
+    touch the ORM.  They return ``(base_code, date, {code: rate})`` where
+    rate is units of the currency for one unit of ``base_code``.
+    """
+    _name = "pos.multi.currency.rate.provider"
+    _description = "POS Multi-Currency Rate Provider"
+    _order = "company_id, sequence, id"
+
+    name = fields.Char(string="Name", required=True)
+    active = fields.Boolean(default=True)
+    sequence = fields.Integer(
+        string="Priority",
+        default=10,
+        help="Rates of the first provider (lowest number) win; later providers "
+             "are used for the currencies it could not give.",
+    )
+    provider_type = fields.Selection(
+        [("json", "JSON endpoint"), ("ecb", "European Central Bank")],
+        string="Type",
+        required=True,
+        default="json",
+    )
+    url = fields.Char(
+        string="URL",
+        help="JSON: endpoint answering {\"base\": \"USD\", \"date\": \"YYYY-MM-DD\", "
+             "\"rates\": {\"EUR\": 0.92, ...}}. ECB: daily reference rates XML feed.",
+    )
+    timeout = fields.Float(
+        string="Timeout (s)",
+        default=10.0,
+        help="A provider slower than this is skipped for the current fetch.",
+    )
+    company_id = fields.Many2one(
+        "res.company",
+        string="Company",
+        required=True,
+        default=lambda self: self.env.company,
+    )
+    currency_ids = fields.Many2many(
+        "res.currency",
+        string="Currencies",
+        help="Currencies taken from this provider. Leave empty for all active currencies.",
+    )
+    last_fetch_date = fields.Datetime(string="Last Fetch", readonly=True)
+    last_status = fields.Selection(
+        [("ok", "OK"), ("error", "Error"), ("timeout", "Timeout")],
+        string="Last Status",
+        readonly=True,
+    )
+    last_message = fields.Char(string="Last Message", readonly=True)
+
+    @api.constrains("timeout")
+    def _check_timeout(self):
+        for provider in self:
+            if provider.timeout <= 0:
+                raise ValidationError("The provider timeout must be positive.")
+
+    # ─── Adapters ───────────────────────────────────────────────────
+
+    def _get_fetch_params(self):
+        """Everything an adapter needs, read in the calling thread."""
+        self.ensure_one()
+        return {
+            "name": self.name,
+            "url": self.url,
+            "timeout": self.timeout,
+        }
+
+    def _fetch_rates_json(self, params):
+        response = requests.get(params["url"], timeout=params["timeout"])
+        response.raise_for_status()
+        data = response.json()
+        return (
+            data["base"],
+            fields.Date.to_date(data.get("date")) or None,
+            {code: float(rate) for code, rate in data["rates"].items()},
+        )
+
+    def _fetch_rates_ecb(self, params):
+        url = params["url"] or "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml"
+        response = requests.get(url, timeout=params["timeout"])
+        response.raise_for_status()
+        root = etree.fromstring(response.content)
+        day = root.find(".//ecb:Cube[@time]", ECB_NAMESPACE)
+        if day is None:
+            raise ValueError("No rates in the ECB feed")
+        return (
+            "EUR",
+            fields.Date.to_date(day.get("time")),
+            {cube.get("currency"): float(cube.get("rate")) for cube in day},
+        )
+
+    # ─── Fetching ───────────────────────────────────────────────────
+
+    def _fetch_all(self):
+        """
+        Run the adapters of the providers in self concurrently.
+
+        Each provider gets its own timeout, so a slow one is only skipped
+        instead of delaying the others.
+
+        Returns:
+            dict: {provider_id: {"status": "ok" | "error" | "timeout",
+                                 "message": str, "base": str,
+                                 "date": date, "rates": {code: rate}}}
+        """
+        results = {}
+        if not self:
+            return results
+        jobs = {
+            provider.id: (
+                getattr(provider, f"_fetch_rates_{provider.provider_type}"),
+                provider._get_fetch_params(),
+            )
+            for provider in self
+        }
+        executor = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="pos_multi_rates")
+        try:
+            started = time.monotonic()
+            futures = {
+                provider_id: executor.submit(adapter, params)
+                for provider_id, (adapter, params) in jobs.items()
+            }
+            for provider_id, future in futures.items():
+                params = jobs[provider_id][1]
+                remaining = params["timeout"] - (time.monotonic() - started)
+                done, _pending = wait([future], timeout=max(remaining, 0.0))
+                if not done:
+                    results[provider_id] = {
+                        "status": "timeout",
+                        "message": f"No answer within {params['timeout']:g}s",
+                    }
+                    continue
+                try:
+                    base, date, rates = future.result()
+                except Exception as e:  # noqa: BLE001 - a provider failure must not stop the others
+                    _logger.warning("Rate provider %s failed: %s", params["name"], e)
+                    results[provider_id] = {"status": "error", "message": str(e)[:200]}
+                    continue
+                results[provider_id] = {
+                    "status": "ok",
+                    "message": f"{len(rates)} rates",
+                    "base": base.upper(),
+                    "date": date,
+                    "rates": {code.upper(): rate for code, rate in rates.items() if rate > 0},
+                }
+        finally:
+            # Threads of timed-out providers end with their request timeout
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def _reconcile(self, results):
+        """
+        Merge the fetched rates of the providers in self (one company),
+        in priority order: each currency takes the rate of the first
+        provider that gave it, converted to the company currency.
+
+        Returns:
+            dict: {currency_code: (date, rate)}, rate in units of the
+                  currency for one unit of company currency.
+        """
+        company = self.company_id
+        company.ensure_one()
+        company_code = company.currency_id.name
+        all_codes = set(self.env["res.currency"].search([]).mapped("name"))
+        reconciled = {}
+        for provider in self.sorted(lambda p: (p.sequence, p.id)):
+            result = results.get(provider.id)
+            if not result or result["status"] != "ok":
+                continue
+            quotes = dict(result["rates"], **{result["base"]: 1.0})
+            if company_code not in quotes:
+                result.update(status="error", message=f"No rate for {company_code}")
+                continue
+            codes = set(provider.currency_ids.mapped("name")) or all_codes
+            date = result["date"] or fields.Date.context_today(provider)
+            for code in (codes & set(quotes)) - {company_code} - set(reconciled):
+                reconciled[code] = (date, quotes[code] / quotes[company_code])
+        return reconciled
+
+    def _fetch_and_import(self):
+        """
+        Fetch every provider in self, then write the reconciled rates of
+        each company in one batch with the bulk importer.
+
+        Returns:
+            dict: {company_id: importer result}
+        """
+        results = self._fetch_all()
+        imported = {}
+        for company in self.company_id:
+            providers = self.filtered(lambda p: p.company_id == company)
+            reconciled = providers._reconcile(results)
+            if reconciled:
+                rows = [
+                    (line, code, date, rate, None)
+                    for line, (code, (date, rate)) in enumerate(sorted(reconciled.items()), 1)
+                ]
+                imported[company.id] = self.env["res.currency.rate"]._pos_multi_bulk_import(
+                    rows, company=company
+                )
+        now = fields.Datetime.now()
+        for provider in self:
+            result = results[provider.id]
+            provider.write({
+                "last_fetch_date": now,
+                "last_status": result["status"],
+                "last_message": result["message"],
+            })
+        return imported
+
+    def action_fetch_rates(self):
+        imported = self._fetch_and_import()
+        updated = sum(result["inserted"] + result["updated"] for result in imported.values())
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": "Exchange Rates",
+                "message": "\n".join(
+                    [f"{updated} rates created or updated."]
+                    + [f"{provider.name}: {provider.last_message}" for provider in self]
+                ),
+                "type": "success" if imported else "warning",
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
+
+    @api.model
+    def _cron_fetch_rates(self):
+        self.search([])._fetch_and_import()
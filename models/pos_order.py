@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
 
+from ..tools.instrumentation import instrumented
+
 
 class PosOrder(models.Model):
     _inherit = "pos.order"
@@ -35,121 +37,412 @@ class PosOrder(models.Model):
         help="Number of payment lines with manually edited exchange rates.",
     )
     
-    # ─── Detailed multi-currency breakdown (JSON field) ────────────
+    # Partial indexes for the multi-currency order history (keyset
+    # pagination on date_order, id); most orders have no foreign payment
+    _foreign_payments_date_idx = models.Index(
+        "(date_order DESC, id DESC) WHERE has_foreign_payments"
+    )
+    _manual_rate_date_idx = models.Index(
+        "(date_order DESC, id DESC) WHERE manual_rate_count > 0"
+    )
+
+    # ─── Detailed multi-currency breakdown ─────────────────────────
     
-    foreign_currency_details = fields.Json(
+    currency_summary_ids = fields.One2many(
+        "pos.order.currency.summary",
+        "order_id",
         string="Foreign Currency Breakdown",
-        compute="_compute_foreign_currency_details",
-        store=True,
+        readonly=True,
         help="Detailed breakdown of payments by currency.",
     )
 
+    # ─── Receipt currency amounts (materialized at validation) ─────
+
+    receipt_currency_id = fields.Many2one(
+        "res.currency",
+        string="Receipt Currency",
+        readonly=True,
+        copy=False,
+        help="Receipt display currency of the POS when the order was validated.",
+    )
+    receipt_currency_rate = fields.Float(
+        string="Receipt Currency Rate",
+        digits=(16, 6),
+        readonly=True,
+        copy=False,
+        help="Rate used for the receipt: 1 unit of order currency = rate units of receipt currency.",
+    )
+    receipt_amount_total = fields.Monetary(
+        string="Total (Receipt Currency)",
+        currency_field="receipt_currency_id",
+        readonly=True,
+        copy=False,
+    )
+    receipt_amount_tax = fields.Monetary(
+        string="Taxes (Receipt Currency)",
+        currency_field="receipt_currency_id",
+        readonly=True,
+        copy=False,
+    )
+    receipt_amount_paid = fields.Monetary(
+        string="Paid (Receipt Currency)",
+        currency_field="receipt_currency_id",
+        readonly=True,
+        copy=False,
+    )
+    receipt_amount_return = fields.Monetary(
+        string="Change (Receipt Currency)",
+        currency_field="receipt_currency_id",
+        readonly=True,
+        copy=False,
+    )
+
     # ─── Computed fields ────────────────────────────────────────────
 
-    @api.depends("payment_ids.payment_currency_id", 
-                 "payment_ids.payment_currency_amount",
-                 "payment_ids.exchange_rate",
-                 "payment_ids.rate_manually_edited")
+    @api.depends("currency_summary_ids.total_foreign_amount",
+                 "currency_summary_ids.manual_edits")
+    @instrumented("pos.order._compute_foreign_currency_stats")
     def _compute_foreign_currency_stats(self):
-        """Compute summary statistics for foreign currency usage."""
+        """
+        Compute summary statistics for foreign currency usage.
+
+        Derived from the per-currency summary rows, which are rebuilt once
+        per payment batch, so a bulk sync recomputes each order only once.
+        """
         for order in self:
-            foreign_payments = order.payment_ids.filtered(
-                lambda p: p.payment_currency_id and p.payment_currency_id != order.currency_id
-            )
+            summaries = order.currency_summary_ids
             
-            order.has_foreign_payments = bool(foreign_payments)
+            order.has_foreign_payments = bool(summaries)
             
             # Count unique foreign currencies
-            foreign_currencies = foreign_payments.mapped("payment_currency_id")
-            order.foreign_currency_count = len(foreign_currencies)
+            order.foreign_currency_count = len(summaries)
             
             # Sum of foreign payments in base currency
-            order.total_foreign_amount = sum(
-                p.payment_currency_amount for p in foreign_payments
-            )
+            order.total_foreign_amount = sum(summaries.mapped("total_foreign_amount"))
             
             # Count manually edited rates
-            order.manual_rate_count = len(
-                foreign_payments.filtered("rate_manually_edited")
-            )
-
-    @api.depends("payment_ids.payment_currency_id",
-                 "payment_ids.payment_currency_amount",
-                 "payment_ids.exchange_rate",
-                 "payment_ids.amount")
-    def _compute_foreign_currency_details(self):
-        """Build detailed breakdown of foreign currency payments."""
-        for order in self:
-            if not order.has_foreign_payments:
-                order.foreign_currency_details = {}
+            order.manual_rate_count = sum(summaries.mapped("manual_edits"))
+
+    # ─── Bulk sync ──────────────────────────────────────────────────
+
+    @api.model
+    @instrumented("pos.order.sync_from_ui")
+    def sync_from_ui(self, orders):
+        """
+        Sync a batch of orders with deferred multi-currency aggregation.
+
+        Payments created by the batch are only queued; the session ledger,
+        the order currency summaries and the order statistics are then
+        updated once for the whole batch instead of once per order.  The
+        payload built by super() predates that update, so the fields it
+        wrote are read again and merged into it.
+        """
+        result = super(
+            PosOrder, self.with_context(pos_multi_defer_aggregates=True)
+        ).sync_from_ui(orders)
+        self.env["pos.payment"]._flush_deferred_multi_currency_aggregates()
+        self._flush_deferred_receipt_currency_amounts()
+        self._merge_multi_currency_sync_result(result)
+        return result
+
+    @api.model
+    def _get_multi_currency_sync_fields(self):
+        """Fields written by the deferred multi-currency updates, per model."""
+        return {
+            "pos.order": [
+                "has_foreign_payments",
+                "foreign_currency_count",
+                "total_foreign_amount",
+                "manual_rate_count",
+                "receipt_currency_id",
+                "receipt_currency_rate",
+                "receipt_amount_total",
+                "receipt_amount_tax",
+                "receipt_amount_paid",
+                "receipt_amount_return",
+            ],
+            "pos.order.line": ["receipt_price_subtotal", "receipt_price_subtotal_incl"],
+            "pos.payment": ["market_exchange_rate", "rate_deviation", "rate_deviation_flagged"],
+        }
+
+    @api.model
+    def _merge_multi_currency_sync_result(self, result):
+        """Update the records of a sync_from_ui payload with their current values."""
+        if not isinstance(result, dict):
+            return
+        for model, field_names in self._get_multi_currency_sync_fields().items():
+            records_data = result.get(model)
+            if not records_data:
                 continue
-            
-            # Group payments by currency
-            breakdown = {}
-            for payment in order.payment_ids:
-                if not payment.payment_currency_id:
-                    continue
-                if payment.payment_currency_id == order.currency_id:
-                    continue
-                
-                currency_id = payment.payment_currency_id.id
-                currency_name = payment.payment_currency_id.name
-                
-                if currency_id not in breakdown:
-                    breakdown[currency_id] = {
-                        "currency_id": currency_id,
-                        "currency_name": currency_name,
-                        "currency_symbol": payment.payment_currency_id.symbol,
-                        "total_foreign_amount": 0.0,
-                        "total_base_amount": 0.0,
-                        "payment_count": 0,
-                        "average_rate": 0.0,
-                        "rates_used": [],
-                        "manual_edits": 0,
-                    }
-                
-                entry = breakdown[currency_id]
-                entry["total_foreign_amount"] += payment.payment_currency_amount
-                entry["total_base_amount"] += payment.amount
-                entry["payment_count"] += 1
-                
-                if payment.rate_manually_edited:
-                    entry["manual_edits"] += 1
-                
-                # Track rates used
-                rate_info = {
-                    "rate": payment.exchange_rate,
-                    "manually_edited": payment.rate_manually_edited,
-                }
-                entry["rates_used"].append(rate_info)
-            
-            # Calculate average rates
-            for currency_id, entry in breakdown.items():
-                if entry["payment_count"] > 0 and entry["total_base_amount"] > 0:
-                    # Average rate = total foreign / total base
-                    entry["average_rate"] = (
-                        entry["total_foreign_amount"] / entry["total_base_amount"]
-                    )
-            
-            order.foreign_currency_details = breakdown
+            records = self.env[model].browse([data["id"] for data in records_data])
+            values = {
+                row["id"]: row for row in records.read(field_names, load=False)
+            }
+            for data in records_data:
+                data.update(values.get(data["id"], {}))
+
+    # ─── Receipt currency materialization ───────────────────────────
+
+    def action_pos_order_paid(self):
+        res = super().action_pos_order_paid()
+        if self.env.context.get("pos_multi_defer_aggregates"):
+            data = self.env.cr.precommit.data
+            pending = data.get("pos_multi.deferred_receipt_order_ids")
+            if pending is None:
+                pending = data["pos_multi.deferred_receipt_order_ids"] = set()
+                self.env.cr.precommit.add(
+                    self.env["pos.order"]._flush_deferred_receipt_currency_amounts
+                )
+            pending.update(self.ids)
+        else:
+            self._materialize_receipt_currency_amounts()
+        return res
+
+    @api.model
+    def _flush_deferred_receipt_currency_amounts(self):
+        pending = self.env.cr.precommit.data.get("pos_multi.deferred_receipt_order_ids")
+        if not pending:
+            return
+        orders = self.browse(sorted(pending)).exists()
+        pending.clear()
+        orders._materialize_receipt_currency_amounts()
+
+    @instrumented("pos.order._materialize_receipt_currency_amounts")
+    def _materialize_receipt_currency_amounts(self):
+        """
+        Store the receipt-currency totals, line amounts and rate on the
+        orders, so reprints and emailed receipts show the amounts of the
+        original receipt without converting anything again.
+
+        Rates come from one cross-rate matrix per (company, date); order
+        and line amounts are then written with one UPDATE each.
+        """
+        orders = self.filtered(
+            lambda o: o.config_id.multi_currency_receipt_currency_id
+            and not o.receipt_currency_id
+        )
+        if not orders:
+            return
+
+        order_values = []  # (order id, receipt currency id, rate, rounding)
+        by_company_date = {}
+        for order in orders:
+            key = (order.company_id, fields.Date.to_date(order.date_order))
+            by_company_date.setdefault(key, self.browse())
+            by_company_date[key] |= order
+        for (company, date), group in by_company_date.items():
+            currencies = group.currency_id | group.config_id.multi_currency_receipt_currency_id
+            matrix = currencies._get_cross_rate_matrix(company=company, date=date)
+            for order in group:
+                receipt_currency = order.config_id.multi_currency_receipt_currency_id
+                rate = matrix[order.currency_id.id][receipt_currency.id]
+                order_values.append((order.id, receipt_currency.id, rate, receipt_currency.rounding))
+
+        self.env["pos.order"].flush_model(
+            ["amount_total", "amount_tax", "amount_paid", "amount_return"]
+        )
+        self.env["pos.order.line"].flush_model(["price_subtotal", "price_subtotal_incl"])
+        values_sql = ", ".join(["(%s, %s, %s::float8, %s::numeric)"] * len(order_values))
+        params = [value for row in order_values for value in row]
+        self.env.cr.execute(
+            f"""
+            UPDATE pos_order o
+               SET receipt_currency_id = v.currency_id,
+                   receipt_currency_rate = v.rate,
+                   receipt_amount_total = ROUND((o.amount_total * v.rate)::numeric / v.rounding) * v.rounding,
+                   receipt_amount_tax = ROUND((o.amount_tax * v.rate)::numeric / v.rounding) * v.rounding,
+                   receipt_amount_paid = ROUND((o.amount_paid * v.rate)::numeric / v.rounding) * v.rounding,
+                   receipt_amount_return = ROUND((o.amount_return * v.rate)::numeric / v.rounding) * v.rounding
+              FROM (VALUES {values_sql}) AS v(order_id, currency_id, rate, rounding)
+             WHERE o.id = v.order_id
+            """,
+            params,
+        )
+        self.env.cr.execute(
+            f"""
+            UPDATE pos_order_line l
+               SET receipt_price_subtotal = ROUND((l.price_subtotal * v.rate)::numeric / v.rounding) * v.rounding,
+                   receipt_price_subtotal_incl = ROUND((l.price_subtotal_incl * v.rate)::numeric / v.rounding) * v.rounding
+              FROM (VALUES {values_sql}) AS v(order_id, currency_id, rate, rounding)
+             WHERE l.order_id = v.order_id
+            """,
+            params,
+        )
+        orders.invalidate_recordset([
+            "receipt_currency_id",
+            "receipt_currency_rate",
+            "receipt_amount_total",
+            "receipt_amount_tax",
+            "receipt_amount_paid",
+            "receipt_amount_return",
+        ])
+        orders.lines.invalidate_recordset(["receipt_price_subtotal", "receipt_price_subtotal_incl"])
 
     # ─── Export for receipt ─────────────────────────────────────────
 
     def export_for_ui(self, order):
         """Override to include multi-currency data in POS UI."""
         result = super().export_for_ui(order)
-        
-        # Add multi-currency summary
-        result.update({
-            "has_foreign_payments": order.has_foreign_payments,
-            "foreign_currency_count": order.foreign_currency_count,
-            "total_foreign_amount": order.total_foreign_amount,
-            "manual_rate_count": order.manual_rate_count,
-            "foreign_currency_details": order.foreign_currency_details or {},
-        })
-        
+        result.update(order._export_multi_currency_for_ui()[order.id])
         return result
 
+    def _export_multi_currency_for_ui(self):
+        """
+        Serialize the multi-currency data of all orders in self.
+
+        Summaries, currencies and receipt line amounts are fetched for the
+        whole recordset at once, so the number of queries does not depend
+        on the number of orders.
+
+        Returns:
+            dict: {order_id: {...}}
+        """
+        self.fetch([
+            "has_foreign_payments",
+            "foreign_currency_count",
+            "total_foreign_amount",
+            "manual_rate_count",
+            "receipt_currency_id",
+            "receipt_currency_rate",
+            "receipt_amount_total",
+            "receipt_amount_tax",
+            "receipt_amount_paid",
+            "receipt_amount_return",
+        ])
+        summaries = self.currency_summary_ids
+        summaries.currency_id.fetch(["name", "symbol"])
+        summaries_by_order = {}
+        for summary in summaries:
+            summaries_by_order.setdefault(summary.order_id.id, summary.browse())
+            summaries_by_order[summary.order_id.id] |= summary
+        receipt_orders = self.filtered("receipt_currency_id")
+        receipt_orders.lines.fetch(["receipt_price_subtotal", "receipt_price_subtotal_incl"])
+
+        result = {}
+        for order in self:
+            summaries = summaries_by_order.get(order.id, self.env["pos.order.currency.summary"])
+            result[order.id] = {
+                "has_foreign_payments": order.has_foreign_payments,
+                "foreign_currency_count": order.foreign_currency_count,
+                "total_foreign_amount": order.total_foreign_amount,
+                "manual_rate_count": order.manual_rate_count,
+                "foreign_currency_details": summaries._export_for_ui(),
+                # Receipt-currency amounts as printed on the original receipt
+                "receipt_currency_id": order.receipt_currency_id.id,
+                "receipt_currency_rate": order.receipt_currency_rate,
+                "receipt_amount_total": order.receipt_amount_total,
+                "receipt_amount_tax": order.receipt_amount_tax,
+                "receipt_amount_paid": order.receipt_amount_paid,
+                "receipt_amount_return": order.receipt_amount_return,
+                "receipt_line_amounts": {
+                    line.id: {
+                        "price_subtotal": line.receipt_price_subtotal,
+                        "price_subtotal_incl": line.receipt_price_subtotal_incl,
+                    }
+                    for line in order.lines
+                } if order.receipt_currency_id else {},
+            }
+        return result
+
+    # ─── Order history search ───────────────────────────────────────
+
+    @api.model
+    def _get_multi_currency_history_domain(self, config_ids=None, currency_ids=None,
+                                           manual_only=False, date_from=None, date_to=None,
+                                           after=None):
+        """Build the pos.order domain of one multi-currency history page."""
+        domain = [("has_foreign_payments", "=", True)]
+        if manual_only:
+            domain.append(("manual_rate_count", ">", 0))
+        if config_ids:
+            domain.append(("session_id.config_id", "in", config_ids))
+        if currency_ids:
+            domain.append(("currency_summary_ids.currency_id", "in", currency_ids))
+        if date_from:
+            domain.append(("date_order", ">=", date_from))
+        if date_to:
+            domain.append(("date_order", "<=", date_to))
+        if after:
+            # Keyset: strictly after the last order of the previous page
+            domain += [
+                "|",
+                ("date_order", "<", after["date_order"]),
+                "&",
+                ("date_order", "=", after["date_order"]),
+                ("id", "<", after["id"]),
+            ]
+        return domain
+
+    @api.model
+    @instrumented("pos.order.search_multi_currency_orders")
+    def search_multi_currency_orders(self, config_ids=None, currency_ids=None, manual_only=False,
+                                     date_from=None, date_to=None, after=None, limit=50):
+        """
+        Return one page of orders with foreign currency payments, newest first.
+
+        Pages are delimited by keyset pagination on (date_order, id): pass
+        the ``next_cursor`` of a page as ``after`` to get the next one.
+        The cost of a page does not grow with the number of older orders.
+
+        Args:
+            config_ids (list): Restrict to these POS configs.
+            currency_ids (list): Orders paid (partly) in one of these currencies.
+            manual_only (bool): Only orders with manually edited rates.
+            date_from (str): Lower date_order bound (inclusive).
+            date_to (str): Upper date_order bound (inclusive).
+            after (dict): {"date_order": str, "id": int} cursor.
+            limit (int): Page size.
+
+        Returns:
+            dict: {"orders": [{...}], "next_cursor": dict or None}
+        """
+        limit = min(max(int(limit or 50), 1), 500)
+        orders = self.search(
+            self._get_multi_currency_history_domain(
+                config_ids=config_ids,
+                currency_ids=currency_ids,
+                manual_only=manual_only,
+                date_from=date_from,
+                date_to=date_to,
+                after=after,
+            ),
+            order="date_order desc, id desc",
+            limit=limit + 1,
+        )
+        page = orders[:limit]
+        last = page[-1:] if len(orders) > limit else None
+        return {
+            "orders": page._serialize_multi_currency_history(),
+            "next_cursor": {
+                "date_order": fields.Datetime.to_string(last.date_order),
+                "id": last.id,
+            } if last else None,
+        }
+
+    def _serialize_multi_currency_history(self):
+        """Serialize a page of history orders with their multi-currency data."""
+        self.fetch([
+            "name", "pos_reference", "date_order", "state",
+            "partner_id", "session_id", "amount_total",
+        ])
+        self.partner_id.fetch(["name"])
+        multi_currency = self._export_multi_currency_for_ui()
+        return [
+            {
+                "id": order.id,
+                "name": order.name,
+                "pos_reference": order.pos_reference,
+                "date_order": fields.Datetime.to_string(order.date_order),
+                "state": order.state,
+                "partner_name": order.partner_id.name or "",
+                "session_id": order.session_id.id,
+                "currency_id": order.currency_id.id,
+                "amount_total": order.amount_total,
+                **multi_currency[order.id],
+            }
+            for order in self
+        ]
+
     # ─── Actions ────────────────────────────────────────────────────
 
     def action_view_foreign_currency_details(self):
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools import float_is_zero
+
+from ..tools.instrumentation import instrumented
+
+
+class PosOrderCurrencySummary(models.Model):
+    """
+    One row per (order, foreign payment currency).
+
+    Replaces the former ``foreign_currency_details`` JSON blob on pos.order
+    so the per-currency breakdown stays compact and can be aggregated and
+    filtered in SQL.
+    """
+    _name = "pos.order.currency.summary"
+    _description = "POS Order Currency Summary"
+    _order = "order_id, currency_id"
+
+    order_id = fields.Many2one(
+        "pos.order",
+        string="Order",
+        required=True,
+        index=True,
+        ondelete="cascade",
+        readonly=True,
+    )
+    session_id = fields.Many2one(
+        related="order_id.session_id",
+        store=True,
+        index=True,
+    )
+    company_id = fields.Many2one(
+        related="order_id.company_id",
+        store=True,
+        index=True,
+    )
+    currency_id = fields.Many2one(
+        "res.currency",
+        string="Payment Currency",
+        required=True,
+        index=True,
+        readonly=True,
+    )
+    order_currency_id = fields.Many2one(
+        related="order_id.currency_id",
+        string="Order Currency",
+    )
+    total_foreign_amount = fields.Monetary(
+        string="Foreign Amount",
+        currency_field="currency_id",
+        readonly=True,
+    )
+    total_base_amount = fields.Monetary(
+        string="Base Amount",
+        currency_field="order_currency_id",
+        readonly=True,
+    )
+    payment_count = fields.Integer(string="Payments", readonly=True)
+    min_rate = fields.Float(string="Min. Rate", digits=(16, 6), readonly=True)
+    max_rate = fields.Float(string="Max. Rate", digits=(16, 6), readonly=True)
+    average_rate = fields.Float(
+        string="Avg. Rate",
+        digits=(16, 6),
+        readonly=True,
+        help="Weighted average rate: total foreign amount / total base amount.",
+    )
+    manual_edits = fields.Integer(string="Manual Edits", readonly=True)
+
+    _order_currency_uniq = models.Constraint(
+        "UNIQUE(order_id, currency_id)",
+        "Only one currency summary per order and currency is allowed.",
+    )
+    # Order history filtered by payment currency
+    _currency_order_idx = models.Index("(currency_id, order_id)")
+
+    # ─── Maintenance ────────────────────────────────────────────────
+
+    @api.model
+    @instrumented("pos.order.currency.summary._refresh_for_orders")
+    def _refresh_for_orders(self, orders):
+        """
+        Rebuild the summary rows of the given orders from their payments.
+
+        Uses one grouped query over pos.payment for all orders.  Existing
+        rows are updated in place, and only when their values changed; rows
+        are only created or deleted for currencies that appeared in or
+        disappeared from an order.
+        """
+        orders = orders.exists()
+        if not orders:
+            return
+        groups = self.env["pos.payment"]._read_group(
+            [
+                ("pos_order_id", "in", orders.ids),
+                ("payment_currency_id", "!=", False),
+            ],
+            groupby=["pos_order_id", "payment_currency_id", "rate_manually_edited"],
+            aggregates=[
+                "payment_currency_amount:sum",
+                "amount:sum",
+                "__count",
+                "exchange_rate:min",
+                "exchange_rate:max",
+            ],
+        )
+
+        summaries = {}  # keyed by (order id, currency id)
+        for (order, currency, manually_edited, total_foreign, total_base,
+             count, min_rate, max_rate) in groups:
+            if currency == order.currency_id:
+                continue
+            entry = summaries.setdefault((order.id, currency.id), {
+                "order_id": order.id,
+                "currency_id": currency.id,
+                "total_foreign_amount": 0.0,
+                "total_base_amount": 0.0,
+                "payment_count": 0,
+                "min_rate": min_rate,
+                "max_rate": max_rate,
+                "average_rate": 0.0,
+                "manual_edits": 0,
+            })
+            entry["total_foreign_amount"] += total_foreign
+            entry["total_base_amount"] += total_base
+            entry["payment_count"] += count
+            entry["min_rate"] = min(entry["min_rate"], min_rate)
+            entry["max_rate"] = max(entry["max_rate"], max_rate)
+            if manually_edited:
+                entry["manual_edits"] += count
+
+        for entry in summaries.values():
+            if entry["total_base_amount"] > 0:
+                entry["average_rate"] = (
+                    entry["total_foreign_amount"] / entry["total_base_amount"]
+                )
+
+        existing = self.sudo().search([("order_id", "in", orders.ids)])
+        obsolete = self.sudo()
+        for summary in existing:
+            vals = summaries.pop((summary.order_id.id, summary.currency_id.id), None)
+            if vals is None:
+                obsolete |= summary
+                continue
+            changed = {
+                fname: value
+                for fname, value in vals.items()
+                if fname not in ("order_id", "currency_id")
+                and not self._summary_value_equal(summary[fname], value)
+            }
+            if changed:
+                summary.write(changed)
+        obsolete.unlink()
+        if summaries:
+            self.sudo().create(list(summaries.values()))
+
+    @api.model
+    def _summary_value_equal(self, old, new):
+        if isinstance(new, float):
+            return float_is_zero(old - new, precision_digits=6)
+        return old == new
+
+    def _export_for_ui(self):
+        """Serialize summaries as {currency_id: {...}} for the POS UI."""
+        return {
+            summary.currency_id.id: {
+                "currency_id": summary.currency_id.id,
+                "currency_name": summary.currency_id.name,
+                "currency_symbol": summary.currency_id.symbol,
+                "total_foreign_amount": summary.total_foreign_amount,
+                "total_base_amount": summary.total_base_amount,
+                "payment_count": summary.payment_count,
+                "min_rate": summary.min_rate,
+                "max_rate": summary.max_rate,
+                "average_rate": summary.average_rate,
+                "manual_edits": summary.manual_edits,
+            }
+            for summary in self
+        }
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+
+
+class PosOrderLine(models.Model):
+    _inherit = "pos.order.line"
+
+    # Materialized at validation time, see PosOrder._materialize_receipt_currency_amounts
+    receipt_currency_id = fields.Many2one(
+        related="order_id.receipt_currency_id",
+    )
+    receipt_price_subtotal = fields.Monetary(
+        string="Subtotal (Receipt Currency)",
+        currency_field="receipt_currency_id",
+        readonly=True,
+        copy=False,
+    )
+    receipt_price_subtotal_incl = fields.Monetary(
+        string="Total (Receipt Currency)",
+        currency_field="receipt_currency_id",
+        readonly=True,
+        copy=False,
+    )
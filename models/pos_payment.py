@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+from ..tools.instrumentation import instrumented
 
 
 class PosPayment(models.Model):
@@ -29,6 +32,254 @@ class PosPayment(models.Model):
         default=False,
         help="True if the cashier manually overrode the exchange rate.",
     )
+    market_exchange_rate = fields.Float(
+        string="Market Rate",
+        digits=(16, 6),
+        readonly=True,
+        copy=False,
+        help="Market rate at the payment date, checked by the server when the order was synced.",
+    )
+    rate_deviation = fields.Float(
+        string="Rate Deviation (%)",
+        digits=(16, 2),
+        readonly=True,
+        copy=False,
+        help="Relative difference between the exchange rate used and the market rate.",
+    )
+    rate_deviation_flagged = fields.Boolean(
+        string="Rate Deviation Flagged",
+        readonly=True,
+        copy=False,
+        help="The exchange rate or the payment currency amount sent by the POS "
+             "is outside the tolerance of the point of sale.",
+    )
+
+    # Partial indexes: only foreign currency payments are ever reported on
+    _payment_currency_date_idx = models.Index(
+        "(payment_currency_id, payment_date) WHERE payment_currency_id IS NOT NULL"
+    )
+    _payment_currency_session_idx = models.Index(
+        "(session_id, payment_currency_id) WHERE payment_currency_id IS NOT NULL"
+    )
+
+    # ─── Session currency ledger ────────────────────────────────────
+
+    @api.model
+    def _get_multi_currency_ledger_fields(self):
+        """Fields whose change must be reflected in the session ledger."""
+        return {
+            "pos_order_id",
+            "amount",
+            "payment_currency_id",
+            "payment_currency_amount",
+            "rate_manually_edited",
+        }
+
+    def _prepare_multi_currency_ledger_vals(self, sign=1):
+        """
+        Build signed ledger rows for the foreign currency payments in self.
+
+        A payment is foreign when its payment currency differs from the
+        order currency, matching the order and session statistics.
+        """
+        vals_list = []
+        for payment in self:
+            order = payment.pos_order_id
+            if not order or not order.session_id:
+                continue
+            if not payment.payment_currency_id or payment.payment_currency_id == order.currency_id:
+                continue
+            vals_list.append({
+                "session_id": order.session_id.id,
+                "config_id": order.session_id.config_id.id,
+                "order_id": order.id,
+                "currency_id": payment.payment_currency_id.id,
+                "amount_foreign": sign * payment.payment_currency_amount,
+                "amount_base": sign * payment.amount,
+                "payment_count": sign,
+                "manual_edit_count": sign if payment.rate_manually_edited else 0,
+            })
+        return vals_list
+
+    @api.model
+    def _post_multi_currency_ledger_entries(self, vals_list):
+        if vals_list:
+            self.env["pos.session.currency.ledger"].sudo().create(vals_list)
+
+    def _update_multi_currency_aggregates(self):
+        """Post ledger entries and rebuild order summaries for new payments."""
+        self.fetch([
+            "pos_order_id",
+            "amount",
+            "payment_currency_id",
+            "payment_currency_amount",
+            "rate_manually_edited",
+        ])
+        self.pos_order_id.fetch(["session_id"])
+        self._post_multi_currency_ledger_entries(
+            self._prepare_multi_currency_ledger_vals()
+        )
+        self.env["pos.order.currency.summary"]._refresh_for_orders(self.pos_order_id)
+
+    # ─── Deferred aggregation for bulk order sync ───────────────────
+    #
+    # With ``pos_multi_defer_aggregates`` in the context (set by
+    # pos.order.sync_from_ui), newly created payments are only queued; the
+    # ledger and order summaries are updated once for the whole batch.
+
+    def _defer_multi_currency_aggregates(self):
+        data = self.env.cr.precommit.data
+        pending = data.get("pos_multi.deferred_payment_ids")
+        if pending is None:
+            pending = data["pos_multi.deferred_payment_ids"] = set()
+            # Safety net in case the batch is never flushed explicitly
+            self.env.cr.precommit.add(
+                self.env["pos.payment"]._flush_deferred_multi_currency_aggregates
+            )
+        pending.update(self.ids)
+
+    @api.model
+    @instrumented("pos.payment._flush_deferred_multi_currency_aggregates")
+    def _flush_deferred_multi_currency_aggregates(self):
+        pending = self.env.cr.precommit.data.get("pos_multi.deferred_payment_ids")
+        if not pending:
+            return
+        payments = self.browse(sorted(pending)).exists()
+        pending.clear()
+        payments = payments.with_context(pos_multi_defer_aggregates=False)
+        payments._validate_multi_currency_rates()
+        payments._update_multi_currency_aggregates()
+
+    def _flush_deferred_if_pending(self):
+        """Apply queued aggregates before a queued payment gets changed again."""
+        pending = self.env.cr.precommit.data.get("pos_multi.deferred_payment_ids")
+        if pending and pending.intersection(self.ids):
+            self._flush_deferred_multi_currency_aggregates()
+
+    # ─── Exchange rate validation ───────────────────────────────────
+
+    @instrumented("pos.payment._validate_multi_currency_rates")
+    def _validate_multi_currency_rates(self):
+        """
+        Check the rates and amounts sent by the POS for foreign payments.
+
+        The exchange rate is compared with the market rate at the payment
+        date, and the payment currency amount with ``amount * exchange_rate``.
+        Payments outside the tolerance of their POS are flagged, or the
+        sync is rejected when the POS policy says so.  Market rates come
+        from one rate timeline query per company for the whole batch.
+        """
+        groups = {}  # {company: payments}
+        for payment in self:
+            order = payment.pos_order_id
+            if not order or not payment.payment_currency_id:
+                continue
+            if payment.payment_currency_id == order.currency_id:
+                continue
+            groups.setdefault(order.company_id, self.browse())
+            groups[order.company_id] |= payment
+        if not groups:
+            return
+
+        Currency = self.env["res.currency"]
+        rows = []  # (payment id, market rate, deviation %, flagged)
+        market_rates = {}
+        rejected = self.browse()
+        for company, payments in groups.items():
+            dates = [fields.Date.to_date(payment.payment_date) for payment in payments]
+            currencies = payments.payment_currency_id | payments.pos_order_id.currency_id
+            timelines = currencies._get_rate_timelines(company, min(dates), max(dates))
+            for payment, date in zip(payments, dates):
+                order = payment.pos_order_id
+                payment_currency = payment.payment_currency_id
+                order_currency = order.currency_id
+                market_rate = (
+                    Currency._get_timeline_rate(timelines[payment_currency.id], date)
+                    / Currency._get_timeline_rate(timelines[order_currency.id], date)
+                )
+                rate = payment.exchange_rate
+                deviation = abs(rate - market_rate) / market_rate if market_rate else 0.0
+                # The base amount may itself be rounded from the foreign one
+                amount_tolerance = max(
+                    payment_currency.rounding, rate * order_currency.rounding
+                )
+                amount_mismatch = (
+                    abs(payment.amount * rate - payment.payment_currency_amount)
+                    > amount_tolerance
+                )
+                tolerance = order.config_id.multi_currency_rate_tolerance / 100.0
+                flagged = amount_mismatch or deviation > tolerance
+                if flagged and order.config_id.multi_currency_rate_policy == "reject":
+                    rejected |= payment
+                market_rates[payment.id] = market_rate
+                rows.append((payment.id, market_rate, deviation * 100.0, flagged))
+
+        if rejected:
+            raise ValidationError(
+                "Exchange rates sent by the point of sale are outside the allowed "
+                "tolerance:\n%s" % "\n".join(
+                    "%s: %s rate %.6f (market %.6f), %s %s"
+                    % (
+                        payment.pos_order_id.pos_reference or payment.pos_order_id.name,
+                        payment.payment_currency_id.name,
+                        payment.exchange_rate,
+                        market_rates[payment.id],
+                        payment.payment_currency_id.name,
+                        payment.payment_currency_amount,
+                    )
+                    for payment in rejected[:10]
+                )
+            )
+
+        self.flush_recordset(["market_exchange_rate", "rate_deviation", "rate_deviation_flagged"])
+        values_sql = ", ".join(["(%s, %s::float8, %s::float8, %s::boolean)"] * len(rows))
+        self.env.cr.execute(
+            f"""
+            UPDATE pos_payment p
+               SET market_exchange_rate = v.market_rate,
+                   rate_deviation = v.deviation,
+                   rate_deviation_flagged = v.flagged
+              FROM (VALUES {values_sql}) AS v(id, market_rate, deviation, flagged)
+             WHERE p.id = v.id
+            """,
+            [value for row in rows for value in row],
+        )
+        self.invalidate_recordset(["market_exchange_rate", "rate_deviation", "rate_deviation_flagged"])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        payments = super().create(vals_list)
+        if self.env.context.get("pos_multi_defer_aggregates"):
+            payments._defer_multi_currency_aggregates()
+        else:
+            payments._update_multi_currency_aggregates()
+        return payments
+
+    def write(self, vals):
+        summary_changed = (self._get_multi_currency_ledger_fields() | {"exchange_rate"}) & vals.keys()
+        if not summary_changed:
+            return super().write(vals)
+        self._flush_deferred_if_pending()
+        ledger_changed = self._get_multi_currency_ledger_fields() & vals.keys()
+        # Reverse the previous state and append the new one
+        reversal_vals = self._prepare_multi_currency_ledger_vals(sign=-1) if ledger_changed else []
+        orders = self.pos_order_id
+        res = super().write(vals)
+        if ledger_changed:
+            self._post_multi_currency_ledger_entries(
+                reversal_vals + self._prepare_multi_currency_ledger_vals()
+            )
+        self.env["pos.order.currency.summary"]._refresh_for_orders(orders | self.pos_order_id)
+        return res
+
+    def unlink(self):
+        self._flush_deferred_if_pending()
+        reversal_vals = self._prepare_multi_currency_ledger_vals(sign=-1)
+        orders = self.pos_order_id
+        res = super().unlink()
+        self._post_multi_currency_ledger_entries(reversal_vals)
+        self.env["pos.order.currency.summary"]._refresh_for_orders(orders)
+        return res
 
     def _serialize_payment(self):
         """Extend payment serialisation to include multi-currency fields."""
@@ -40,3 +291,165 @@ class PosPayment(models.Model):
             "rate_manually_edited": self.rate_manually_edited,
         })
         return data
+
+    # ─── Aggregation engine ─────────────────────────────────────────
+
+    @api.model
+    def _get_multi_currency_statistics_domain(self, session_ids=None, config_ids=None,
+                                              date_from=None, date_to=None):
+        """Build the pos.payment domain used by the statistics engine."""
+        domain = [("payment_currency_id", "!=", False)]
+        if session_ids:
+            domain.append(("session_id", "in", session_ids))
+        if config_ids:
+            domain.append(("session_id.config_id", "in", config_ids))
+        if date_from:
+            domain.append(("payment_date", ">=", date_from))
+        if date_to:
+            domain.append(("payment_date", "<=", date_to))
+        return domain
+
+    @api.model
+    def _get_multi_currency_statistics(self, session_ids=None, config_ids=None,
+                                       date_from=None, date_to=None):
+        """
+        Aggregate multi-currency payments per payment currency.
+
+        Runs a single grouped query over pos.payment instead of browsing
+        every payment line, so it stays cheap for busy sessions and can
+        aggregate several sessions / configs / a date range in one call.
+
+        Args:
+            session_ids (list): Restrict to these pos.session IDs.
+            config_ids (list): Restrict to sessions of these pos.config IDs.
+            date_from, date_to: Optional payment_date bounds (inclusive).
+
+        Returns:
+            list: [{currency_id, currency_name, total_amount,
+                    total_base_amount, transaction_count,
+                    manually_edited_count}, ...]
+        """
+        domain = self._get_multi_currency_statistics_domain(
+            session_ids=session_ids,
+            config_ids=config_ids,
+            date_from=date_from,
+            date_to=date_to,
+        )
+        # Grouping on the manual-edit flag as well lets us count edited
+        # payments without a second query.
+        groups = self._read_group(
+            domain,
+            groupby=["payment_currency_id", "rate_manually_edited"],
+            aggregates=["payment_currency_amount:sum", "amount:sum", "__count"],
+        )
+
+        stats = {}  # keyed by currency id
+        for currency, manually_edited, total_amount, total_base_amount, count in groups:
+            if currency.id not in stats:
+                stats[currency.id] = {
+                    "currency_id": currency.id,
+                    "currency_name": currency.name,
+                    "total_amount": 0.0,
+                    "total_base_amount": 0.0,
+                    "transaction_count": 0,
+                    "manually_edited_count": 0,
+                }
+            entry = stats[currency.id]
+            entry["total_amount"] += total_amount
+            entry["total_base_amount"] += total_base_amount
+            entry["transaction_count"] += count
+            if manually_edited:
+                entry["manually_edited_count"] += count
+
+        return list(stats.values())
+
+    # ─── Streaming export ───────────────────────────────────────────
+
+    @api.model
+    def _get_multi_currency_export_header(self):
+        return [
+            "Payment ID",
+            "Payment Date",
+            "Point of Sale",
+            "Session",
+            "Order",
+            "Payment Method",
+            "Currency",
+            "Foreign Amount",
+            "Base Amount",
+            "Exchange Rate",
+            "Manually Edited",
+        ]
+
+    @api.model
+    def _iter_multi_currency_export_rows(self, config_ids=None, session_ids=None,
+                                         currency_ids=None, date_from=None, date_to=None,
+                                         manual_only=False, chunk_size=5000):
+        """
+        Yield foreign currency payments as lists of row tuples.
+
+        Rows are read straight from SQL in chunks of ``chunk_size`` using
+        keyset pagination on the payment id, so memory stays constant
+        whatever the date range.  Restricted to the allowed companies.
+        """
+        conditions = [
+            "p.payment_currency_id IS NOT NULL",
+            "o.company_id = ANY(%(company_ids)s)",
+            "p.id > %(last_id)s",
+        ]
+        params = {
+            "company_ids": self.env.companies.ids,
+            "lang": self.env.lang or "en_US",
+            "limit": chunk_size,
+            "last_id": 0,
+        }
+        if config_ids:
+            conditions.append("s.config_id = ANY(%(config_ids)s)")
+            params["config_ids"] = list(config_ids)
+        if session_ids:
+            conditions.append("p.session_id = ANY(%(session_ids)s)")
+            params["session_ids"] = list(session_ids)
+        if currency_ids:
+            conditions.append("p.payment_currency_id = ANY(%(currency_ids)s)")
+            params["currency_ids"] = list(currency_ids)
+        if date_from:
+            conditions.append("p.payment_date >= %(date_from)s")
+            params["date_from"] = date_from
+        if date_to:
+            conditions.append("p.payment_date <= %(date_to)s")
+            params["date_to"] = date_to
+        if manual_only:
+            conditions.append("p.rate_manually_edited")
+
+        self.flush_model()
+        query = f"""
+            SELECT p.id,
+                   p.payment_date,
+                   cfg.name,
+                   s.name,
+                   o.name,
+                   COALESCE(pm.name->>%(lang)s, pm.name->>'en_US'),
+                   c.name,
+                   p.payment_currency_amount,
+                   p.amount,
+                   p.exchange_rate,
+                   COALESCE(p.rate_manually_edited, FALSE)
+              FROM pos_payment p
+              JOIN pos_order o ON o.id = p.pos_order_id
+              JOIN pos_session s ON s.id = o.session_id
+              JOIN pos_config cfg ON cfg.id = s.config_id
+              JOIN pos_payment_method pm ON pm.id = p.payment_method_id
+              JOIN res_currency c ON c.id = p.payment_currency_id
+             WHERE {" AND ".join(conditions)}
+          ORDER BY p.id
+             LIMIT %(limit)s
+        """
+        while True:
+            self.env.cr.execute(query, params)
+            rows = self.env.cr.fetchall()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            params["last_id"] = rows[-1][0]
@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
+import math
+
 from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+from ..tools.instrumentation import instrumented
 
 
 class PosSession(models.Model):
@@ -7,24 +13,25 @@ class PosSession(models.Model):
 
     # ─── Multi-currency session statistics ─────────────────────────
 
+    # Read from the append-only pos.session.currency.ledger: nothing is
+    # stored on pos_session, so concurrent payments never lock its row.
+
     has_foreign_payments = fields.Boolean(
         string="Has Foreign Currency",
         compute="_compute_multi_currency_stats",
-        store=True,
+        search="_search_has_foreign_payments",
         help="True if this session has any foreign currency payments.",
     )
 
     foreign_currency_count = fields.Integer(
         string="Foreign Currencies",
         compute="_compute_multi_currency_stats",
-        store=True,
         help="Number of different foreign currencies used in this session.",
     )
 
     total_foreign_amount = fields.Monetary(
         string="Total Foreign Amount",
         compute="_compute_multi_currency_stats",
-        store=True,
         currency_field="currency_id",
         help="Total of all foreign currency payments converted to session currency.",
     )
@@ -32,17 +39,23 @@ class PosSession(models.Model):
     foreign_payment_count = fields.Integer(
         string="Foreign Payments",
         compute="_compute_multi_currency_stats",
-        store=True,
         help="Number of payment lines using foreign currency.",
     )
 
     manual_rate_edit_count = fields.Integer(
         string="Manual Rate Edits",
         compute="_compute_multi_currency_stats",
-        store=True,
+        search="_search_manual_rate_edit_count",
         help="Number of payments with manually edited rates.",
     )
 
+    multi_currency_cash_ids = fields.One2many(
+        "pos.session.currency.cash",
+        "session_id",
+        string="Foreign Cash Control",
+        readonly=True,
+    )
+
     foreign_currency_breakdown = fields.Json(
         string="Currency Breakdown",
         compute="_compute_multi_currency_breakdown",
@@ -51,92 +64,461 @@ class PosSession(models.Model):
 
     # ─── Computed fields ────────────────────────────────────────────
 
-    @api.depends("order_ids.has_foreign_payments",
-                 "order_ids.foreign_currency_count",
-                 "order_ids.total_foreign_amount",
-                 "order_ids.manual_rate_count")
+    @instrumented("pos.session._compute_multi_currency_stats")
     def _compute_multi_currency_stats(self):
-        """Compute multi-currency statistics for the session."""
+        """Compute multi-currency statistics for the session from the ledger."""
+        breakdowns = self.env["pos.session.currency.ledger"]._get_session_breakdown(
+            self.ids
+        )
         for session in self:
-            foreign_orders = session.order_ids.filtered("has_foreign_payments")
-            
-            session.has_foreign_payments = bool(foreign_orders)
-            
-            # Count all unique currencies across all orders
-            all_currencies = set()
-            total_foreign = 0.0
-            total_payments = 0
-            total_manual_edits = 0
-            
-            for order in foreign_orders:
-                if order.foreign_currency_details:
-                    for currency_id in order.foreign_currency_details.keys():
-                        all_currencies.add(int(currency_id))
-                
-                total_foreign += order.total_foreign_amount
-                total_manual_edits += order.manual_rate_count
-                
-                # Count foreign payment lines
-                total_payments += len(order.payment_ids.filtered(
-                    lambda p: p.payment_currency_id and 
-                              p.payment_currency_id != order.currency_id
-                ))
-            
-            session.foreign_currency_count = len(all_currencies)
-            session.total_foreign_amount = total_foreign
-            session.foreign_payment_count = total_payments
-            session.manual_rate_edit_count = total_manual_edits
-
-    @api.depends("order_ids.payment_ids.payment_currency_id",
-                 "order_ids.payment_ids.payment_currency_amount",
-                 "order_ids.payment_ids.amount")
+            breakdown = breakdowns.get(session.id, {})
+            session.has_foreign_payments = bool(breakdown)
+            session.foreign_currency_count = len(breakdown)
+            session.total_foreign_amount = sum(
+                entry["total_foreign_amount"] for entry in breakdown.values()
+            )
+            session.foreign_payment_count = sum(
+                entry["payment_count"] for entry in breakdown.values()
+            )
+            session.manual_rate_edit_count = sum(
+                entry["manual_edits"] for entry in breakdown.values()
+            )
+
+    @instrumented("pos.session._compute_multi_currency_breakdown")
     def _compute_multi_currency_breakdown(self):
-        """Build detailed currency breakdown for session."""
+        """Build detailed currency breakdown for session from the ledger."""
+        breakdowns = self.env["pos.session.currency.ledger"]._get_session_breakdown(
+            self.ids
+        )
+        currency_ids = {
+            currency_id
+            for breakdown in breakdowns.values()
+            for currency_id in breakdown
+        }
+        currencies = self.env["res.currency"].browse(currency_ids)
         for session in self:
-            if not session.has_foreign_payments:
-                session.foreign_currency_breakdown = {}
-                continue
-            
             breakdown = {}
-            
-            for order in session.order_ids:
-                for payment in order.payment_ids:
-                    if not payment.payment_currency_id:
-                        continue
-                    if payment.payment_currency_id == order.currency_id:
-                        continue
-                    
-                    currency_id = payment.payment_currency_id.id
-                    
-                    if currency_id not in breakdown:
-                        breakdown[currency_id] = {
-                            "currency_id": currency_id,
-                            "currency_name": payment.payment_currency_id.name,
-                            "currency_symbol": payment.payment_currency_id.symbol,
-                            "total_foreign_amount": 0.0,
-                            "total_base_amount": 0.0,
-                            "payment_count": 0,
-                            "order_count": 0,
-                            "manual_edits": 0,
-                            "order_ids": set(),
-                        }
-                    
-                    entry = breakdown[currency_id]
-                    entry["total_foreign_amount"] += payment.payment_currency_amount
-                    entry["total_base_amount"] += payment.amount
-                    entry["payment_count"] += 1
-                    entry["order_ids"].add(order.id)
-                    
-                    if payment.rate_manually_edited:
-                        entry["manual_edits"] += 1
-            
-            # Convert sets to counts and remove them
-            for currency_id, entry in breakdown.items():
-                entry["order_count"] = len(entry["order_ids"])
-                del entry["order_ids"]  # Remove set (not JSON serializable)
-            
+            for currency in currencies:
+                entry = breakdowns.get(session.id, {}).get(currency.id)
+                if not entry:
+                    continue
+                breakdown[currency.id] = {
+                    "currency_id": currency.id,
+                    "currency_name": currency.name,
+                    "currency_symbol": currency.symbol,
+                    **entry,
+                }
             session.foreign_currency_breakdown = breakdown
 
+    def _get_multi_currency_session_subquery(self, condition=None):
+        """
+        Subquery of the sessions with foreign payments in the ledger,
+        evaluated in the database instead of as a list of ids.
+
+        Args:
+            condition (SQL): extra HAVING condition on the session's sums
+
+        Returns:
+            SQL: ``(SELECT session_id ...)``, usable as an ``in`` domain value
+        """
+        self.env["pos.session.currency.ledger"].flush_model()
+        having = SQL("SUM(payment_count) > 0")
+        if condition is not None:
+            having = SQL("%s AND %s", having, condition)
+        return SQL(
+            """(
+                SELECT session_id
+                  FROM pos_session_currency_ledger
+              GROUP BY session_id
+                HAVING %s
+            )""",
+            having,
+        )
+
+    def _search_has_foreign_payments(self, operator, value):
+        if operator not in ("=", "!=", "in", "not in"):
+            return NotImplemented
+        if operator in ("in", "not in"):
+            positive = any(value) if operator == "in" else not any(value)
+        else:
+            positive = bool(value) == (operator == "=")
+        return [("id", "in" if positive else "not in", self._get_multi_currency_session_subquery())]
+
+    def _search_manual_rate_edit_count(self, operator, value):
+        comparators = {
+            "=": lambda count: count == value,
+            "!=": lambda count: count != value,
+            ">": lambda count: count > value,
+            ">=": lambda count: count >= value,
+            "<": lambda count: count < value,
+            "<=": lambda count: count <= value,
+            "in": lambda count: count in value,
+            "not in": lambda count: count not in value,
+        }
+        if operator not in comparators:
+            return NotImplemented
+        manual_edits = SQL("COALESCE(SUM(manual_edit_count), 0)")
+        if operator == "in":
+            condition = SQL("%s = ANY(%s)", manual_edits, list(value))
+        elif operator == "not in":
+            condition = SQL("%s <> ALL(%s)", manual_edits, list(value))
+        else:
+            condition = SQL("%s %s %s", manual_edits, SQL(operator), value)
+        if comparators[operator](0):
+            # Sessions without ledger rows have a count of 0 as well
+            excluded = self._get_multi_currency_session_subquery(SQL("NOT (%s)", condition))
+            return [("id", "not in", excluded)]
+        return [("id", "in", self._get_multi_currency_session_subquery(condition))]
+
+    # ─── Session closing: foreign currency accounting ──────────────
+
+    def _get_split_receivable_vals(self, payment, amount, amount_converted):
+        """Carry the payment currency amount on the receivable line of a split payment."""
+        vals = super()._get_split_receivable_vals(payment, amount, amount_converted)
+        currency = payment.payment_currency_id
+        if currency and currency not in (self.currency_id, self.company_id.currency_id):
+            self._set_multi_currency_amount(vals, currency, payment.payment_currency_amount)
+        return vals
+
+    def _create_account_move(self, balancing_account=False, amount_to_balance=0, bank_payment_method_diffs=None):
+        """
+        Give each payment currency of a combined payment method its own
+        receivable line.
+
+        The foreign payment totals are read once for the session and passed
+        down to ``_get_combine_receivable_vals``, which leaves only the
+        session currency remainder on the combined line.  One line per
+        (payment method, payment currency) is then added with
+        ``amount_currency`` and the effective rate in its label.
+        """
+        groups = self._get_multi_currency_combine_groups()
+        data = super(PosSession, self.with_context(pos_multi_move_groups=groups))._create_account_move(
+            balancing_account=balancing_account,
+            amount_to_balance=amount_to_balance,
+            bank_payment_method_diffs=bank_payment_method_diffs,
+        )
+        # Same conditions as the standard closing for creating combined lines
+        combined_method_ids = {method.id for method in data.get("combine_receivables_bank") or {}} | {
+            method.id
+            for method, amounts in (data.get("combine_receivables_cash") or {}).items()
+            if not self.currency_id.is_zero(amounts["amount"])
+        }
+        vals_list = self._get_multi_currency_move_lines_vals(
+            [group for group in groups if group[0] in combined_method_ids]
+        )
+        if vals_list:
+            self.env["account.move.line"].with_context(check_move_validity=False).create(vals_list)
+        return data
+
+    def _validate_session(self, balancing_account=False, amount_to_balance=0, bank_payment_method_diffs=None):
+        res = super()._validate_session(
+            balancing_account=balancing_account,
+            amount_to_balance=amount_to_balance,
+            bank_payment_method_diffs=bank_payment_method_diffs,
+        )
+        self._reconcile_multi_currency_move_lines()
+        return res
+
+    def _get_multi_currency_combine_groups(self):
+        """
+        Foreign payment totals of the session, in the form passed down to
+        ``_get_combine_receivable_vals``.
+
+        Returns:
+            tuple: ((payment_method_id, currency_id, foreign amount,
+                     session currency amount, company currency amount), ...)
+        """
+        self.ensure_one()
+        company = self.company_id
+        date = self.move_id.date or fields.Date.context_today(self)
+        groups = []
+        for method, currency, foreign_amount, base_amount in self._get_multi_currency_move_groups():
+            if method.split_transactions or currency == self.currency_id:
+                continue
+            converted = base_amount
+            if self.currency_id != company.currency_id:
+                converted = self.currency_id._convert(base_amount, company.currency_id, company, date)
+            groups.append((method.id, currency.id, foreign_amount, base_amount, converted))
+        return tuple(groups)
+
+    def _get_combine_receivable_vals(self, payment_method, amount, amount_converted):
+        """Leave only the session currency remainder on the combined receivable line."""
+        for method_id, _currency_id, _foreign, base_amount, converted in (
+            self.env.context.get("pos_multi_move_groups") or ()
+        ):
+            if method_id == payment_method.id:
+                amount -= base_amount
+                amount_converted -= converted
+        return super()._get_combine_receivable_vals(payment_method, amount, amount_converted)
+
+    @instrumented("pos.session._get_multi_currency_move_lines_vals")
+    def _get_multi_currency_move_lines_vals(self, groups):
+        """
+        Receivable lines of the foreign payments of combined methods, one
+        per (payment method, payment currency) of ``groups`` (see
+        ``_get_multi_currency_combine_groups``).
+        """
+        self.ensure_one()
+        company = self.company_id
+        methods = self.env["pos.payment.method"].browse({group[0] for group in groups})
+        currencies = self.env["res.currency"].browse({group[1] for group in groups})
+        vals_list = []
+        for method_id, currency_id, foreign_amount, base_amount, converted in groups:
+            method = methods.browse(method_id)
+            currency = currencies.browse(currency_id)
+            rate = foreign_amount / base_amount if base_amount else 0.0
+            vals_list.append({
+                "name": f"{self.name} - {method.name} ({currency.name} @ {rate:.6f})",
+                "move_id": self.move_id.id,
+                "account_id": (
+                    method.receivable_account_id or company.account_default_pos_receivable_account_id
+                ).id,
+                "currency_id": currency.id,
+                "amount_currency": foreign_amount,
+                "balance": converted,
+            })
+        return vals_list
+
+    def _reconcile_multi_currency_move_lines(self):
+        """
+        Reconcile the per-currency receivable lines with what is left of the
+        payment and cash statement lines they came from, which the standard
+        closing only reconciled with the remainder line.
+        """
+        for session in self:
+            if session.move_id.state != "posted":
+                continue
+            moves = session.move_id | session.bank_payment_ids.move_id | session.statement_line_ids.move_id
+            foreign_lines = session.move_id.line_ids.filtered(
+                lambda line: line.currency_id not in (session.currency_id, session.company_id.currency_id)
+                and line.account_id.reconcile
+                and not line.reconciled
+            )
+            for account in foreign_lines.account_id:
+                moves.line_ids.filtered(
+                    lambda line: line.account_id == account and not line.reconciled
+                ).reconcile()
+
+    @api.model
+    def _set_multi_currency_amount(self, vals, currency, foreign_amount):
+        """Express a receivable line of the session move in ``currency``."""
+        balance = vals.get("balance", vals.get("debit", 0.0) - vals.get("credit", 0.0))
+        vals.update(
+            currency_id=currency.id,
+            amount_currency=math.copysign(abs(foreign_amount), balance) if balance else foreign_amount,
+        )
+
+    def _get_multi_currency_move_groups(self):
+        """
+        Foreign payment totals per (payment method, payment currency).
+
+        One grouped query over pos.payment, whatever the number of orders.
+        """
+        self.ensure_one()
+        return self.env["pos.payment"]._read_group(
+            [
+                ("session_id", "=", self.id),
+                ("payment_currency_id", "!=", False),
+                ("payment_currency_id", "!=", self.company_id.currency_id.id),
+            ],
+            groupby=["payment_method_id", "payment_currency_id"],
+            aggregates=["payment_currency_amount:sum", "amount:sum"],
+        )
+
+    # ─── Session closing: foreign currency cash control ────────────
+
+    def _get_multi_currency_cash_groups(self):
+        """
+        Foreign cash payment totals per payment currency.
+
+        One grouped query over the payments of the session's cash method
+        (the one used for the cash register balance), whatever the number
+        of payments.
+
+        Returns:
+            dict: {currency: (foreign amount, session currency amount)}
+        """
+        self.ensure_one()
+        cash_method = self.payment_method_ids.filtered("is_cash_count")[:1]
+        if not cash_method:
+            return {}
+        groups = self.env["pos.payment"]._read_group(
+            [
+                ("session_id", "=", self.id),
+                ("payment_method_id", "=", cash_method.id),
+                ("payment_currency_id", "!=", False),
+                ("payment_currency_id", "!=", self.currency_id.id),
+            ],
+            groupby=["payment_currency_id"],
+            aggregates=["payment_currency_amount:sum", "amount:sum"],
+        )
+        return {currency: (foreign, base) for currency, foreign, base in groups}
+
+    def _get_multi_currency_cash_opening(self):
+        """
+        Foreign cash left in the drawer: the counts of the previous session.
+
+        Returns:
+            dict: {currency: (foreign amount, value in the session cash balance)}
+        """
+        self.ensure_one()
+        previous = self.search([
+            ("config_id", "=", self.config_id.id),
+            ("state", "=", "closed"),
+            ("id", "<", self.id),
+        ], order="id desc", limit=1)
+        return {
+            cash.currency_id: (cash.counted_amount, cash.counted_base_amount)
+            for cash in previous.multi_currency_cash_ids
+        }
+
+    def _get_multi_currency_cash_details(self):
+        """
+        Expected (and already counted) foreign cash per currency.
+
+        Returns:
+            list: [{currency_id, name, symbol, rounding, decimal_places, position,
+                    opening, opening_base, payment_amount, base_amount,
+                    expected, counted}, ...]  (counted is None until submitted)
+        """
+        self.ensure_one()
+        if not (self.config_id.multi_currency_enabled and self.config_id.cash_control):
+            return []
+        groups = self._get_multi_currency_cash_groups()
+        opening = self._get_multi_currency_cash_opening()
+        counted = {cash.currency_id: cash.counted_amount for cash in self.multi_currency_cash_ids}
+        details = []
+        for currency in sorted(groups.keys() | opening.keys(), key=lambda c: c.name):
+            payment_amount, base_amount = groups.get(currency, (0.0, 0.0))
+            opening_amount, opening_base = opening.get(currency, (0.0, 0.0))
+            details.append({
+                "currency_id": currency.id,
+                "name": currency.name,
+                "symbol": currency.symbol,
+                "rounding": currency.rounding,
+                "decimal_places": currency.decimal_places,
+                "position": currency.position,
+                "opening": opening_amount,
+                "opening_base": opening_base,
+                "payment_amount": payment_amount,
+                "base_amount": base_amount,
+                "expected": currency.round(opening_amount + payment_amount),
+                "counted": counted.get(currency),
+            })
+        return details
+
+    def _convert_multi_currency_cash(self, detail, amount):
+        """
+        Convert a foreign cash amount to the session currency at the average
+        rate of the session's cash payments in that currency (market rate
+        when there were none).
+        """
+        if detail["payment_amount"]:
+            return self.currency_id.round(
+                amount * detail["base_amount"] / detail["payment_amount"]
+            )
+        currency = self.env["res.currency"].browse(detail["currency_id"])
+        return currency._convert(
+            amount, self.currency_id, self.company_id, fields.Date.context_today(self)
+        )
+
+    def get_closing_control_data(self):
+        data = super().get_closing_control_data()
+        details = self._get_multi_currency_cash_details()
+        data["multi_currency_cash_details"] = details
+        cash_details = data.get("default_cash_details")
+        if cash_details and details:
+            # Foreign notes are counted separately, not in the base drawer:
+            # neither this session's foreign payments nor the foreign float
+            # carried over in the opening balance
+            opening_base = sum(detail["opening_base"] for detail in details)
+            payment_base = sum(detail["base_amount"] for detail in details)
+            cash_details["amount"] -= opening_base + payment_base
+            cash_details["payment_amount"] -= payment_base
+            if "opening" in cash_details:
+                cash_details["opening"] -= opening_base
+        return data
+
+    def start_multi_currency_cash_count(self):
+        """Put the session in closing control so its foreign cash can be counted."""
+        self.ensure_one()
+        if self.state == "closed":
+            raise UserError("This session is already closed.")
+        if self.state != "closing_control":
+            self.write({"state": "closing_control", "stop_at": fields.Datetime.now()})
+        return {"successful": True}
+
+    def set_multi_currency_cash_counts(self, counts):
+        """
+        Record the foreign cash counted at closing.  Only allowed while
+        the session is in closing control, so the counts of a closed
+        session (the next session's opening float) cannot be rewritten.
+
+        Args:
+            counts (dict): {currency_id: counted amount}
+        """
+        self.ensure_one()
+        if self.state != "closing_control":
+            raise UserError("Foreign cash can only be counted while the session is being closed.")
+        return self._set_multi_currency_cash_counts(counts)
+
+    def _set_multi_currency_cash_counts(self, counts):
+        self.ensure_one()
+        details = {detail["currency_id"]: detail for detail in self._get_multi_currency_cash_details()}
+        existing = {cash.currency_id.id: cash for cash in self.multi_currency_cash_ids}
+        vals_list = []
+        for currency_id, counted in counts.items():
+            detail = details.get(int(currency_id))  # JSON keys are strings
+            if not detail:
+                continue
+            currency = self.env["res.currency"].browse(detail["currency_id"])
+            counted = currency.round(counted or 0.0)
+            vals = self._prepare_multi_currency_cash_vals(detail, counted)
+            if currency.id in existing:
+                existing[currency.id].sudo().write(vals)
+            else:
+                vals_list.append({**vals, "session_id": self.id, "currency_id": currency.id})
+        self.env["pos.session.currency.cash"].sudo().create(vals_list)
+        return {"successful": True}
+
+    def _prepare_multi_currency_cash_vals(self, detail, counted):
+        """
+        Cash control values of one currency.  The counted amount is valued
+        in the session cash balance as the opening float at the value it
+        was carried over with, plus the rest at the session's rate, so the
+        float never creates a difference in a later session.
+        """
+        return {
+            "opening_amount": detail["opening"],
+            "opening_base_amount": detail["opening_base"],
+            "payment_amount": detail["payment_amount"],
+            "expected_amount": detail["expected"],
+            "counted_amount": counted,
+            "counted_base_amount": detail["opening_base"] + self._convert_multi_currency_cash(
+                detail, counted - detail["opening"]
+            ),
+            "base_difference": self._convert_multi_currency_cash(
+                detail, counted - detail["expected"]
+            ),
+        }
+
+    def post_closing_cash_details(self, counted_cash):
+        # The session cash balance includes the foreign cash (the float
+        # carried over and this session's payments): add back its counted
+        # value.  Uncounted currencies are recorded as counted as expected,
+        # so the next session opens with their float.
+        details = self._get_multi_currency_cash_details()
+        uncounted = {
+            detail["currency_id"]: detail["expected"]
+            for detail in details if detail["counted"] is None
+        }
+        if uncounted:
+            self._set_multi_currency_cash_counts(uncounted)
+        cash_by_currency = {cash.currency_id.id: cash for cash in self.multi_currency_cash_ids}
+        for detail in details:
+            counted_cash += cash_by_currency[detail["currency_id"]].counted_base_amount
+        return super().post_closing_cash_details(counted_cash)
+
     # ─── Methods ────────────────────────────────────────────────────
 
     def action_view_foreign_currency_breakdown(self):
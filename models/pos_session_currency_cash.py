@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+
+class PosSessionCurrencyCash(models.Model):
+    """
+    Cash control of one foreign currency drawer at session closing.
+
+    Expected amounts are computed from the session's cash payments when
+    the cashier submits the count; the counted amount and the difference
+    are kept for audit.
+    """
+    _name = "pos.session.currency.cash"
+    _description = "POS Session Foreign Currency Cash Control"
+    _order = "session_id, currency_id"
+
+    session_id = fields.Many2one(
+        "pos.session",
+        string="Session",
+        required=True,
+        index=True,
+        ondelete="cascade",
+        readonly=True,
+    )
+    currency_id = fields.Many2one(
+        "res.currency",
+        string="Currency",
+        required=True,
+        readonly=True,
+    )
+    opening_amount = fields.Monetary(
+        string="Opening",
+        readonly=True,
+        help="Amount counted at the closing of the previous session.",
+    )
+    payment_amount = fields.Monetary(
+        string="Cash Payments",
+        readonly=True,
+    )
+    expected_amount = fields.Monetary(
+        string="Expected",
+        readonly=True,
+    )
+    counted_amount = fields.Monetary(
+        string="Counted",
+        readonly=True,
+    )
+    difference = fields.Monetary(
+        string="Difference",
+        compute="_compute_difference",
+        store=True,
+    )
+    opening_base_amount = fields.Monetary(
+        string="Opening (Session Currency)",
+        currency_field="session_currency_id",
+        readonly=True,
+        help="Value of the opening amount in the session cash balance, as "
+             "carried over from the previous session.",
+    )
+    counted_base_amount = fields.Monetary(
+        string="Counted (Session Currency)",
+        currency_field="session_currency_id",
+        readonly=True,
+        help="Value of the counted amount included in the session cash balance "
+             "at closing; the next session opens with it.",
+    )
+    base_difference = fields.Monetary(
+        string="Difference (Session Currency)",
+        currency_field="session_currency_id",
+        readonly=True,
+        help="Difference converted at the average rate of the session's cash payments.",
+    )
+    session_currency_id = fields.Many2one(related="session_id.currency_id")
+
+    _session_currency_uniq = models.Constraint(
+        "UNIQUE(session_id, currency_id)",
+        "Only one cash count per session and currency is allowed.",
+    )
+
+    @api.depends("expected_amount", "counted_amount")
+    def _compute_difference(self):
+        for cash in self:
+            cash.difference = cash.counted_amount - cash.expected_amount
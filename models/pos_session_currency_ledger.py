@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+
+class PosSessionCurrencyLedger(models.Model):
+    """
+    Append-only ledger of foreign currency payment deltas per session.
+
+    Every create / write / unlink of a pos.payment appends signed delta rows
+    here instead of rewriting aggregates on the pos_session row, so
+    terminals sharing a session never contend on the same row lock.
+    Session totals are obtained by summing the ledger.
+    """
+    _name = "pos.session.currency.ledger"
+    _description = "POS Session Currency Ledger"
+    _order = "id"
+
+    session_id = fields.Many2one(
+        "pos.session",
+        string="Session",
+        required=True,
+        index=True,
+        ondelete="cascade",
+        readonly=True,
+    )
+    config_id = fields.Many2one(
+        "pos.config",
+        string="Point of Sale",
+        index=True,
+        readonly=True,
+    )
+    order_id = fields.Many2one(
+        "pos.order",
+        string="Order",
+        index=True,
+        ondelete="cascade",
+        readonly=True,
+    )
+    company_id = fields.Many2one(
+        related="session_id.company_id",
+        store=True,
+        index=True,
+    )
+    currency_id = fields.Many2one(
+        "res.currency",
+        string="Payment Currency",
+        required=True,
+        readonly=True,
+    )
+    amount_foreign = fields.Float(
+        string="Foreign Amount",
+        digits="Product Price",
+        readonly=True,
+        help="Signed delta of the amount expressed in the payment currency.",
+    )
+    amount_base = fields.Float(
+        string="Base Amount",
+        digits="Product Price",
+        readonly=True,
+        help="Signed delta of the amount expressed in the order currency.",
+    )
+    payment_count = fields.Integer(
+        string="Payments",
+        readonly=True,
+        help="+1 when a foreign payment is recorded, -1 when it is reversed.",
+    )
+    manual_edit_count = fields.Integer(
+        string="Manual Rate Edits",
+        readonly=True,
+    )
+
+    def write(self, vals):
+        raise UserError("Currency ledger entries are append-only and cannot be modified.")
+
+    # ─── Aggregation ────────────────────────────────────────────────
+
+    @api.model
+    def _get_session_breakdown(self, session_ids):
+        """
+        Sum the ledger per (session, currency) for the given sessions.
+
+        Returns:
+            dict: {session_id: {currency_id: {total_foreign_amount,
+                   total_base_amount, payment_count, order_count,
+                   manual_edits}}}
+        """
+        result = {session_id: {} for session_id in session_ids}
+        if not session_ids:
+            return result
+
+        self.flush_model()
+        # Orders are only counted while they still hold at least one
+        # payment in the currency (reversed rows net out to zero).
+        self.env.cr.execute(
+            """
+            WITH per_order AS (
+                SELECT session_id,
+                       currency_id,
+                       order_id,
+                       SUM(amount_foreign) AS amount_foreign,
+                       SUM(amount_base) AS amount_base,
+                       SUM(payment_count) AS payment_count,
+                       SUM(manual_edit_count) AS manual_edit_count
+                  FROM pos_session_currency_ledger
+                 WHERE session_id = ANY(%s)
+              GROUP BY session_id, currency_id, order_id
+                HAVING SUM(payment_count) > 0
+            )
+            SELECT session_id,
+                   currency_id,
+                   SUM(amount_foreign),
+                   SUM(amount_base),
+                   SUM(payment_count),
+                   SUM(manual_edit_count),
+                   COUNT(order_id)
+              FROM per_order
+          GROUP BY session_id, currency_id
+            """,
+            [list(session_ids)],
+        )
+        for (session_id, currency_id, amount_foreign, amount_base,
+             payment_count, manual_edits, order_count) in self.env.cr.fetchall():
+            result[session_id][currency_id] = {
+                "total_foreign_amount": amount_foreign or 0.0,
+                "total_base_amount": amount_base or 0.0,
+                "payment_count": int(payment_count or 0),
+                "order_count": int(order_count or 0),
+                "manual_edits": int(manual_edits or 0),
+            }
+        return result
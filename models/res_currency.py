@@ -1,12 +1,164 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
+import csv
+import io
+import itertools
+from bisect import bisect_right
+
+from odoo import models, fields, api, tools
+from odoo.tools import float_round
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Cache key of the rates changed by a transaction until its commit
+_RATE_CACHE_TOKENS = itertools.count()
 
 
 class ResCurrency(models.Model):
     _inherit = "res.currency"
 
+    pos_rate_version = fields.Integer(
+        string="POS Rate Version",
+        readonly=True,
+        copy=False,
+        default=0,
+        help="Technical: value of the rate version sequence when this currency's "
+             "rates last changed. Lets POS terminals fetch only changed rates.",
+    )
+
+    def init(self):
+        super().init()
+        # Versions are drawn when the rate changes commit (see
+        # _bump_pos_rate_version), under a lock, so they follow commit order.
+        self.env.cr.execute(
+            "CREATE SEQUENCE IF NOT EXISTS pos_multi_rate_version_seq"
+        )
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Currencies are serialized in the cached POS multi-currency data
+        # (see pos.config._get_multi_currency_pos_data)
+        if {"name", "symbol", "rounding", "decimal_places", "position", "active"}.intersection(vals):
+            self.env["pos.config"].sudo().with_context(active_test=False).search(
+                []
+            )._bump_multi_currency_data_version()
+        return res
+
+    # ─── Rate snapshots ─────────────────────────────────────────────
+
+    def _bump_pos_rate_version(self):
+        """
+        Mark the rates of these currencies as changed.
+
+        Their new version is drawn right before commit, while holding a
+        transaction lock that other rate changes wait for: a terminal that
+        saw version N has seen every change with a version up to N, which a
+        version drawn at write time does not guarantee with concurrent
+        transactions.  Open POS sessions are notified at the same time.
+        """
+        if not self:
+            return
+        data = self.env.cr.precommit.data
+        pending = data.get("pos_multi.rate_changed_currency_ids")
+        # A new key on every change: entries cached after an earlier
+        # change of the same transaction are stale now
+        data["pos_multi.rate_cache_token"] = next(_RATE_CACHE_TOKENS)
+        if pending is None:
+            pending = data["pos_multi.rate_changed_currency_ids"] = set()
+            env = self.env
+
+            @self.env.cr.precommit.add
+            def assign_rate_version():
+                currencies = env["res.currency"].browse(
+                    sorted(data.pop("pos_multi.rate_changed_currency_ids", ()))
+                )
+                data.pop("pos_multi.rate_cache_token", None)
+                env.cr.execute("SELECT pg_advisory_xact_lock(hashtext('pos_multi_rate_version'))")
+                env.cr.execute("SELECT nextval('pos_multi_rate_version_seq')")
+                version = env.cr.fetchone()[0]
+                env.cr.execute(
+                    "UPDATE res_currency SET pos_rate_version = %s WHERE id = ANY(%s)",
+                    [version, currencies.ids],
+                )
+                currencies.invalidate_recordset(["pos_rate_version"])
+                env["pos.config"]._notify_multi_currency_rate_change(currencies)
+
+        pending.update(self.ids)
+
+    def _get_pos_rate_cache_key(self):
+        """
+        Key of the cached rates of the currencies in self: their rate
+        versions.  Replaces clearing the caches on every rate change.
+
+        Rates changed by the current transaction have no version before
+        commit; they get a key of their own, so their uncommitted values
+        are never served to other transactions.
+        """
+        data = self.env.cr.precommit.data
+        pending = data.get("pos_multi.rate_changed_currency_ids")
+        if pending and not pending.isdisjoint(self.ids):
+            return ("pending", data["pos_multi.rate_cache_token"])
+        return tuple(currency.pos_rate_version for currency in self.browse(sorted(self.ids)))
+
+    @api.model
+    def _get_pos_rate_snapshot(self, company, currencies, date=None):
+        """
+        Return the rate snapshot of ``currencies`` for ``company``.
+
+        Returns:
+            dict: {
+                "version": int,          # max rate version of the set
+                "date": str,
+                "base_currency_id": int, # company currency (rate 1.0)
+                "rates": {currency_id: rate},
+                "versions": {currency_id: version},
+            }
+            rate means: 1 unit of company currency = rate units of currency.
+        """
+        date = fields.Date.to_string(date or fields.Date.today())
+        snapshot = self._get_pos_rate_snapshot_cached(
+            company.id,
+            tuple(sorted(currencies.ids)),
+            date,
+            (currencies | company.currency_id)._get_pos_rate_cache_key(),
+        )
+        return {
+            **snapshot,
+            "rates": dict(snapshot["rates"]),
+            "versions": dict(snapshot["versions"]),
+        }
+
+    @api.model
+    @tools.ormcache("company_id", "currency_ids", "date", "cache_key")
+    def _get_pos_rate_snapshot_cached(self, company_id, currency_ids, date, cache_key):
+        company = self.env["res.company"].browse(company_id)
+        base = company.currency_id
+        currencies = self.browse(currency_ids) | base
+        # One rate query for the whole set instead of one ``rate``
+        # compute per currency
+        raw_rates = currencies.with_context(active_test=False)._get_rates(company, date)
+        base_rate = raw_rates.get(base.id) or 1.0
+        rates = {}
+        versions = {}
+        for currency in currencies:
+            rates[currency.id] = (
+                1.0 if currency == base else (raw_rates.get(currency.id) or 1.0) / base_rate
+            )
+            versions[currency.id] = currency.pos_rate_version
+        return {
+            "version": max(versions.values()),
+            "date": date,
+            "base_currency_id": base.id,
+            "rates": rates,
+            "versions": versions,
+        }
+
+    # ─── Conversion ─────────────────────────────────────────────────
+
     @api.model
-    def _get_conversion_rate(self, from_currency, to_currency, company, date):
+    def _get_conversion_rate(self, from_currency, to_currency, company=None, date=None):
         """
         Return conversion rate from one currency to another.
         This is a MODEL method (not instance method) to match Odoo's standard signature.
@@ -17,8 +169,8 @@ class ResCurrency(models.Model):
         Args:
             from_currency: res.currency record to convert from
             to_currency: res.currency record to convert to
-            company: res.company record
-            date: date for exchange rate
+            company: res.company record (defaults to the current company)
+            date: date for exchange rate (defaults to today)
             
         Returns:
             float: conversion rate where 1 from_currency = X to_currency
@@ -34,16 +186,426 @@ class ResCurrency(models.Model):
         # Ensure we have valid single records
         from_currency.ensure_one()
         to_currency.ensure_one()
+        company = company or self.env.company
         company.ensure_one()
-        
-        # Use Odoo's standard _convert method
-        # Convert 1.0 from from_currency to to_currency
-        rate = from_currency._convert(
-            1.0,              # amount to convert
-            to_currency,      # target currency
-            company,          # company
-            date,             # date
-            round=False       # don't round the rate
+
+        # Memoized per (from, to, company, date) and rate versions (see
+        # _get_pos_rate_cache_key)
+        date = fields.Date.to_string(
+            fields.Date.to_date(date) or fields.Date.context_today(self)
         )
-        
-        return rate
\ No newline at end of file
+        return self._get_conversion_rate_cached(
+            from_currency.id,
+            to_currency.id,
+            company.id,
+            date,
+            (from_currency | to_currency)._get_pos_rate_cache_key(),
+        )
+
+    @api.model
+    @tools.ormcache("from_currency_id", "to_currency_id", "company_id", "date", "cache_key")
+    def _get_conversion_rate_cached(self, from_currency_id, to_currency_id, company_id, date,
+                                    cache_key):
+        # Same computation as the standard rate lookup. Going through
+        # _convert() would call back into _get_conversion_rate.
+        company = self.env["res.company"].browse(company_id)
+        currencies = self.browse([from_currency_id, to_currency_id])
+        rates = currencies.with_context(active_test=False)._get_rates(company, date)
+        return rates.get(to_currency_id) / rates.get(from_currency_id)
+
+    def _get_cross_rate_matrix(self, company=None, date=None):
+        """
+        Return the conversion rates between every pair of currencies in self.
+
+        All rates come from a single rate query, so callers converting many
+        amounts can build the matrix once and look rates up in memory.
+
+        Returns:
+            dict: {from_currency_id: {to_currency_id: rate}}
+                  where 1 from_currency = rate to_currency.
+                  The dict is shared with the cache and must not be modified.
+        """
+        company = company or self.env.company
+        date = fields.Date.to_string(
+            fields.Date.to_date(date) or fields.Date.context_today(self)
+        )
+        return self.env["res.currency"]._get_cross_rate_matrix_cached(
+            tuple(sorted(self.ids)), company.id, date, self._get_pos_rate_cache_key()
+        )
+
+    @api.model
+    @tools.ormcache("currency_ids", "company_id", "date", "cache_key")
+    def _get_cross_rate_matrix_cached(self, currency_ids, company_id, date, cache_key):
+        company = self.env["res.company"].browse(company_id)
+        rates = self.browse(currency_ids).with_context(active_test=False)._get_rates(
+            company, date
+        )
+        return {
+            from_id: {
+                to_id: 1.0 if from_id == to_id else rates[to_id] / rates[from_id]
+                for to_id in currency_ids
+            }
+            for from_id in currency_ids
+        }
+
+    # ─── Rate timelines ─────────────────────────────────────────────
+
+    def _get_rate_timelines(self, company, date_from, date_to):
+        """
+        Load the rate history of the currencies in self for ``company``
+        over [date_from, date_to] with a single query.
+
+        Only the rates needed to answer any date of the range are read:
+        those inside it, the last one before it and the earliest one
+        (used as fallback for dates before the first rate).
+
+        Returns:
+            dict: {currency_id: {"company": (dates, rates),
+                                 "global": (dates, rates)}}
+                  with ascending dates; look rates up with
+                  ``_get_timeline_rate``.
+        """
+        company_id = company.root_id.id
+        timelines = {
+            currency_id: {"company": ([], []), "global": ([], [])}
+            for currency_id in self.ids
+        }
+        if not self:
+            return timelines
+        self.env["res.currency.rate"].flush_model(["currency_id", "company_id", "name", "rate"])
+        self.env.cr.execute(
+            """
+            SELECT currency_id, is_company, name, rate
+              FROM (
+                  SELECT currency_id,
+                         company_id IS NOT NULL AS is_company,
+                         name,
+                         rate,
+                         ROW_NUMBER() OVER (
+                             PARTITION BY currency_id, company_id IS NOT NULL
+                                 ORDER BY name
+                         ) AS first_rank,
+                         ROW_NUMBER() OVER (
+                             PARTITION BY currency_id, company_id IS NOT NULL,
+                                          name < %(date_from)s
+                                 ORDER BY name DESC
+                         ) AS before_rank
+                    FROM res_currency_rate
+                   WHERE currency_id = ANY(%(currency_ids)s)
+                     AND (company_id IS NULL OR company_id = %(company_id)s)
+              ) r
+             WHERE (name >= %(date_from)s AND name <= %(date_to)s)
+                OR (name < %(date_from)s AND before_rank = 1)
+                OR first_rank = 1
+          ORDER BY currency_id, is_company, name
+            """,
+            {
+                "currency_ids": self.ids,
+                "company_id": company_id,
+                "date_from": fields.Date.to_date(date_from),
+                "date_to": fields.Date.to_date(date_to),
+            },
+        )
+        for currency_id, is_company, date, rate in self.env.cr.fetchall():
+            dates, rates = timelines[currency_id]["company" if is_company else "global"]
+            dates.append(date)
+            rates.append(rate)
+        return timelines
+
+    @api.model
+    def _get_timeline_rate(self, timeline, date):
+        """
+        Rate of a ``_get_rate_timelines`` entry at ``date``, with the same
+        precedence as ``_get_rates``: the latest company rate on or before
+        the date, else the latest shared rate, else the earliest rate,
+        else 1.0.
+        """
+        for key in ("company", "global"):
+            dates, rates = timeline[key]
+            index = bisect_right(dates, date)
+            if index:
+                return rates[index - 1]
+        for key in ("company", "global"):
+            rates = timeline[key][1]
+            if rates:
+                return rates[0]
+        return 1.0
+
+    @api.model
+    def _get_timeline_rates_array(self, timeline, dates):
+        """Vectorized ``_get_timeline_rate`` for a numpy array of datetime64[D] dates."""
+        result = numpy.ones(len(dates))
+        unresolved = numpy.ones(len(dates), dtype=bool)
+        for key in ("company", "global"):
+            timeline_dates, timeline_rates = timeline[key]
+            if not timeline_dates:
+                continue
+            index = numpy.searchsorted(
+                numpy.array(timeline_dates, dtype="datetime64[D]"), dates, side="right"
+            )
+            found = unresolved & (index > 0)
+            result[found] = numpy.array(timeline_rates)[index[found] - 1]
+            unresolved &= ~found
+        if unresolved.any():
+            fallback = timeline["company"][1] or timeline["global"][1]
+            result[unresolved] = fallback[0] if fallback else 1.0
+        return result
+
+    @api.model
+    def _convert_batch(self, amounts, from_currency_ids, to_currency, company, dates, round=True):
+        """
+        Convert many amounts, each from its own currency at its own date,
+        into ``to_currency``.
+
+        Gives the same results as calling ``_convert`` for every amount,
+        but loads the rates once (see ``_get_rate_timelines``) and computes
+        in memory, vectorized with numpy when it is installed.
+
+        Args:
+            amounts (list): Amounts to convert.
+            from_currency_ids (list): Currency id of each amount.
+            to_currency: Target res.currency record.
+            company: res.company record whose rates are used.
+            dates (list): Conversion date (date or datetime) of each amount.
+            round (bool): Round the results to ``to_currency``.
+
+        Returns:
+            list: Converted amounts, in the order of ``amounts``.
+        """
+        if not amounts:
+            return []
+        days = [fields.Date.to_date(date) for date in dates]
+        currencies = self.browse(set(from_currency_ids)) | to_currency
+        timelines = currencies._get_rate_timelines(company, min(days), max(days))
+
+        if numpy is not None:
+            from_ids = numpy.asarray(from_currency_ids)
+            day_array = numpy.array(days, dtype="datetime64[D]")
+            from_rates = numpy.empty(len(from_ids))
+            for currency_id in numpy.unique(from_ids):
+                mask = from_ids == currency_id
+                from_rates[mask] = self._get_timeline_rates_array(
+                    timelines[int(currency_id)], day_array[mask]
+                )
+            to_rates = self._get_timeline_rates_array(timelines[to_currency.id], day_array)
+            rates = to_rates / from_rates
+            rates[from_ids == to_currency.id] = 1.0
+            converted = (numpy.asarray(amounts, dtype=float) * rates).tolist()
+        else:
+            to_timeline = timelines[to_currency.id]
+            converted = [
+                amount if currency_id == to_currency.id else amount * (
+                    self._get_timeline_rate(to_timeline, day)
+                    / self._get_timeline_rate(timelines[currency_id], day)
+                )
+                for amount, currency_id, day in zip(amounts, from_currency_ids, days)
+            ]
+
+        if round:
+            rounding = to_currency.rounding
+            converted = [
+                float_round(amount, precision_rounding=rounding) for amount in converted
+            ]
+        return converted
+
+    @api.model
+    def get_cross_rate_matrix(self, currency_ids, date=None):
+        """
+        RPC entry point returning the cross-rate matrix of ``currency_ids``
+        for the current company.
+        """
+        matrix = self.browse(currency_ids)._get_cross_rate_matrix(date=date)
+        return {
+            from_id: dict(row)
+            for from_id, row in matrix.items()
+        }
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = "res.currency.rate"
+
+    # Latest rate on or before a date, per currency and company: rate
+    # timelines and the anomaly report's LATERAL lookups
+    _pos_multi_currency_company_name_idx = models.Index("(currency_id, company_id, name DESC)")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rates = super().create(vals_list)
+        rates.currency_id._bump_pos_rate_version()
+        return rates
+
+    def write(self, vals):
+        currencies = self.currency_id
+        res = super().write(vals)
+        (currencies | self.currency_id)._bump_pos_rate_version()
+        return res
+
+    def unlink(self):
+        currencies = self.currency_id
+        res = super().unlink()
+        currencies._bump_pos_rate_version()
+        return res
+
+    # ─── Bulk import ────────────────────────────────────────────────
+
+    @api.model
+    def _pos_multi_bulk_import(self, rows, company=None, chunk_size=100000):
+        """
+        Load many rates at once, with insert-or-update semantics on
+        (currency, day, company).
+
+        Rows are streamed with COPY into a temporary table and merged with
+        two set-based statements.  The unique index on (name, currency_id,
+        company_id) cannot serve ON CONFLICT since shared rates have a NULL
+        company, so existing rates are updated first and the rest inserted,
+        under a lock that only blocks concurrent rate writers.  Rates whose
+        value does not change are left untouched: only the currencies that
+        actually changed get their caches dropped and their POS configs
+        notified (see ``res.currency._bump_pos_rate_version``).
+
+        Args:
+            rows: Iterable of (line, currency_code, date, rate, company_id)
+                  tuples, see ``tools.rate_import.iter_rate_rows``; the last
+                  row wins for duplicate keys.  Rates of a company are
+                  stored on its root company.
+            company: res.company of rows without company_id; shared rates
+                     when empty.
+
+        Returns:
+            dict: {"rows": int, "inserted": int, "updated": int,
+                   "unchanged": int, "unknown_currencies": [str],
+                   "currency_ids": [int]}
+
+        Raises:
+            ValueError: A row names a company that does not exist.
+        """
+        cr = self.env.cr
+        default_company_id = company.root_id.id if company else None
+        self.flush_model()
+        cr.execute(
+            """
+            CREATE TEMP TABLE pos_multi_rate_import (
+                seq bigserial,
+                currency_code varchar,
+                name date,
+                rate numeric,
+                company_id integer
+            ) ON COMMIT DROP
+            """
+        )
+        row_count = 0
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def copy_buffer():
+            buffer.seek(0)
+            cr.copy_expert(
+                "COPY pos_multi_rate_import (currency_code, name, rate, company_id) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+            buffer.seek(0)
+            buffer.truncate()
+
+        root_company_ids = {}  # {file company id: root company id}
+
+        def resolve_company(line, company_id):
+            # Rates are shared by a company tree, see res.company.root_id
+            if company_id not in root_company_ids:
+                file_company = self.env["res.company"].browse(company_id).exists()
+                if not file_company:
+                    raise ValueError(f"Invalid rate on line {line}: unknown company {company_id}")
+                root_company_ids[company_id] = file_company.root_id.id
+            return root_company_ids[company_id]
+
+        for line, code, date, rate, company_id in rows:
+            writer.writerow([
+                code,
+                date.isoformat(),
+                repr(rate),
+                resolve_company(line, company_id) if company_id is not None
+                else default_company_id or "",
+            ])
+            row_count += 1
+            if not row_count % chunk_size:
+                copy_buffer()
+        copy_buffer()
+
+        cr.execute(
+            """
+            SELECT DISTINCT i.currency_code
+              FROM pos_multi_rate_import i
+         LEFT JOIN res_currency c ON c.name = i.currency_code
+             WHERE c.id IS NULL
+          ORDER BY i.currency_code
+            """
+        )
+        unknown_currencies = [code for (code,) in cr.fetchall()]
+
+        cr.execute("LOCK TABLE res_currency_rate IN SHARE ROW EXCLUSIVE MODE")
+        cr.execute(
+            """
+            CREATE TEMP TABLE pos_multi_rate_import_resolved ON COMMIT DROP AS
+            SELECT DISTINCT ON (c.id, i.name, i.company_id)
+                   c.id AS currency_id, i.name, i.rate, i.company_id
+              FROM pos_multi_rate_import i
+              JOIN res_currency c ON c.name = i.currency_code
+          ORDER BY c.id, i.name, i.company_id, i.seq DESC
+            """
+        )
+        resolved_count = cr.rowcount
+        params = {"uid": self.env.uid}
+        cr.execute(
+            """
+            UPDATE res_currency_rate r
+               SET rate = v.rate,
+                   write_uid = %(uid)s,
+                   write_date = NOW() AT TIME ZONE 'UTC'
+              FROM pos_multi_rate_import_resolved v
+             WHERE r.currency_id = v.currency_id
+               AND r.name = v.name
+               AND r.company_id IS NOT DISTINCT FROM v.company_id
+               AND r.rate IS DISTINCT FROM v.rate
+         RETURNING r.currency_id
+            """,
+            params,
+        )
+        updated_currency_ids = [currency_id for (currency_id,) in cr.fetchall()]
+        cr.execute(
+            """
+            INSERT INTO res_currency_rate (
+                currency_id, name, rate, company_id,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT v.currency_id, v.name, v.rate, v.company_id,
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM pos_multi_rate_import_resolved v
+             WHERE NOT EXISTS (
+                 SELECT 1
+                   FROM res_currency_rate r
+                  WHERE r.currency_id = v.currency_id
+                    AND r.name = v.name
+                    AND r.company_id IS NOT DISTINCT FROM v.company_id
+             )
+         RETURNING currency_id
+            """,
+            params,
+        )
+        inserted_currency_ids = [currency_id for (currency_id,) in cr.fetchall()]
+        cr.execute("DROP TABLE pos_multi_rate_import, pos_multi_rate_import_resolved")
+
+        currencies = self.env["res.currency"].browse(
+            sorted(set(updated_currency_ids + inserted_currency_ids))
+        )
+        if currencies:
+            self.invalidate_model()
+            currencies.invalidate_recordset()
+            currencies._bump_pos_rate_version()
+        return {
+            "rows": row_count,
+            "inserted": len(inserted_currency_ids),
+            "updated": len(updated_currency_ids),
+            "unchanged": resolved_count - len(inserted_currency_ids) - len(updated_currency_ids),
+            "unknown_currencies": unknown_currencies,
+            "currency_ids": currencies.ids,
+        }
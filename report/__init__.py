@@ -0,0 +1,2 @@
+from . import pos_multi_currency_payment_report
+from . import pos_multi_currency_rate_anomaly
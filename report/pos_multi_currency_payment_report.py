@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, tools
+from odoo.tools import SQL
+
+
+class PosMultiCurrencyPaymentReport(models.Model):
+    """
+    Read-only analysis of foreign currency payments.
+
+    Backed by a Postgres view over pos_payment joined to orders, sessions
+    and configs, so pivot and graph views aggregate in SQL instead of
+    computing anything per payment in Python.
+    """
+    _name = "report.pos.multi.currency.payment"
+    _description = "POS Multi-Currency Payment Analysis"
+    _auto = False
+    _order = "payment_date desc"
+
+    payment_date = fields.Datetime(string="Payment Date", readonly=True)
+    date = fields.Date(string="Day", readonly=True)
+    currency_id = fields.Many2one("res.currency", string="Payment Currency", readonly=True)
+    config_id = fields.Many2one("pos.config", string="Point of Sale", readonly=True)
+    session_id = fields.Many2one("pos.session", string="Session", readonly=True)
+    order_id = fields.Many2one("pos.order", string="Order", readonly=True)
+    payment_method_id = fields.Many2one("pos.payment.method", string="Payment Method", readonly=True)
+    company_id = fields.Many2one("res.company", string="Company", readonly=True)
+    foreign_amount = fields.Float(string="Foreign Amount", digits="Product Price", readonly=True)
+    base_amount = fields.Float(string="Base Amount", digits="Product Price", readonly=True)
+    effective_rate = fields.Float(
+        string="Effective Rate",
+        digits=(16, 6),
+        aggregator="avg",
+        readonly=True,
+        help="Foreign amount / base amount of the payment. Grouped, the total "
+             "foreign amount / the total base amount.",
+    )
+    rate_manually_edited = fields.Boolean(string="Manually Edited", readonly=True)
+    payment_count = fields.Integer(string="# Payments", readonly=True)
+
+    def _select(self):
+        return """
+            SELECT p.id AS id,
+                   p.payment_date AS payment_date,
+                   p.payment_date::date AS date,
+                   p.payment_currency_id AS currency_id,
+                   s.config_id AS config_id,
+                   p.session_id AS session_id,
+                   p.pos_order_id AS order_id,
+                   p.payment_method_id AS payment_method_id,
+                   o.company_id AS company_id,
+                   p.payment_currency_amount AS foreign_amount,
+                   p.amount AS base_amount,
+                   CASE WHEN p.amount != 0
+                        THEN p.payment_currency_amount / p.amount
+                        ELSE p.exchange_rate
+                   END AS effective_rate,
+                   COALESCE(p.rate_manually_edited, FALSE) AS rate_manually_edited,
+                   1 AS payment_count
+        """
+
+    def _from(self):
+        return """
+              FROM pos_payment p
+              JOIN pos_order o ON o.id = p.pos_order_id
+              JOIN pos_session s ON s.id = p.session_id
+        """
+
+    def _where(self):
+        # Matches the partial indexes declared on pos.payment
+        return """
+             WHERE p.payment_currency_id IS NOT NULL
+        """
+
+    def _read_group_select(self, aggregate_spec, query):
+        # The rate of a group is weighted by amount, not the average of the
+        # rates of its payments
+        if aggregate_spec == "effective_rate:avg":
+            return SQL(
+                "SUM(%s) / NULLIF(SUM(%s), 0)",
+                self._field_to_sql(self._table, "foreign_amount", query),
+                self._field_to_sql(self._table, "base_amount", query),
+            )
+        return super()._read_group_select(aggregate_spec, query)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(
+            f"CREATE OR REPLACE VIEW {self._table} AS ({self._select()} {self._from()} {self._where()})"
+        )
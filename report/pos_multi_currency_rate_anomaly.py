@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+PARAM_REFRESHED_AT = "pos_multi.rate_anomaly_refreshed_at"
+
+# Rows written by transactions still running when the last refresh read
+# its watermark commit later with an older write_date: re-read a margin.
+REFRESH_OVERLAP = timedelta(hours=1)
+
+# Rank field: column partitioning it, within the company
+RANK_PARTITIONS = {
+    "cashier_rank": "user_id",
+    "config_rank": "config_id",
+    "currency_rank": "currency_id",
+}
+
+
+class PosMultiCurrencyRateAnomaly(models.Model):
+    """
+    Deviation of every foreign currency payment from the market rate.
+
+    Unlike the payment analysis view, the market rate lookup is too costly
+    to run on every read, so rows are materialized in a table and refreshed
+    incrementally by a cron (see ``_refresh``): one set-based query joins
+    the new or changed payments to the effective ``res.currency.rate`` of
+    their date, and window functions rank the deviations per cashier,
+    point of sale and currency.
+    """
+    _name = "report.pos.multi.currency.rate.anomaly"
+    _description = "POS Multi-Currency Rate Anomalies"
+    _order = "abs_deviation desc, id desc"
+
+    payment_id = fields.Many2one(
+        "pos.payment", string="Payment", required=True, readonly=True, ondelete="cascade",
+    )
+    payment_date = fields.Datetime(string="Payment Date", readonly=True)
+    date = fields.Date(string="Day", readonly=True)
+    company_id = fields.Many2one("res.company", string="Company", readonly=True)
+    config_id = fields.Many2one("pos.config", string="Point of Sale", readonly=True)
+    session_id = fields.Many2one("pos.session", string="Session", readonly=True)
+    order_id = fields.Many2one("pos.order", string="Order", readonly=True)
+    user_id = fields.Many2one("res.users", string="Cashier", readonly=True)
+    currency_id = fields.Many2one("res.currency", string="Payment Currency", readonly=True)
+    order_currency_id = fields.Many2one("res.currency", string="Order Currency", readonly=True)
+    exchange_rate = fields.Float(
+        string="Applied Rate", digits=(16, 6), aggregator="avg", readonly=True,
+    )
+    market_rate = fields.Float(
+        string="Market Rate",
+        digits=(16, 6),
+        aggregator="avg",
+        readonly=True,
+        help="Rate from the company's currency rates effective at the payment date.",
+    )
+    deviation = fields.Float(
+        string="Deviation (%)",
+        digits=(16, 2),
+        aggregator="avg",
+        readonly=True,
+        help="(applied rate - market rate) / market rate, in percent.",
+    )
+    abs_deviation = fields.Float(
+        string="Absolute Deviation (%)", digits=(16, 2), aggregator="max", readonly=True,
+    )
+    rate_manually_edited = fields.Boolean(string="Manually Edited", readonly=True)
+    exceeds_tolerance = fields.Boolean(
+        string="Exceeds Tolerance",
+        readonly=True,
+        help="The deviation is above the rate tolerance of the point of sale.",
+    )
+    cashier_rank = fields.Integer(
+        string="Rank (Cashier)", aggregator="min", readonly=True,
+        help="1 is the largest deviation of the cashier.",
+    )
+    config_rank = fields.Integer(
+        string="Rank (Point of Sale)", aggregator="min", readonly=True,
+        help="1 is the largest deviation of the point of sale.",
+    )
+    currency_rank = fields.Integer(
+        string="Rank (Currency)", aggregator="min", readonly=True,
+        help="1 is the largest deviation in the payment currency.",
+    )
+    payment_count = fields.Integer(string="# Payments", default=1, readonly=True)
+
+    _payment_uniq = models.Constraint(
+        "UNIQUE(payment_id)",
+        "A payment can only appear once in the anomaly report.",
+    )
+    _date_idx = models.Index("(date DESC, id DESC)")
+
+    # ─── Refresh ────────────────────────────────────────────────────
+
+    def _market_rate_sql(self, currency, company, date):
+        """
+        Rate lookup of one currency for the LATERAL join, with the same
+        precedence as ``res.currency._get_rates``: the latest company rate
+        on or before the date, else the latest shared rate, else the
+        earliest rate, else 1.0.  Each branch is an index lookup.
+        """
+        return f"""
+            SELECT COALESCE(
+                (SELECT r.rate FROM res_currency_rate r
+                  WHERE r.currency_id = {currency} AND r.company_id = {company}
+                    AND r.name <= {date}
+               ORDER BY r.name DESC LIMIT 1),
+                (SELECT r.rate FROM res_currency_rate r
+                  WHERE r.currency_id = {currency} AND r.company_id IS NULL
+                    AND r.name <= {date}
+               ORDER BY r.name DESC LIMIT 1),
+                (SELECT r.rate FROM res_currency_rate r
+                  WHERE r.currency_id = {currency} AND r.company_id = {company}
+               ORDER BY r.name LIMIT 1),
+                (SELECT r.rate FROM res_currency_rate r
+                  WHERE r.currency_id = {currency} AND r.company_id IS NULL
+               ORDER BY r.name LIMIT 1),
+                1.0
+            ) AS rate
+        """
+
+    def _upsert_rows(self, since=None):
+        """
+        Insert or update the rows of the foreign payments written since
+        ``since`` (all of them when None), of the payments of the points of
+        sale written since then (e.g. a new rate tolerance), and of the
+        payments whose market rate may have changed because a rate dated on
+        or before them was written since then.
+
+        Returns:
+            list: ``(company_id, user_id, config_id, currency_id)`` of each
+                  row inserted or updated.
+        """
+        scope = ""
+        if since is not None:
+            scope = """
+               AND (pay.write_date >= %(since)s
+                    OR pay.config_write_date >= %(since)s
+                    OR EXISTS (
+                        SELECT 1
+                          FROM changed_rates ch
+                         WHERE ch.currency_id IN (pay.currency_id, pay.order_currency_id)
+                           AND ch.date_from <= pay.payment_date::date
+                    ))
+            """
+        self.env.cr.execute(
+            f"""
+            WITH changed_rates AS (
+                SELECT currency_id, MIN(name) AS date_from
+                  FROM res_currency_rate
+                 WHERE write_date >= %(since)s
+              GROUP BY currency_id
+            )
+            INSERT INTO {self._table} (
+                payment_id, payment_date, date, company_id, config_id, session_id,
+                order_id, user_id, currency_id, order_currency_id, exchange_rate,
+                market_rate, deviation, abs_deviation, rate_manually_edited,
+                exceeds_tolerance, payment_count,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT pay.payment_id, pay.payment_date, pay.payment_date::date,
+                   pay.company_id, pay.config_id, pay.session_id, pay.order_id,
+                   pay.user_id, pay.currency_id, pay.order_currency_id,
+                   pay.exchange_rate, m.market_rate, m.deviation, ABS(m.deviation),
+                   pay.rate_manually_edited,
+                   ABS(m.deviation) > COALESCE(pay.tolerance, 0.0),
+                   1, %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM (
+                  SELECT p.id AS payment_id,
+                         p.payment_date,
+                         p.write_date,
+                         pc.write_date AS config_write_date,
+                         o.company_id,
+                         s.config_id,
+                         p.session_id,
+                         p.pos_order_id AS order_id,
+                         o.user_id,
+                         p.payment_currency_id AS currency_id,
+                         -- pos.config.currency_id is computed from the journal
+                         COALESCE(j.currency_id, c.currency_id) AS order_currency_id,
+                         -- rates are shared by a company tree (res.company.root_id)
+                         SPLIT_PART(c.parent_path, '/', 1)::int AS root_company_id,
+                         p.exchange_rate,
+                         COALESCE(p.rate_manually_edited, FALSE) AS rate_manually_edited,
+                         pc.multi_currency_rate_tolerance AS tolerance
+                    FROM pos_payment p
+                    JOIN pos_order o ON o.id = p.pos_order_id
+                    JOIN pos_session s ON s.id = p.session_id
+                    JOIN pos_config pc ON pc.id = s.config_id
+                    JOIN res_company c ON c.id = o.company_id
+               LEFT JOIN account_journal j ON j.id = pc.journal_id
+                   WHERE p.payment_currency_id IS NOT NULL
+              ) pay
+             CROSS JOIN LATERAL (
+                 {self._market_rate_sql("pay.currency_id", "pay.root_company_id", "pay.payment_date::date")}
+             ) pay_rate
+             CROSS JOIN LATERAL (
+                 {self._market_rate_sql("pay.order_currency_id", "pay.root_company_id", "pay.payment_date::date")}
+             ) order_rate
+             CROSS JOIN LATERAL (
+                 SELECT pay_rate.rate / NULLIF(order_rate.rate, 0) AS market_rate
+             ) r
+             CROSS JOIN LATERAL (
+                 SELECT r.market_rate,
+                        COALESCE(
+                            (pay.exchange_rate - r.market_rate) / NULLIF(r.market_rate, 0) * 100.0,
+                            0.0
+                        ) AS deviation
+             ) m
+             WHERE pay.currency_id != pay.order_currency_id
+               {scope}
+            ON CONFLICT (payment_id) DO UPDATE
+               SET payment_date = EXCLUDED.payment_date,
+                   date = EXCLUDED.date,
+                   company_id = EXCLUDED.company_id,
+                   config_id = EXCLUDED.config_id,
+                   session_id = EXCLUDED.session_id,
+                   order_id = EXCLUDED.order_id,
+                   user_id = EXCLUDED.user_id,
+                   currency_id = EXCLUDED.currency_id,
+                   order_currency_id = EXCLUDED.order_currency_id,
+                   exchange_rate = EXCLUDED.exchange_rate,
+                   market_rate = EXCLUDED.market_rate,
+                   deviation = EXCLUDED.deviation,
+                   abs_deviation = EXCLUDED.abs_deviation,
+                   rate_manually_edited = EXCLUDED.rate_manually_edited,
+                   exceeds_tolerance = EXCLUDED.exceeds_tolerance,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+         RETURNING company_id, user_id, config_id, currency_id
+            """,
+            {"since": since, "uid": self.env.uid},
+        )
+        return self.env.cr.fetchall()
+
+    def _update_ranks(self, touched=None):
+        """
+        Rank rows by absolute deviation within their company and cashier,
+        point of sale and currency.  Only rows whose ranks moved are
+        written.
+
+        Args:
+            touched (list): Rows returned by ``_upsert_rows``: only the
+                partitions holding them are ranked again.  All of them when
+                None.
+        """
+        for index, (rank_field, key_field) in enumerate(RANK_PARTITIONS.items(), start=1):
+            scope = ""
+            params = []
+            if touched is not None:
+                keys = {(row[0], row[index]) for row in touched}
+                if not keys:
+                    continue
+                values_sql = ", ".join(["(%s::int, %s::int)"] * len(keys))
+                scope = f"""
+                    JOIN (VALUES {values_sql}) AS k(company_id, key_id)
+                      ON k.company_id IS NOT DISTINCT FROM t.company_id
+                     AND k.key_id IS NOT DISTINCT FROM t.{key_field}
+                """
+                params = [value for key in keys for value in key]
+            self.env.cr.execute(
+                f"""
+                UPDATE {self._table} a
+                   SET {rank_field} = ranked.rank
+                  FROM (
+                      SELECT t.id,
+                             RANK() OVER (
+                                 PARTITION BY t.company_id, t.{key_field}
+                                 ORDER BY t.abs_deviation DESC
+                             ) AS rank
+                        FROM {self._table} t
+                        {scope}
+                  ) ranked
+                 WHERE a.id = ranked.id
+                   AND a.{rank_field} IS DISTINCT FROM ranked.rank
+                """,
+                params,
+            )
+
+    @api.model
+    def _refresh(self, full=False):
+        """
+        Bring the report up to date.
+
+        Incremental by default: only the payments written since the last
+        refresh (with an overlap margin, see ``REFRESH_OVERLAP``), those of
+        the points of sale written since then and the payments affected by
+        rates written since then are recomputed, and only their ranking
+        partitions are ranked again.  A full refresh rebuilds the table,
+        e.g. after rates were deleted.
+
+        Args:
+            full (bool): Rebuild every row instead of refreshing incrementally.
+
+        Returns:
+            int: Number of rows inserted or updated.
+        """
+        ICP = self.env["ir.config_parameter"].sudo()
+        self.env["pos.payment"].flush_model()
+        self.env["pos.order"].flush_model(["company_id", "user_id"])
+        self.env["pos.config"].flush_model(["journal_id", "multi_currency_rate_tolerance", "write_date"])
+        self.env["res.currency.rate"].flush_model(["currency_id", "company_id", "name", "rate"])
+        self.flush_model()
+
+        # Transaction start time: later commits are picked up next time
+        self.env.cr.execute("SELECT NOW() AT TIME ZONE 'UTC'")
+        started_at = self.env.cr.fetchone()[0]
+        refreshed_at = ICP.get_param(PARAM_REFRESHED_AT)
+        since = None
+        if refreshed_at and not full:
+            since = fields.Datetime.to_datetime(refreshed_at) - REFRESH_OVERLAP
+        else:
+            self.env.cr.execute(f"DELETE FROM {self._table}")
+
+        touched = self._upsert_rows(since)
+        self._update_ranks(touched if since is not None else None)
+        ICP.set_param(PARAM_REFRESHED_AT, fields.Datetime.to_string(started_at))
+        self.invalidate_model()
+        return len(touched)
+
+    @api.model
+    def _cron_refresh(self):
+        self._refresh()
+
+    def action_refresh(self):
+        self._refresh()
+        return {"type": "ir.actions.client", "tag": "reload"}
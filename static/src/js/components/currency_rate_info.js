@@ -1,6 +1,7 @@
 /** @odoo-module */
 import { Component } from "@odoo/owl";
 import { usePos } from "@point_of_sale/app/hooks/pos_hook";
+import { _t } from "@web/core/l10n/translation";
 import { roundTo } from "@pos_multi/js/utils/currency_utils";
 
 /**
@@ -8,7 +9,8 @@ import { roundTo } from "@pos_multi/js/utils/currency_utils";
  *
  * A compact horizontal bar that summarises the exchange rates currently
  * in use on the order's payment lines.  Only visible when multi-currency
- * is active AND at least one payment line uses a foreign currency.
+ * is active AND at least one payment line uses a foreign currency, or
+ * when the rates in use are stale.
  *
  * Props:
  *   - paymentLines  {Array}  The order's payment_ids
@@ -25,7 +27,19 @@ export class CurrencyRateInfo extends Component {
     }
 
     get isVisible() {
-        return this.mc?.isActive && this.activeRates.length > 0;
+        return this.mc?.isActive && (this.activeRates.length > 0 || this.isRateStale);
+    }
+
+    get isRateStale() {
+        return this.mc?.isRateStale || false;
+    }
+
+    get staleRateMessage() {
+        const age = this.mc?.rateAgeMinutes;
+        if (age === null || age === undefined) {
+            return _t("Exchange rates could not be confirmed with the server and may be outdated.");
+        }
+        return _t("Exchange rates were last updated %s minutes ago and may be outdated.", age);
     }
 
     get baseCurrencyName() {
@@ -3,7 +3,7 @@
 import { OrderReceipt } from "@point_of_sale/app/screens/receipt_screen/receipt/order_receipt";
 import { patch } from "@web/core/utils/patch";
 import { usePos } from "@point_of_sale/app/hooks/pos_hook";
-import { convertAmount, formatMCAmount } from "@pos_multi/js/utils/currency_utils";
+import { formatMCAmount } from "@pos_multi/js/utils/currency_utils";
 import { formatCurrency } from "@web/core/currency";
 
 patch(OrderReceipt.prototype, {
@@ -13,7 +13,11 @@ patch(OrderReceipt.prototype, {
     },
 
     /**
-     * Override formatCurrency to handle receipt currency conversion
+     * Override formatCurrency to handle receipt currency conversion.
+     * Only used for amounts without a stored receipt-currency value
+     * (payment lines); totals and line amounts go through
+     * formatReceiptTotal / formatReceiptLine so reprints show exactly the
+     * amounts of the first receipt.
      */
     formatCurrency(amount) {
         const mc = this.pos?.multiCurrency;
@@ -24,17 +28,8 @@ patch(OrderReceipt.prototype, {
             const orderCurrencyId = this.order.currency?.id;
             
             if (receiptCurrency && orderCurrencyId && receiptCurrency.id !== orderCurrencyId) {
-                // Convert amount to receipt currency
-                const convertedAmount = convertAmount(
-                    amount,
-                    orderCurrencyId,
-                    receiptCurrency.id,
-                    mc.rates,
-                    mc.baseCurrencyId
-                );
-                
                 // Format with receipt currency
-                return formatMCAmount(convertedAmount, receiptCurrency, true);
+                return formatMCAmount(amount * this.receiptRate, receiptCurrency, true);
             }
         }
         
@@ -42,6 +37,59 @@ patch(OrderReceipt.prototype, {
         return formatCurrency(amount, this.order.currency.id);
     },
 
+    /**
+     * Order total ("amount_total", "amount_tax", "amount_paid",
+     * "amount_return") in the receipt currency: the stored value once the
+     * server materialized it.
+     */
+    formatReceiptTotal(field) {
+        if (this.hasStoredReceiptAmounts) {
+            return formatMCAmount(
+                this.order[`receipt_${field}`],
+                this.pos.multiCurrency.receiptCurrency,
+                true
+            );
+        }
+        return this.formatCurrency(this.order[field]);
+    },
+
+    /**
+     * Line subtotal ("price_subtotal" or "price_subtotal_incl") in the
+     * receipt currency: the stored value once the server materialized it.
+     */
+    formatReceiptLine(line, field = "price_subtotal_incl") {
+        if (this.hasStoredReceiptAmounts) {
+            return formatMCAmount(
+                line[`receipt_${field}`],
+                this.pos.multiCurrency.receiptCurrency,
+                true
+            );
+        }
+        return this.formatCurrency(line[field]);
+    },
+
+    /**
+     * True when the server materialized the receipt amounts of the order
+     * in the receipt currency in use.
+     */
+    get hasStoredReceiptAmounts() {
+        const receiptCurrencyId = this.pos?.multiCurrency?.receiptCurrency?.id;
+        const storedCurrencyId = this.order.receipt_currency_id?.id ?? this.order.receipt_currency_id;
+        return Boolean(storedCurrencyId) && storedCurrencyId === receiptCurrencyId;
+    },
+
+    /**
+     * Rate from order currency to receipt currency: the one materialized on
+     * the order when it was validated, otherwise the current one.
+     */
+    get receiptRate() {
+        const mc = this.pos?.multiCurrency;
+        if (this.hasStoredReceiptAmounts && this.order.receipt_currency_rate) {
+            return this.order.receipt_currency_rate;
+        }
+        return mc.getRate(this.order.currency?.id, mc?.receiptCurrency?.id);
+    },
+
     /**
      * Check if we should show original amount (when conversion is active)
      */
@@ -72,7 +120,7 @@ patch(OrderReceipt.prototype, {
         return {
             name: mc.receiptCurrency.name,
             symbol: mc.receiptCurrency.symbol,
-            rate: mc.rates[mc.receiptCurrency.id] || 1.0,
+            rate: this.receiptRate,
         };
     },
 });
\ No newline at end of file
@@ -1,5 +1,21 @@
+import { reactive } from "@odoo/owl";
 import { PosStore } from "@point_of_sale/app/services/pos_store";
 import { patch } from "@web/core/utils/patch";
+import { session } from "@web/session";
+import {
+    buildRateMatrix,
+    convertAmount,
+    formatMCAmount,
+    roundTo,
+} from "@pos_multi/js/utils/currency_utils";
+import {
+    loadRateSnapshot,
+    rateCacheKey,
+    saveRateSnapshot,
+} from "@pos_multi/js/utils/rate_cache";
+
+// How often the age of the rates in use is checked
+const RATE_WATCH_INTERVAL = 60 * 1000;
 
 /**
  * PosMultiCurrencyService
@@ -13,57 +29,183 @@ export class PosMultiCurrencyService {
         this._allowRateEdit = false;
         this._canEditRate = false;
         this._allowedCurrencyIds = [];
-        this.currencies = []; // Store currencies from RPC
-        this._baseCurrency = null; // Store base currency from RPC
-        this._receiptCurrency = null; // Store receipt currency from RPC
-        this.rates = {};
-        this.baseCurrencyId = null;
+        this.currencies = []; // Currencies from the session data
+        this._baseCurrency = null; // Base currency from the session data
+        this._receiptCurrency = null; // Receipt currency from the session data
+        this._rates = {};
+        this._baseCurrencyId = null;
+        this._rateMatrix = null; // Cross rates, rebuilt lazily when rates change
+        this._orderSummaries = new WeakMap(); // order -> { revision, summary }
+        this.rateVersion = null; // Version of the server rate snapshot in use
+        this.rateDate = null;
+        this.rateTtl = 0; // Minutes before rates are flagged stale (0 = never)
+        this.rateTolerance = 0.5; // Max. relative deviation from the market rate
+        // Reactive so components re-render when the rates turn stale
+        this.state = reactive({ rateFetchedAt: null, rateStale: false });
+        this._refreshingRates = false;
+        this._rateWatchInterval = null; // setInterval handle of _startRateWatch
+        this._rateWatchCheck = null; // "online" listener of _startRateWatch
+        this._rateCacheKey = rateCacheKey(session.db, pos.config.id);
         this.sessionEnabled = true;
+        this._listeningToRates = false;
         this._initialized = false;
     }
 
-    async init() {
-        const config = this.pos.config;
-        
+    // ─── Rates & precomputed cross-rate matrix ──────────────────────
+
+    get rates() {
+        return this._rates;
+    }
+
+    set rates(value) {
+        this._rates = value || {};
+        this._rateMatrix = null;
+    }
+
+    get baseCurrencyId() {
+        return this._baseCurrencyId;
+    }
+
+    set baseCurrencyId(value) {
+        if (value !== this._baseCurrencyId) {
+            this._baseCurrencyId = value;
+            this._rateMatrix = null;
+        }
+    }
+
+    /**
+     * Rate such that 1 unit of fromCurrencyId = rate units of toCurrencyId.
+     * Served from a matrix that is only rebuilt when the rates change.
+     */
+    getRate(fromCurrencyId, toCurrencyId) {
+        if (fromCurrencyId === toCurrencyId) {
+            return 1.0;
+        }
+        if (!this._rateMatrix) {
+            this._rateMatrix = buildRateMatrix(this._rates, this._baseCurrencyId);
+        }
+        const rate = this._rateMatrix[fromCurrencyId]?.[toCurrencyId];
+        if (rate !== undefined) {
+            return rate;
+        }
+        // Currency unknown to the matrix (e.g. not in the rate snapshot)
+        return convertAmount(1, fromCurrencyId, toCurrencyId, this._rates, this._baseCurrencyId);
+    }
+
+    convert(amount, fromCurrencyId, toCurrencyId) {
+        return amount * this.getRate(fromCurrencyId, toCurrencyId);
+    }
+
+    /**
+     * Per-currency summary of the order's foreign payment lines, cached
+     * until a payment line is added, removed or changed.
+     */
+    getForeignPaymentSummary(order) {
+        const revision = order.payment_ids
+            .map((p) => `${p.uuid}:${p.mcRevision || 0}`)
+            .join("|");
+        const cached = this._orderSummaries.get(order);
+        if (cached && cached.revision === revision) {
+            return cached.summary;
+        }
+
+        const map = new Map();
+        for (const p of order.payment_ids) {
+            if (typeof p.isMultiCurrency !== "function" || !p.isMultiCurrency()) continue;
+            const cur = p.payment_currency_id;
+            if (!cur) continue;
+
+            if (!map.has(cur.id)) {
+                map.set(cur.id, { total: 0, rate: p.exchange_rate || 1, currency: cur });
+            }
+            const entry = map.get(cur.id);
+            entry.total += p.getPaymentCurrencyAmount();
+            if (p.rate_manually_edited) entry.rate = p.exchange_rate;
+        }
+
+        const baseName = order.currency?.name || "";
+        const summary = [];
+        for (const [currencyId, entry] of map) {
+            summary.push({
+                currencyId,
+                currencyName: entry.currency.name,
+                formattedAmount: formatMCAmount(entry.total, entry.currency),
+                rateLabel: `1 ${baseName} = ${roundTo(entry.rate, 4).toFixed(4)} ${entry.currency.name}`,
+            });
+        }
+        this._orderSummaries.set(order, { revision, summary });
+        return summary;
+    }
+
+    /**
+     * Initialise from the multi-currency block shipped with the POS
+     * session data (``multi_currency_data`` on the config): no RPC is
+     * needed at startup.  A newer snapshot kept in the browser cache
+     * (e.g. when the POS data itself was loaded offline) takes over, and
+     * rates are refreshed in the background once they get old.
+     */
+    init() {
+        const mcData = this.pos.config.multi_currency_data;
+        if (mcData) {
+            this._applyConfigData(mcData);
+        } else {
+            // Data missing from the session load: fetch it without
+            // blocking the startup.
+            this._loadConfigData();
+        }
+        this._restoreCachedRates();
+        this._startRateWatch();
+        this._initialized = true;
+    }
+
+    _applyConfigData(mcConfig) {
+        this._configEnabled = mcConfig.enabled;
+        this._allowRateEdit = mcConfig.allow_rate_edit;
+        this._canEditRate = mcConfig.can_edit_rate;
+        this.rateTtl = mcConfig.rate_ttl || 0;
+        this.rateTolerance = mcConfig.rate_tolerance ?? this.rateTolerance;
+
+        this.currencies = mcConfig.currencies || [];
+        this._baseCurrency = mcConfig.base_currency;
+        this._receiptCurrency = mcConfig.receipt_currency;
+        this.baseCurrencyId = this._baseCurrency?.id || null;
+
+        // Extract allowed currency IDs
+        this._allowedCurrencyIds = this.currencies.map((c) => c.id);
+
+        if (mcConfig.rates) {
+            // Snapshot taken when the POS data was loaded, not now
+            const fetchedAt = mcConfig.rates.fetched_at
+                ? mcConfig.rates.fetched_at * 1000
+                : Date.now();
+            this._applyRateSnapshot(mcConfig.rates, fetchedAt);
+        } else {
+            this._buildLocalRates();
+        }
+
+        if (this._configEnabled && !this._listeningToRates) {
+            this._listeningToRates = true;
+            // Rate changes are pushed by the server, no polling needed
+            this.pos.data.connectWebSocket("MULTI_CURRENCY_RATES", (payload) =>
+                this._applyRateSnapshot(payload)
+            );
+        }
+    }
+
+    async _loadConfigData() {
         try {
-            // Fetch multi-currency configuration via RPC
             const mcConfig = await this.pos.data.call(
                 "pos.config",
                 "get_multi_currency_config",
-                [[config.id]]
+                [[this.pos.config.id]]
             );
-            
-            this._configEnabled = mcConfig.enabled;
-            this._allowRateEdit = mcConfig.allow_rate_edit;
-            this._canEditRate = mcConfig.can_edit_rate;
-            
-            // Store currencies from RPC response
-            this.currencies = mcConfig.currencies || [];
-            this._baseCurrency = mcConfig.base_currency;
-            this._receiptCurrency = mcConfig.receipt_currency;
-            this.baseCurrencyId = this._baseCurrency?.id || null;
-            
-            // Extract allowed currency IDs
-            this._allowedCurrencyIds = this.currencies.map(c => c.id);
-            
-            // Build initial rates from currencies
-            this.rates = {};
-            this.currencies.forEach(curr => {
-                this.rates[curr.id] = curr.rate || 1.0;
-            });
-            
+            this._applyConfigData(mcConfig);
         } catch (error) {
             console.error("Failed to load multi-currency config:", error);
             this._configEnabled = false;
             this._allowedCurrencyIds = [];
             this.currencies = [];
         }
-
-        if (this._configEnabled) {
-            await this.refreshRates();
-        }
-        
-        this._initialized = true;
     }
 
     get receiptCurrency() {
@@ -105,26 +247,178 @@ export class PosMultiCurrencyService {
             const result = await this.pos.data.call(
                 "pos.config",
                 "get_multi_currency_rates",
-                [[this.pos.config.id]]
+                [[this.pos.config.id]],
+                this.rateVersion === null
+                    ? {}
+                    : {
+                          since_version: this.rateVersion,
+                          since_date: this.rateDate,
+                          currency_ids: Object.keys(this.rates).map(Number),
+                      }
             );
-            if (result && result.rates) {
-                this.rates = result.rates;
-                this.baseCurrencyId = result.base_currency_id || this.baseCurrencyId;
-                console.log("Refreshed rates:", this.rates);
-            }
+            this._applyRateSnapshot(result);
         } catch (e) {
             console.error("Failed to refresh rates:", e);
-            this._buildLocalRates();
+            // Keep converting with the last known (cached) rates, the
+            // stale-rate warning tells the cashier they may be outdated
+            if (!Object.keys(this.rates).length) {
+                this._buildLocalRates();
+            }
+        }
+    }
+
+    /**
+     * One page of this POS's orders paid in foreign currencies, newest
+     * first.  Pass the returned ``next_cursor`` as ``after`` to get the
+     * next page.
+     *
+     * @param {Object} params { currencyIds, manualOnly, dateFrom, dateTo, after, limit }
+     * @returns {Promise<{orders: Object[], next_cursor: Object|null}>}
+     */
+    searchOrderHistory({ currencyIds, manualOnly, dateFrom, dateTo, after, limit } = {}) {
+        return this.pos.data.call("pos.order", "search_multi_currency_orders", [], {
+            config_ids: [this.pos.config.id],
+            currency_ids: currencyIds || null,
+            manual_only: !!manualOnly,
+            date_from: dateFrom || null,
+            date_to: dateTo || null,
+            after: after || null,
+            limit: limit || 50,
+        });
+    }
+
+    // ─── Rate freshness & persistent cache ──────────────────────────
+
+    get isRateStale() {
+        return this.isActive && this.state.rateStale;
+    }
+
+    get rateAgeMinutes() {
+        const fetchedAt = this.state.rateFetchedAt;
+        return fetchedAt ? Math.max(0, Math.floor((Date.now() - fetchedAt) / 60000)) : null;
+    }
+
+    _updateRateStaleness() {
+        const fetchedAt = this.state.rateFetchedAt;
+        const stale =
+            this._configEnabled &&
+            (!fetchedAt || (this.rateTtl > 0 && Date.now() - fetchedAt > this.rateTtl * 60000));
+        if (stale !== this.state.rateStale) {
+            this.state.rateStale = stale;
         }
     }
 
+    /**
+     * Periodically re-evaluate staleness and refresh in the background
+     * once half the TTL has elapsed, so rates are renewed before the
+     * warning shows (and retried while the uplink is down).
+     */
+    _startRateWatch() {
+        const check = () => {
+            this._updateRateStaleness();
+            if (!this._configEnabled || this._refreshingRates) {
+                return;
+            }
+            const fetchedAt = this.state.rateFetchedAt;
+            const halfTtl = (this.rateTtl * 60000) / 2;
+            if (!fetchedAt || (this.rateTtl > 0 && Date.now() - fetchedAt > halfTtl)) {
+                this._refreshingRates = true;
+                this.refreshRates().finally(() => {
+                    this._refreshingRates = false;
+                });
+            }
+        };
+        // Never leave a previous watch running next to the new one
+        this._stopRateWatch();
+        this._rateWatchCheck = check;
+        this._rateWatchInterval = setInterval(check, RATE_WATCH_INTERVAL);
+        window.addEventListener("online", check);
+    }
+
+    _stopRateWatch() {
+        if (this._rateWatchInterval) {
+            clearInterval(this._rateWatchInterval);
+            this._rateWatchInterval = null;
+        }
+        if (this._rateWatchCheck) {
+            window.removeEventListener("online", this._rateWatchCheck);
+            this._rateWatchCheck = null;
+        }
+    }
+
+    /**
+     * Stop the background work of the service (the POS is closing or the
+     * service is replaced).
+     */
+    destroy() {
+        this._stopRateWatch();
+    }
+
+    async _restoreCachedRates() {
+        const cached = await loadRateSnapshot(this._rateCacheKey);
+        if (!cached || !cached.rates || !this._configEnabled) {
+            return;
+        }
+        if (this.baseCurrencyId && cached.base_currency_id !== this.baseCurrencyId) {
+            return;
+        }
+        if (this.state.rateFetchedAt && cached.fetched_at <= this.state.rateFetchedAt) {
+            return;
+        }
+        this.rates = cached.rates;
+        this.rateVersion = cached.version ?? null;
+        this.rateDate = cached.date || null;
+        this.baseCurrencyId = cached.base_currency_id || this.baseCurrencyId;
+        this.state.rateFetchedAt = cached.fetched_at;
+        this._updateRateStaleness();
+    }
+
+    _persistRates() {
+        if (!this._configEnabled) {
+            return;
+        }
+        saveRateSnapshot(this._rateCacheKey, {
+            version: this.rateVersion,
+            date: this.rateDate,
+            base_currency_id: this.baseCurrencyId,
+            rates: { ...this.rates },
+            fetched_at: this.state.rateFetchedAt,
+        });
+    }
+
+    /**
+     * Apply a (possibly incremental) rate snapshot returned by the server.
+     * Full snapshots replace the rates, partial ones only update the
+     * currencies that changed, "unchanged" answers keep everything.
+     * Every answer confirms the rates as of ``fetchedAt``.
+     */
+    _applyRateSnapshot(result, fetchedAt = Date.now()) {
+        if (!result || !result.rates) {
+            return;
+        }
+        if (!result.unchanged) {
+            this.rates = result.partial ? { ...this.rates, ...result.rates } : result.rates;
+        }
+        this.rateVersion = result.version ?? null;
+        this.rateDate = result.date || null;
+        this.baseCurrencyId = result.base_currency_id || this.baseCurrencyId;
+        this.state.rateFetchedAt = fetchedAt;
+        this._updateRateStaleness();
+        this._persistRates();
+    }
+
     _buildLocalRates() {
         // Use our stored currencies instead of pos.models
-        this.rates = {};
+        const rates = {};
         this.currencies.forEach(curr => {
-            this.rates[curr.id] = curr.rate || 1.0;
+            rates[curr.id] = curr.rate || 1.0;
         });
-        console.log("Built local rates:", this.rates);
+        this.rates = rates;
+        this.rateVersion = null;
+        this.rateDate = null;
+        // Age unknown: flagged stale until the server confirms rates
+        this.state.rateFetchedAt = null;
+        this._updateRateStaleness();
     }
 }
 
@@ -133,7 +427,13 @@ patch(PosStore.prototype, {
     async setup() {
         await super.setup(...arguments);
         // Initialize multi-currency service
+        this.multiCurrency?.destroy();
         this.multiCurrency = new PosMultiCurrencyService(this);
-        await this.multiCurrency.init();
+        this.multiCurrency.init();
+    },
+
+    async closePos() {
+        this.multiCurrency?.destroy();
+        return await super.closePos(...arguments);
     },
 });
\ No newline at end of file
@@ -139,6 +139,9 @@ export class PosPaymentMultiCurrency extends Base {
     }
 
     _syncCurrencyAmount() {
+        // Every currency/rate/amount change goes through here: bump the
+        // revision so cached order summaries get recomputed.
+        this.mcRevision = (this.mcRevision || 0) + 1;
         if (!this.payment_currency_id) {
             this.payment_currency_amount = this.amount;
             return;
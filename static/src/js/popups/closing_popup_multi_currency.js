@@ -0,0 +1,71 @@
+/** @odoo-module */
+
+import { useState } from "@odoo/owl";
+import { ClosingPopup } from "@point_of_sale/app/components/popups/closing_popup/closing_popup";
+import { patch } from "@web/core/utils/patch";
+import { formatMCAmount, roundTo } from "@pos_multi/js/utils/currency_utils";
+
+/**
+ * Per-currency cash control in the closing popup.
+ *
+ * ``multi_currency_cash_details`` comes with the closing control data
+ * (pos.session.get_closing_control_data); the counted amounts are sent
+ * with set_multi_currency_cash_counts right before the session is closed,
+ * once start_multi_currency_cash_count has put it in closing control.
+ */
+if (Array.isArray(ClosingPopup.props)) {
+    ClosingPopup.props = [...ClosingPopup.props, "multi_currency_cash_details?"];
+} else if (ClosingPopup.props) {
+    ClosingPopup.props = {
+        ...ClosingPopup.props,
+        multi_currency_cash_details: { type: Array, optional: true },
+    };
+}
+
+patch(ClosingPopup.prototype, {
+    setup() {
+        super.setup(...arguments);
+        const counts = {};
+        for (const detail of this.multiCurrencyCashDetails) {
+            counts[detail.currency_id] = detail.counted ?? "";
+        }
+        this.mcCashState = useState({ counts });
+    },
+
+    get multiCurrencyCashDetails() {
+        return this.props.multi_currency_cash_details || [];
+    },
+
+    formatMCCash(amount, detail) {
+        return formatMCAmount(amount || 0, detail);
+    },
+
+    getMCCashDifference(detail) {
+        const counted = parseFloat(this.mcCashState.counts[detail.currency_id]);
+        if (isNaN(counted)) {
+            return null;
+        }
+        return roundTo(counted - detail.expected, detail.decimal_places ?? 2);
+    },
+
+    async closeSession() {
+        const counts = {};
+        for (const detail of this.multiCurrencyCashDetails) {
+            const counted = parseFloat(this.mcCashState.counts[detail.currency_id]);
+            if (!isNaN(counted)) {
+                counts[detail.currency_id] = counted;
+            }
+        }
+        if (Object.keys(counts).length) {
+            // Counts are only accepted once the session is in closing control
+            await this.pos.data.call("pos.session", "start_multi_currency_cash_count", [
+                this.pos.session.id,
+            ]);
+            await this.pos.data.call("pos.session", "set_multi_currency_cash_counts", [
+                this.pos.session.id,
+                counts,
+            ]);
+        }
+        return super.closeSession(...arguments);
+    },
+});
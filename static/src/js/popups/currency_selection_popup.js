@@ -4,7 +4,6 @@ import { Component, useState } from "@odoo/owl";
 import { Dialog } from "@web/core/dialog/dialog";
 import { usePos } from "@point_of_sale/app/hooks/pos_hook";
 import {
-    getEffectiveRate,
     roundTo,
     formatMCAmount,
     validateRate,
@@ -79,13 +78,13 @@ export class CurrencySelectionPopup extends Component {
                this.state.selectedCurrencyId !== this.baseCurrencyId;
     }
 
+    /** 1 base = ? currency, from the service's precomputed rate matrix. */
+    _getRate(currencyId) {
+        return this.mc ? this.mc.getRate(this.baseCurrencyId, currencyId) : 1.0;
+    }
+
     formatRate(currencyId) {
-        const rate = getEffectiveRate(
-            this.baseCurrencyId,
-            currencyId,
-            this.mc?.rates || {},
-            this.baseCurrencyId
-        );
+        const rate = this._getRate(currencyId);
         return roundTo(rate, 6).toFixed(6);
     }
 
@@ -95,12 +94,7 @@ export class CurrencySelectionPopup extends Component {
         if (this.state.selectedCurrencyId === currency.id && this.state.isManuallyEdited) {
             rate = this.state.manualRate;
         } else {
-            rate = getEffectiveRate(
-                this.baseCurrencyId,
-                currency.id,
-                this.mc?.rates || {},
-                this.baseCurrencyId
-            );
+            rate = this._getRate(currency.id);
         }
         const converted = orderAmt * rate;
         return formatMCAmount(converted, currency);
@@ -108,22 +102,12 @@ export class CurrencySelectionPopup extends Component {
 
     _getMarketRate() {
         if (!this.state.selectedCurrencyId) return 1.0;
-        return getEffectiveRate(
-            this.baseCurrencyId,
-            this.state.selectedCurrencyId,
-            this.mc?.rates || {},
-            this.baseCurrencyId
-        );
+        return this._getRate(this.state.selectedCurrencyId);
     }
 
     selectCurrency(currency) {
         this.state.selectedCurrencyId = currency.id;
-        const marketRate = getEffectiveRate(
-            this.baseCurrencyId,
-            currency.id,
-            this.mc?.rates || {},
-            this.baseCurrencyId
-        );
+        const marketRate = this._getRate(currency.id);
         this.state.manualRate = roundTo(marketRate, 6);
         this.state.isManuallyEdited = false;
         this.state.rateWarning = null;
@@ -137,7 +121,7 @@ export class CurrencySelectionPopup extends Component {
         }
         this.state.isManuallyEdited = true;
         const marketRate = this._getMarketRate();
-        const { valid, message } = validateRate(val, marketRate);
+        const { valid, message } = validateRate(val, marketRate, this.mc?.rateTolerance);
         this.state.rateWarning = valid ? null : message;
     }
 
@@ -172,12 +156,7 @@ export class CurrencySelectionPopup extends Component {
             rate = parseFloat(this.state.manualRate);
             manuallyEdited = true;
         } else {
-            rate = getEffectiveRate(
-                this.baseCurrencyId,
-                currency.id,
-                this.mc?.rates || {},
-                this.baseCurrencyId
-            );
+            rate = this._getRate(currency.id);
         }
 
         const result = {
@@ -70,7 +70,7 @@ export class RateEditPopup extends Component {
             this.state.warning = "Rate must be a positive number.";
             return;
         }
-        const { valid, message } = validateRate(val, this.props.marketRate);
+        const { valid, message } = validateRate(val, this.props.marketRate, this.mc?.rateTolerance);
         this.state.warning = valid ? null : message;
     }
 
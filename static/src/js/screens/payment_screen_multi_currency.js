@@ -9,7 +9,6 @@ import { MultiCurrencyBadge } from "@pos_multi/js/components/multi_currency_badg
 import { CurrencyRateInfo } from "@pos_multi/js/components/currency_rate_info";
 import { StatisticsPopup } from "@pos_multi/js/popups/statistics_popup";
 import { makeAwaitable } from "@point_of_sale/app/utils/make_awaitable_dialog";
-import { formatMCAmount, roundTo } from "@pos_multi/js/utils/currency_utils";
 import { patch } from "@web/core/utils/patch";
 
 // ─────────────────────────────────────────────────────────────────────────────
@@ -123,11 +122,7 @@ import { ReceiptScreen } from "@point_of_sale/app/screens/receipt_screen/receipt
 
 Object.defineProperty(ReceiptScreen.prototype, "hasForeignPayments", {
     get() {
-        const order = this.currentOrder;
-        if (!order) return false;
-        return order.payment_ids.some(
-            (p) => typeof p.isMultiCurrency === "function" && p.isMultiCurrency()
-        );
+        return this.foreignPaymentSummary.length > 0;
     },
     configurable: true,
 });
@@ -135,33 +130,10 @@ Object.defineProperty(ReceiptScreen.prototype, "hasForeignPayments", {
 Object.defineProperty(ReceiptScreen.prototype, "foreignPaymentSummary", {
     get() {
         const order = this.currentOrder;
-        if (!order) return [];
-
-        const map = new Map();
-        for (const p of order.payment_ids) {
-            if (typeof p.isMultiCurrency !== "function" || !p.isMultiCurrency()) continue;
-            const cur = p.payment_currency_id;
-            if (!cur) continue;
-
-            if (!map.has(cur.id)) {
-                map.set(cur.id, { total: 0, rate: p.exchange_rate || 1, currency: cur });
-            }
-            const entry = map.get(cur.id);
-            entry.total += p.getPaymentCurrencyAmount();
-            if (p.rate_manually_edited) entry.rate = p.exchange_rate;
-        }
-
-        const baseName = order.currency?.name || "";
-        const out = [];
-        for (const [currencyId, entry] of map) {
-            out.push({
-                currencyId,
-                currencyName: entry.currency.name,
-                formattedAmount: formatMCAmount(entry.total, entry.currency),
-                rateLabel: `1 ${baseName} = ${roundTo(entry.rate, 4).toFixed(4)} ${entry.currency.name}`,
-            });
-        }
-        return out;
+        const mc = this.pos?.multiCurrency;
+        if (!order || !mc) return [];
+        // Cached by payment-line revision, not rebuilt on every render
+        return mc.getForeignPaymentSummary(order);
     },
     configurable: true,
 });
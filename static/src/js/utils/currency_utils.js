@@ -28,6 +28,25 @@ export function getEffectiveRate(orderCurrencyId, paymentCurrencyId, rates, base
     return convertAmount(1, orderCurrencyId, paymentCurrencyId, rates, baseCurrencyId);
 }
 
+/**
+ * Precompute every cross rate between the currencies of a rates map.
+ * Returns { [fromId]: { [toId]: rate } } where 1 from = rate units of to.
+ */
+export function buildRateMatrix(rates, baseCurrencyId) {
+    const ids = Object.keys(rates).map(Number);
+    if (baseCurrencyId && !ids.includes(baseCurrencyId)) {
+        ids.push(baseCurrencyId);
+    }
+    const matrix = {};
+    for (const fromId of ids) {
+        const row = (matrix[fromId] = {});
+        for (const toId of ids) {
+            row[toId] = getEffectiveRate(fromId, toId, rates, baseCurrencyId);
+        }
+    }
+    return matrix;
+}
+
 /** Safe rounding. */
 export function roundTo(value, decimals = 2) {
     const factor = Math.pow(10, decimals);
@@ -0,0 +1,81 @@
+/** @odoo-module */
+
+/**
+ * ============================================================
+ * rate_cache.js — Persistent rate snapshot cache (IndexedDB)
+ * ============================================================
+ *
+ * Keeps the last rate snapshot received by a POS config so the
+ * terminal can boot from it and keep converting while offline.
+ * Every function resolves (never rejects): storage being unavailable
+ * (private browsing, quota, old browser) only disables the cache.
+ */
+
+const DB_NAME = "pos_multi";
+const DB_VERSION = 1;
+const STORE_NAME = "rate_snapshots";
+
+let dbPromise = null;
+
+function openDatabase() {
+    if (!dbPromise) {
+        dbPromise = new Promise((resolve) => {
+            if (typeof indexedDB === "undefined") {
+                resolve(null);
+                return;
+            }
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore(STORE_NAME);
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null);
+            request.onblocked = () => resolve(null);
+        });
+    }
+    return dbPromise;
+}
+
+function runRequest(mode, callback) {
+    return openDatabase().then(
+        (db) =>
+            new Promise((resolve) => {
+                if (!db) {
+                    resolve(null);
+                    return;
+                }
+                try {
+                    const transaction = db.transaction(STORE_NAME, mode);
+                    const request = callback(transaction.objectStore(STORE_NAME));
+                    transaction.oncomplete = () => resolve(request.result ?? null);
+                    transaction.onerror = () => resolve(null);
+                    transaction.onabort = () => resolve(null);
+                } catch {
+                    resolve(null);
+                }
+            })
+    );
+}
+
+/**
+ * Cache key of a POS config, scoped by database since several databases
+ * may be served from the same origin.
+ */
+export function rateCacheKey(dbName, configId) {
+    return `${dbName || ""}:${configId}`;
+}
+
+/**
+ * Load the cached snapshot of a config.
+ * Resolves to { version, date, base_currency_id, rates, fetched_at } or null.
+ */
+export function loadRateSnapshot(key) {
+    return runRequest("readonly", (store) => store.get(key));
+}
+
+/**
+ * Store the snapshot of a config, replacing the previous one.
+ */
+export function saveRateSnapshot(key, snapshot) {
+    return runRequest("readwrite", (store) => store.put(snapshot, key));
+}
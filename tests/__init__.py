@@ -0,0 +1,17 @@
+from . import test_multi_currency_performance
+from . import test_instrumentation
+from . import test_multi_currency_pos_data
+from . import test_rate_validation
+from . import test_currency_conversion
+from . import test_cash_control
+from . import test_order_history
+from . import test_rate_anomaly
+from . import test_replica_routing
+from . import test_rate_import
+from . import test_rate_provider
+from . import test_receipt_currency
+from . import test_multi_company_reporting
+from . import test_load_test
+from . import test_multi_currency_statistics
+from . import test_order_sync
+from . import test_session_closing
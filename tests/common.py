@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from contextlib import contextmanager
+
+from odoo import Command
+from odoo.addons.point_of_sale.tests.common import TestPoSCommon
+
+_logger = logging.getLogger(__name__)
+
+
+class PosMultiCurrencyCommon(TestPoSCommon):
+    """
+    Builds synthetic multi-currency POS data of configurable size:
+    number of orders, payment lines per order and foreign currencies.
+    """
+
+    FOREIGN_CURRENCY_COUNT = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.config = cls.basic_config
+        cls.foreign_currencies = cls._create_foreign_currencies(cls.FOREIGN_CURRENCY_COUNT)
+        cls.config.write({
+            "multi_currency_enabled": True,
+            "multi_currency_ids": [Command.set(cls.foreign_currencies.ids)],
+        })
+        cls.mc_product = cls.create_product("Multi Currency Product", cls.categ_basic, 10.0, 5.0)
+        cls.timings = []
+
+    @classmethod
+    def tearDownClass(cls):
+        for name, size, seconds in cls.timings:
+            _logger.info("pos_multi benchmark %-45s size=%-8s %.4fs", name, size, seconds)
+        super().tearDownClass()
+
+    @classmethod
+    def _create_foreign_currencies(cls, count):
+        return cls.env["res.currency"].create([
+            {
+                "name": f"Q{chr(65 + index // 26)}{chr(65 + index % 26)}",
+                "symbol": f"Q{index}",
+                "rounding": 0.01,
+                "active": True,
+                "rate_ids": [Command.create({
+                    "name": "2020-01-01",
+                    "rate": 1.5 + index,
+                    "company_id": cls.env.company.id,
+                })],
+            }
+            for index in range(count)
+        ])
+
+    def _get_rate(self, currency):
+        return currency.with_company(self.env.company).rate or 1.0
+
+    def _prepare_payment_vals(self, amount, currency, manually_edited=False, payment_method=None):
+        rate = self._get_rate(currency)
+        return {
+            "payment_method_id": (payment_method or self.bank_pm1).id,
+            "amount": amount,
+            "payment_currency_id": currency.id,
+            "payment_currency_amount": currency.round(amount * rate),
+            "exchange_rate": rate,
+            "rate_manually_edited": manually_edited,
+        }
+
+    def _create_multi_currency_orders(self, session, order_count, payments_per_order=2,
+                                      currencies=None):
+        """Create orders with foreign payments directly through the ORM."""
+        currencies = currencies or self.foreign_currencies
+        amount = 10.0
+        vals_list = []
+        for order_index in range(order_count):
+            payments = [
+                Command.create(self._prepare_payment_vals(
+                    amount,
+                    currencies[(order_index + payment_index) % len(currencies)],
+                    manually_edited=not (order_index + payment_index) % 5,
+                ))
+                for payment_index in range(payments_per_order)
+            ]
+            total = amount * payments_per_order
+            vals_list.append({
+                "session_id": session.id,
+                "amount_tax": 0.0,
+                "amount_total": total,
+                "amount_paid": total,
+                "amount_return": 0.0,
+                "payment_ids": payments,
+            })
+        return self.env["pos.order"].create(vals_list)
+
+    def _prepare_multi_currency_ui_orders(self, order_count, currencies=None, payment_method=None):
+        """Build POS UI order payloads paid with one foreign payment each, for sync_from_ui."""
+        currencies = currencies or self.foreign_currencies
+        payment_method = payment_method or self.bank_pm1
+        orders = []
+        for order_index in range(order_count):
+            data = self.create_ui_order_data(
+                [(self.mc_product, 1)],
+                payments=[(payment_method, 10.0)],
+            )
+            currency = currencies[order_index % len(currencies)]
+            for command in data["payment_ids"]:
+                command[2].update(self._prepare_payment_vals(
+                    command[2]["amount"], currency, payment_method=payment_method
+                ))
+            orders.append(data)
+        return orders
+
+    @contextmanager
+    def _record_timing(self, name, size):
+        start = time.perf_counter()
+        yield
+        self.timings.append((name, size, time.perf_counter() - start))
+
+    def _reset_caches(self):
+        self.env.flush_all()
+        # Runs the precommit hooks, which assign pending rate versions
+        self.env.cr.flush()
+        self.env.invalidate_all()
+        self.env.registry.clear_cache()
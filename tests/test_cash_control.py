@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyCashControl(PosMultiCurrencyCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.config.cash_control = True
+        self.session = self.open_new_session()
+        self.currency = self.foreign_currencies[0]
+
+    def _pay_cash(self, order_count):
+        orders = self._create_multi_currency_orders(
+            self.session, order_count, payments_per_order=1, currencies=self.currency
+        )
+        orders.payment_ids.write({"payment_method_id": self.cash_pm1.id})
+        self.env.flush_all()
+        return orders
+
+    def test_expected_cash_per_currency(self):
+        orders = self._pay_cash(5)
+        data = self.session.get_closing_control_data()
+        details = data["multi_currency_cash_details"]
+        self.assertEqual(len(details), 1)
+        detail = details[0]
+        self.assertEqual(detail["currency_id"], self.currency.id)
+        self.assertAlmostEqual(
+            detail["expected"], sum(orders.payment_ids.mapped("payment_currency_amount"))
+        )
+        self.assertAlmostEqual(detail["base_amount"], 50.0)
+        # The foreign notes are not part of the base drawer
+        self.assertAlmostEqual(data["default_cash_details"]["payment_amount"], 0.0)
+
+    def test_counted_difference(self):
+        self._pay_cash(2)
+        detail = self.session._get_multi_currency_cash_details()[0]
+        self.session.start_multi_currency_cash_count()
+        self.session.set_multi_currency_cash_counts({str(self.currency.id): detail["expected"] - 1.0})
+        cash = self.session.multi_currency_cash_ids
+        self.assertEqual(cash.currency_id, self.currency)
+        self.assertAlmostEqual(cash.difference, -1.0)
+        self.assertAlmostEqual(cash.base_difference, -1.0 / self._get_rate(self.currency), 2)
+
+    def test_counts_only_in_closing_control(self):
+        self._pay_cash(2)
+        counts = {str(self.currency.id): 1.0}
+        with self.assertRaises(UserError):
+            self.session.set_multi_currency_cash_counts(counts)
+        self._close_counting_expected(self.session)
+        counted = self.session.multi_currency_cash_ids.counted_amount
+        with self.assertRaises(UserError):
+            self.session.set_multi_currency_cash_counts(counts)
+        with self.assertRaises(UserError):
+            self.session.start_multi_currency_cash_count()
+        self.assertEqual(self.session.multi_currency_cash_ids.counted_amount, counted)
+
+    def test_expected_cash_query_budget(self):
+        for order_count in (10, 200):
+            with self.subTest(orders=order_count):
+                self._pay_cash(order_count)
+                self._reset_caches()
+                with self.assertQueryCount(12):
+                    self.session._get_multi_currency_cash_details()
+
+    def _close_counting_expected(self, session):
+        data = session.get_closing_control_data()
+        counts = {
+            str(detail["currency_id"]): detail["expected"]
+            for detail in data["multi_currency_cash_details"]
+        }
+        session.start_multi_currency_cash_count()
+        session.set_multi_currency_cash_counts(counts)
+        session.post_closing_cash_details(data["default_cash_details"]["amount"])
+        session.close_session_from_ui()
+        self.assertEqual(session.state, "closed")
+
+    def test_foreign_float_carried_over(self):
+        self.env["pos.order"].sync_from_ui(self._prepare_multi_currency_ui_orders(
+            3, currencies=self.currency, payment_method=self.cash_pm1
+        ))
+        self._close_counting_expected(self.session)
+        self.assertAlmostEqual(self.session.cash_register_difference, 0.0)
+        first_count = self.session.multi_currency_cash_ids.counted_amount
+
+        # The foreign notes stay in the drawer for the next session
+        session = self.open_new_session(self.session.cash_register_balance_end_real)
+        self.env["pos.order"].sync_from_ui(self._prepare_multi_currency_ui_orders(
+            2, currencies=self.currency, payment_method=self.cash_pm1
+        ))
+        detail = session._get_multi_currency_cash_details()[0]
+        self.assertAlmostEqual(detail["opening"], first_count)
+        data = session.get_closing_control_data()
+        # Only base currency cash is expected in the base drawer
+        self.assertAlmostEqual(data["default_cash_details"]["amount"], 0.0)
+        self._close_counting_expected(session)
+        self.assertAlmostEqual(session.cash_register_difference, 0.0)
+        self.assertAlmostEqual(
+            session.multi_currency_cash_ids.counted_amount, detail["expected"]
+        )
+
+        # A third session with no foreign payment still balances
+        session = self.open_new_session(session.cash_register_balance_end_real)
+        self._close_counting_expected(session)
+        self.assertAlmostEqual(session.cash_register_difference, 0.0)
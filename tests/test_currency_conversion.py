@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import random
+from datetime import date, datetime, timedelta
+
+from odoo.tests import tagged
+
+from ..models import res_currency
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyBatchConversion(PosMultiCurrencyCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        company = cls.env.company
+        rate_vals = []
+        for index, currency in enumerate(cls.foreign_currencies):
+            for month in range(1, 13):
+                rate_vals.append({
+                    "currency_id": currency.id,
+                    "name": date(2023, month, 1 + index),
+                    "rate": 1.1 + index + month / 7.0,
+                    # Alternate shared and company rates to cover precedence
+                    "company_id": company.id if month % 3 else False,
+                })
+        cls.env["res.currency.rate"].create(rate_vals)
+
+    def _sample(self, size):
+        rng = random.Random(42)
+        currencies = self.foreign_currencies | self.env.company.currency_id
+        amounts = [round(rng.uniform(-500, 5000), 2) for _i in range(size)]
+        currency_ids = [rng.choice(currencies.ids) for _i in range(size)]
+        dates = [
+            datetime(2022, 12, 1) + timedelta(days=rng.randint(0, 420), hours=rng.randint(0, 23))
+            for _i in range(size)
+        ]
+        return amounts, currency_ids, dates
+
+    def _assert_matches_convert(self, to_currency, size=300):
+        company = self.env.company
+        amounts, currency_ids, dates = self._sample(size)
+        converted = self.env["res.currency"]._convert_batch(
+            amounts, currency_ids, to_currency, company, dates
+        )
+        Currency = self.env["res.currency"]
+        for amount, currency_id, day, result in zip(amounts, currency_ids, dates, converted):
+            expected = Currency.browse(currency_id)._convert(amount, to_currency, company, day)
+            self.assertEqual(result, expected, (amount, currency_id, day))
+
+    def test_matches_convert(self):
+        self._assert_matches_convert(self.env.company.currency_id)
+        self._assert_matches_convert(self.foreign_currencies[1])
+
+    def test_matches_convert_without_numpy(self):
+        self.patch(res_currency, "numpy", None)
+        self._assert_matches_convert(self.env.company.currency_id)
+
+    def test_unrounded(self):
+        company = self.env.company
+        currency = self.foreign_currencies[0]
+        result = self.env["res.currency"]._convert_batch(
+            [1.0], [currency.id], company.currency_id, company, [date(2023, 6, 15)], round=False
+        )
+        self.assertEqual(
+            result[0], currency._convert(1.0, company.currency_id, company, date(2023, 6, 15), round=False)
+        )
+
+    def test_single_rate_query(self):
+        amounts, currency_ids, dates = self._sample(1000)
+        self.env.flush_all()
+        with self.assertQueryCount(3):
+            self.env["res.currency"]._convert_batch(
+                amounts, currency_ids, self.env.company.currency_id, self.env.company, dates
+            )
+
+    def test_conversion_rate_defaults(self):
+        Currency = self.env["res.currency"]
+        currency, company = self.foreign_currencies[0], self.env.company
+        today = date.today()
+        self.assertEqual(
+            Currency._get_conversion_rate(currency, company.currency_id),
+            Currency._get_conversion_rate(currency, company.currency_id, company, today),
+        )
+        # Core _convert passes company=None through
+        self.assertEqual(
+            currency._convert(10.0, company.currency_id, None, today),
+            currency._convert(10.0, company.currency_id, company, today),
+        )
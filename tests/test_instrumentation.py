@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import os
+
+from odoo.tests import tagged
+
+from ..tools import instrumentation
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyInstrumentation(PosMultiCurrencyCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.open_new_session()
+        instrumentation.get_metrics(self.env.cr.dbname, reset=True)
+
+    def _set_sample_rate(self, value):
+        self.env["ir.config_parameter"].sudo().set_param(
+            instrumentation.PARAM_SAMPLE_RATE, value
+        )
+
+    def _get_entry(self, metric):
+        metrics = instrumentation.get_metrics(self.env.cr.dbname)["metrics"]
+        return next((entry for entry in metrics if entry["metric"] == metric), None)
+
+    def test_disabled_records_nothing(self):
+        self._set_sample_rate("0")
+        self.config.get_multi_currency_statistics(self.session.id)
+        self.assertIsNone(self._get_entry("pos.config.get_multi_currency_statistics"))
+
+    def test_calls_and_queries_per_config(self):
+        self._set_sample_rate("1")
+        self._create_multi_currency_orders(self.session, 5)
+        self.env.flush_all()
+        for _i in range(3):
+            self.config.get_multi_currency_statistics(self.session.id)
+        entry = self._get_entry("pos.config.get_multi_currency_statistics")
+        self.assertEqual(entry["calls"], 3)
+        self.assertEqual(entry["config_id"], self.config.id)
+        self.assertGreater(entry["queries"], 0)
+        self.assertEqual(sum(entry["histogram"]), 3)
+
+    def test_reset(self):
+        self._set_sample_rate("1")
+        self.config.get_multi_currency_statistics(self.session.id)
+        instrumentation.get_metrics(self.env.cr.dbname, reset=True)
+        self.assertFalse(instrumentation.get_metrics(self.env.cr.dbname)["metrics"])
+
+    def test_sample_rate_cached(self):
+        self._set_sample_rate("0")
+        instrumentation.get_sample_rate(self.env)
+        with self.assertQueryCount(0):
+            self.assertEqual(instrumentation.get_sample_rate(self.env), 0.0)
+        # Changing the parameter invalidates the cached rate
+        self._set_sample_rate("0.5")
+        self.assertEqual(instrumentation.get_sample_rate(self.env), 0.5)
+
+    def test_metrics_tagged_with_worker(self):
+        self.assertEqual(
+            instrumentation.get_metrics(self.env.cr.dbname)["worker_pid"], os.getpid()
+        )
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import HttpCase, new_test_user, tagged
+
+from ..tools.load_test import ENDPOINTS, run_load_test
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyLoadTest(PosMultiCurrencyCommon, HttpCase):
+    """Smoke runs of the load test harness: short, but every endpoint must answer."""
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.open_new_session()
+
+    def _run(self, **kwargs):
+        return run_load_test(
+            self.env, self.config, clients=2, duration=2.0, order_rate=60.0,
+            polling_interval=0.5, statistics_interval=0.5, **kwargs
+        )
+
+    def _assert_no_errors(self, report):
+        for endpoint in ENDPOINTS:
+            stats = report["endpoints"][endpoint]
+            self.assertEqual(stats["errors"], 0, endpoint)
+            self.assertGreater(stats["calls"], 0, endpoint)
+
+    def test_smoke_local(self):
+        report = self._run()
+        self.assertEqual(report["mode"], "local")
+        self._assert_no_errors(report)
+
+    def test_smoke_http(self):
+        company = self.config.company_id
+        new_test_user(
+            self.env, login="pos_multi_load", password="pos_multi_load",
+            groups="base.group_user,point_of_sale.group_pos_manager",
+            company_id=company.id, company_ids=[company.id],
+        )
+        report = self._run(base_url=self.base_url(), login="pos_multi_load", password="pos_multi_load")
+        self.assertEqual(report["mode"], "http")
+        self.assertIsNone(report["endpoints"]["rates"]["avg_queries"])
+        self._assert_no_errors(report)
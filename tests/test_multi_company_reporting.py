@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from odoo import Command
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyReportingAccess(PosMultiCurrencyCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.open_new_session()
+        self.currency = self.foreign_currencies[0]
+        payments = []
+        for amount, rate in ((10.0, 2.0), (30.0, 4.0)):
+            vals = self._prepare_payment_vals(amount, self.currency)
+            vals.update(exchange_rate=rate, payment_currency_amount=amount * rate)
+            payments.append(Command.create(vals))
+        self.env["pos.order"].create({
+            "session_id": self.session.id,
+            "amount_tax": 0.0,
+            "amount_total": 40.0,
+            "amount_paid": 40.0,
+            "amount_return": 0.0,
+            "payment_ids": payments,
+        })
+        self.env["report.pos.multi.currency.rate.anomaly"]._refresh(full=True)
+        self.env.flush_all()
+
+    def test_grouped_effective_rate_is_weighted(self):
+        [(rate,)] = self.env["report.pos.multi.currency.payment"]._read_group(
+            [("currency_id", "=", self.currency.id)], aggregates=["effective_rate:avg"],
+        )
+        # (20 + 120) / (10 + 30), not the average of 2.0 and 4.0
+        self.assertAlmostEqual(rate, 3.5, 6)
+
+    def test_other_company_cannot_read(self):
+        company = self.env["res.company"].create({"name": "Other POS Company"})
+        user = self.env["res.users"].create({
+            "name": "Other POS Manager",
+            "login": "other_pos_manager",
+            "company_id": company.id,
+            "company_ids": [Command.set(company.ids)],
+            "group_ids": [Command.set(self.env.ref("point_of_sale.group_pos_manager").ids)],
+        })
+        for model in (
+            "pos.session.currency.ledger",
+            "pos.order.currency.summary",
+            "report.pos.multi.currency.payment",
+            "report.pos.multi.currency.rate.anomaly",
+        ):
+            with self.subTest(model=model):
+                self.assertTrue(self.env[model].search_count([]))
+                self.assertFalse(self.env[model].with_user(user).search_count([]))
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyQueryBudgets(PosMultiCurrencyCommon):
+    """
+    Query-count budgets for the module's hot paths.
+
+    Each budget is asserted for every data size: the number of queries
+    must not grow with the number of orders or payments, so a scaling
+    regression (a per-record query in a loop) fails loudly.  Wall-clock
+    times are recorded and logged per size.
+    """
+
+    # (orders, payment lines per order)
+    SIZES = [(10, 2), (100, 2), (400, 3)]
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.open_new_session()
+
+    def _build(self, order_count, payments_per_order):
+        orders = self._create_multi_currency_orders(
+            self.session, order_count, payments_per_order
+        )
+        self._reset_caches()
+        return orders
+
+    def test_order_foreign_currency_stats(self):
+        for order_count, payments_per_order in self.SIZES:
+            with self.subTest(orders=order_count):
+                orders = self._build(order_count, payments_per_order)
+                with self._record_timing("pos.order._compute_foreign_currency_stats", order_count), \
+                        self.assertQueryCount(5):
+                    orders._compute_foreign_currency_stats()
+                self.assertTrue(all(orders.mapped("has_foreign_payments")))
+
+    def test_order_currency_summaries(self):
+        """Replaces the former _compute_foreign_currency_details JSON compute."""
+        Summary = self.env["pos.order.currency.summary"]
+        for order_count, payments_per_order in self.SIZES:
+            with self.subTest(orders=order_count):
+                orders = self._build(order_count, payments_per_order)
+                with self._record_timing("pos.order.currency.summary._refresh_for_orders", order_count), \
+                        self.assertQueryCount(25):
+                    Summary._refresh_for_orders(orders)
+                    self.env.flush_all()
+                summaries = Summary.search([("order_id", "in", orders.ids)])
+                self.assertEqual(
+                    sum(summaries.mapped("payment_count")),
+                    order_count * payments_per_order,
+                )
+
+    def test_order_currency_summaries_in_place(self):
+        order = self._create_multi_currency_orders(self.session, 1, payments_per_order=2)
+        first, second = order.payment_ids.sorted("id")
+        summary_ids = {s.currency_id: s.id for s in order.currency_summary_ids}
+
+        first.amount = 25.0
+        summary = order.currency_summary_ids.filtered(
+            lambda s: s.currency_id == first.payment_currency_id
+        )
+        self.assertEqual(summary.id, summary_ids[first.payment_currency_id])
+        self.assertAlmostEqual(summary.total_base_amount, 25.0, 2)
+
+        # The second currency disappears, the first row is kept
+        removed_currency = second.payment_currency_id
+        second.payment_currency_id = first.payment_currency_id
+        self.assertEqual(order.currency_summary_ids.ids, [summary_ids[first.payment_currency_id]])
+        self.assertEqual(order.currency_summary_ids.payment_count, 2)
+        self.assertFalse(
+            self.env["pos.order.currency.summary"].browse(summary_ids[removed_currency]).exists()
+        )
+
+    def test_session_multi_currency_stats(self):
+        expected_payments = 0
+        for order_count, payments_per_order in self.SIZES:
+            with self.subTest(orders=order_count):
+                self._build(order_count, payments_per_order)
+                expected_payments += order_count * payments_per_order
+                with self._record_timing("pos.session._compute_multi_currency_stats", order_count), \
+                        self.assertQueryCount(3):
+                    self.session._compute_multi_currency_stats()
+                self.assertEqual(self.session.foreign_payment_count, expected_payments)
+
+    def test_session_multi_currency_breakdown(self):
+        for order_count, payments_per_order in self.SIZES:
+            with self.subTest(orders=order_count):
+                self._build(order_count, payments_per_order)
+                with self._record_timing("pos.session._compute_multi_currency_breakdown", order_count), \
+                        self.assertQueryCount(4):
+                    self.session._compute_multi_currency_breakdown()
+                self.assertEqual(
+                    {int(key) for key in self.session.foreign_currency_breakdown},
+                    set(self.foreign_currencies.ids),
+                )
+
+    def test_session_search_in_database(self):
+        self._build(*self.SIZES[0])
+        Session = self.env["pos.session"]
+        self.env.flush_all()
+        with self.assertQueryCount(1):
+            foreign = Session.search([("has_foreign_payments", "=", True)])
+        self.assertIn(self.session, foreign)
+        self.assertNotIn(self.session, Session.search([("has_foreign_payments", "=", False)]))
+        edited = Session.search([("manual_rate_edit_count", ">", 0)])
+        unedited = Session.search([("manual_rate_edit_count", "=", 0)])
+        self.assertFalse(edited & unedited)
+        self.assertEqual(edited | unedited, Session.search([]))
+        self.assertEqual(bool(self.session & edited), self.session.manual_rate_edit_count > 0)
+
+    def test_get_multi_currency_config(self):
+        for order_count, payments_per_order in self.SIZES:
+            with self.subTest(orders=order_count):
+                self._build(order_count, payments_per_order)
+                with self._record_timing("pos.config.get_multi_currency_config", order_count), \
+                        self.assertQueryCount(15):
+                    result = self.config.get_multi_currency_config()
+                self.assertTrue(result["enabled"])
+
+    def test_get_multi_currency_rates(self):
+        for order_count, payments_per_order in self.SIZES:
+            with self.subTest(orders=order_count):
+                self._build(order_count, payments_per_order)
+                with self._record_timing("pos.config.get_multi_currency_rates (cold)", order_count), \
+                        self.assertQueryCount(10):
+                    snapshot = self.config.get_multi_currency_rates()
+                with self._record_timing("pos.config.get_multi_currency_rates (cached)", order_count), \
+                        self.assertQueryCount(2):
+                    unchanged = self.config.get_multi_currency_rates(
+                        since_version=snapshot["version"],
+                        since_date=snapshot["date"],
+                        currency_ids=list(snapshot["rates"]),
+                    )
+                self.assertTrue(unchanged["unchanged"])
+
+    def test_get_multi_currency_statistics(self):
+        expected_payments = 0
+        for order_count, payments_per_order in self.SIZES:
+            with self.subTest(orders=order_count):
+                self._build(order_count, payments_per_order)
+                expected_payments += order_count * payments_per_order
+                with self._record_timing("pos.config.get_multi_currency_statistics", order_count), \
+                        self.assertQueryCount(5):
+                    result = self.config.get_multi_currency_statistics(self.session.id)
+                self.assertEqual(
+                    sum(row["transaction_count"] for row in result["statistics"]),
+                    expected_payments,
+                )
+
+
+@tagged("post_install", "-at_install", "-standard", "pos_multi_benchmark")
+class TestMultiCurrencyBenchmark(PosMultiCurrencyCommon):
+    """
+    Heavier benchmarks, excluded from standard runs.
+    Run with ``--test-tags pos_multi_benchmark``.
+    """
+
+    CONVERSION_SIZES = [10000, 100000, 1000000]
+
+    def test_batch_conversion(self):
+        """Historical conversion throughput of res.currency._convert_batch."""
+        company = self.env.company
+        currency_ids = (self.foreign_currencies | company.currency_id).ids
+        start = datetime(2023, 1, 1)
+        for size in self.CONVERSION_SIZES:
+            with self.subTest(size=size):
+                amounts = [float(index % 1000) + 0.25 for index in range(size)]
+                from_ids = [currency_ids[index % len(currency_ids)] for index in range(size)]
+                dates = [start + timedelta(hours=index % 8760) for index in range(size)]
+                with self._record_timing("res.currency._convert_batch", size):
+                    converted = self.env["res.currency"]._convert_batch(
+                        amounts, from_ids, company.currency_id, company, dates
+                    )
+                self.assertEqual(len(converted), size)
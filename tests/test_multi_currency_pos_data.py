@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyPosData(PosMultiCurrencyCommon):
+
+    def test_pos_data_block(self):
+        data = self.config._get_multi_currency_pos_data()
+        self.assertTrue(data["enabled"])
+        self.assertEqual(
+            {currency["id"] for currency in data["currencies"]},
+            set((self.foreign_currencies | self.config.currency_id).ids),
+        )
+        for currency in data["currencies"]:
+            self.assertEqual(currency["rate"], data["rates"]["rates"][currency["id"]])
+        self.assertEqual(data["rates"]["base_currency_id"], self.env.company.currency_id.id)
+
+    def test_pos_data_cached(self):
+        self.config._get_multi_currency_pos_data()
+        with self.assertQueryCount(0):
+            self.config._get_multi_currency_pos_data()
+
+    def test_rate_version_assigned_at_commit(self):
+        currency = self.foreign_currencies[0]
+        self.env.cr.flush()
+        before = self.config.get_multi_currency_rates()
+        new_rate = before["rates"][currency.id] * 2.0
+        self.env["res.currency.rate"].create({
+            "currency_id": currency.id,
+            "name": fields.Date.context_today(self.config),
+            "rate": new_rate,
+            "company_id": self.env.company.id,
+        })
+        # The writing transaction sees its new rate, under no version yet
+        self.assertAlmostEqual(self.config.get_multi_currency_rates()["rates"][currency.id], new_rate)
+        self.assertLessEqual(currency.pos_rate_version, before["version"])
+
+        self.env.cr.flush()
+        self.assertGreater(currency.pos_rate_version, before["version"])
+        after = self.config.get_multi_currency_rates(
+            since_version=before["version"],
+            since_date=before["date"],
+            currency_ids=list(before["rates"]),
+        )
+        self.assertTrue(after["partial"])
+        self.assertEqual(after["rates"], {currency.id: after["rates"][currency.id]})
+        self.assertAlmostEqual(after["rates"][currency.id], new_rate)
+
+    def test_rate_changed_twice_in_transaction(self):
+        currency = self.foreign_currencies[0]
+        rate = self.env["res.currency.rate"].create({
+            "currency_id": currency.id,
+            "name": fields.Date.context_today(self.config),
+            "rate": 7.0,
+            "company_id": self.env.company.id,
+        })
+        self.assertAlmostEqual(self.config.get_multi_currency_rates()["rates"][currency.id], 7.0)
+        rate.rate = 8.0
+        self.assertAlmostEqual(self.config.get_multi_currency_rates()["rates"][currency.id], 8.0)
+
+    def test_pos_data_invalidated_on_config_change(self):
+        self.config._get_multi_currency_pos_data()
+        self.config.multi_currency_ids = self.foreign_currencies[:1]
+        data = self.config._get_multi_currency_pos_data()
+        self.assertEqual(
+            {currency["id"] for currency in data["currencies"]},
+            set((self.foreign_currencies[:1] | self.config.currency_id).ids),
+        )
+
+    def test_pos_data_invalidated_on_currency_change(self):
+        currency = self.foreign_currencies[0]
+        self.config._get_multi_currency_pos_data()
+        currency.symbol = "¤"
+        data = self.config._get_multi_currency_pos_data()
+        self.assertIn("¤", [entry["symbol"] for entry in data["currencies"]])
+
+    def test_config_change_keeps_other_caches(self):
+        Currency = self.env["res.currency"]
+        currency, company = self.foreign_currencies[0], self.env.company
+        Currency._get_conversion_rate(currency, company.currency_id, company, fields.Date.today())
+        self.config.multi_currency_ids = self.foreign_currencies[:1]
+        self.env.flush_all()
+        with self.assertQueryCount(0):
+            Currency._get_conversion_rate(currency, company.currency_id, company, fields.Date.today())
+
+    def test_can_edit_rate(self):
+        self.config.write({
+            "multi_currency_allow_rate_edit": False,
+            "multi_currency_rate_edit_group_id": False,
+        })
+        self.assertFalse(self.config._get_multi_currency_pos_data()["can_edit_rate"])
+
+        # Managers may edit rates even without a dedicated group
+        self.config.multi_currency_allow_rate_edit = True
+        self.assertTrue(
+            self.config.with_user(self.env.user)._get_multi_currency_pos_data()["can_edit_rate"]
+        )
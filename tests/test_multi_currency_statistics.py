@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyStatistics(PosMultiCurrencyCommon):
+    """The grouped statistics query behind get_multi_currency_statistics and its route."""
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.open_new_session()
+        self.Payment = self.env["pos.payment"]
+
+    def _build(self, order_count):
+        self._create_multi_currency_orders(self.session, order_count)
+        self._reset_caches()
+
+    def test_query_count(self):
+        """One grouped query (plus the currency names), whatever the number of payments."""
+        expected_payments = 0
+        for order_count in (5, 50):
+            with self.subTest(orders=order_count):
+                self._build(order_count)
+                expected_payments += order_count * 2
+                for filters in (
+                    {"session_ids": self.session.ids},
+                    {"config_ids": self.config.ids},
+                    {
+                        "config_ids": self.config.ids,
+                        "date_from": fields.Datetime.now() - timedelta(days=1),
+                    },
+                ):
+                    self.env.invalidate_all()
+                    with self.assertQueryCount(2):
+                        statistics = self.Payment._get_multi_currency_statistics(**filters)
+                    self.assertEqual(
+                        sum(row["transaction_count"] for row in statistics), expected_payments
+                    )
+
+    def test_statistics_across_sessions(self):
+        self._build(20)
+        result = self.config.get_multi_currency_statistics(config_ids=self.config.ids)
+        self.assertEqual(sum(row["transaction_count"] for row in result["statistics"]), 40)
+        self.assertEqual(
+            sum(row["manually_edited_count"] for row in result["statistics"]),
+            8,
+        )
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyOrderHistory(PosMultiCurrencyCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.open_new_session()
+
+    def _browse_all(self, **kwargs):
+        Order = self.env["pos.order"]
+        seen = []
+        after = None
+        while True:
+            page = Order.search_multi_currency_orders(
+                config_ids=self.config.ids, after=after, **kwargs
+            )
+            seen += [order["id"] for order in page["orders"]]
+            after = page["next_cursor"]
+            if not after:
+                return seen
+
+    def test_keyset_pages(self):
+        orders = self._create_multi_currency_orders(self.session, 23)
+        seen = self._browse_all(limit=5)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(set(seen), set(orders.ids))
+        expected = orders.sorted(lambda o: (o.date_order, o.id), reverse=True).ids
+        self.assertEqual(seen, expected)
+
+    def test_filters(self):
+        self._create_multi_currency_orders(self.session, 10, payments_per_order=1)
+        currency = self.foreign_currencies[0]
+        seen = self.env["pos.order"].browse(self._browse_all(currency_ids=currency.ids))
+        self.assertTrue(seen)
+        self.assertTrue(all(currency in order.currency_summary_ids.currency_id for order in seen))
+        manual = self.env["pos.order"].browse(self._browse_all(manual_only=True))
+        self.assertTrue(manual)
+        self.assertTrue(all(manual.mapped("manual_rate_count")))
+
+    def test_page_query_budget(self):
+        for order_count in (10, 100):
+            with self.subTest(orders=order_count):
+                self._create_multi_currency_orders(self.session, order_count)
+                self._reset_caches()
+                with self.assertQueryCount(15):
+                    page = self.env["pos.order"].search_multi_currency_orders(
+                        config_ids=self.config.ids, limit=50
+                    )
+                self.assertTrue(page["orders"][0]["foreign_currency_details"])
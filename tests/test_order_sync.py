@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+class PosMultiCurrencySyncCommon(PosMultiCurrencyCommon):
+
+    def _sync_counting_aggregates(self, backlog):
+        """Sync ``backlog`` orders; return [(payment count, queries)] per aggregate update."""
+        Payment = type(self.env["pos.payment"])
+        update = Payment._update_multi_currency_aggregates
+        calls = []
+
+        def counting_update(payments):
+            queries_before = payments.env.cr.sql_log_count
+            update(payments)
+            payments.env.flush_all()
+            calls.append((len(payments), payments.env.cr.sql_log_count - queries_before))
+
+        self.patch(Payment, "_update_multi_currency_aggregates", counting_update)
+        self.env["pos.order"].sync_from_ui(self._prepare_multi_currency_ui_orders(backlog))
+        return calls
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyOrderSync(PosMultiCurrencySyncCommon):
+
+    def test_aggregates_once_per_batch(self):
+        budgets = set()
+        for backlog in (10, 50):
+            with self.subTest(backlog=backlog):
+                session = self.open_new_session()
+                calls = self._sync_counting_aggregates(backlog)
+                # One update for the whole batch, not one per order
+                self.assertEqual([count for count, _queries in calls], [backlog])
+                budgets.add(calls[0][1])
+                session.invalidate_recordset()
+                self.assertEqual(session.foreign_payment_count, backlog)
+                session.close_session_from_ui()
+        # ... whose query count does not grow with the backlog
+        self.assertEqual(len(budgets), 1, budgets)
+
+
+@tagged("post_install", "-at_install", "-standard", "pos_multi_benchmark")
+class TestMultiCurrencyOrderSyncBenchmark(PosMultiCurrencySyncCommon):
+    """Run with ``--test-tags pos_multi_benchmark``."""
+
+    SYNC_BACKLOG_SIZES = [50, 200, 1000]
+
+    def test_sync_backlog(self):
+        """Sync time against backlog size for orders pushed by an offline terminal."""
+        for backlog in self.SYNC_BACKLOG_SIZES:
+            with self.subTest(backlog=backlog):
+                session = self.open_new_session()
+                ui_orders = self._prepare_multi_currency_ui_orders(backlog)
+                with self._record_timing("pos.order.sync_from_ui", backlog):
+                    self.env["pos.order"].sync_from_ui(ui_orders)
+                    self.env.flush_all()
+                session.invalidate_recordset()
+                self.assertEqual(session.foreign_payment_count, backlog)
+                session.close_session_from_ui()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyRateAnomaly(PosMultiCurrencyCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.open_new_session()
+        self.orders = self._create_multi_currency_orders(self.session, 6)
+        self.Anomaly = self.env["report.pos.multi.currency.rate.anomaly"]
+
+    def _rows(self):
+        return self.Anomaly.search([("session_id", "=", self.session.id)])
+
+    def test_full_refresh(self):
+        payment = self.orders[0].payment_ids[0]
+        payment.exchange_rate *= 2
+        self.Anomaly._refresh(full=True)
+
+        rows = self._rows()
+        self.assertEqual(len(rows), len(self.orders.payment_ids))
+        for row in rows:
+            with self.subTest(payment=row.payment_id.id):
+                self.assertAlmostEqual(row.market_rate, self._get_rate(row.currency_id), 6)
+        anomaly = rows.filtered(lambda row: row.payment_id == payment)
+        self.assertAlmostEqual(anomaly.deviation, 100.0, 2)
+        self.assertTrue(anomaly.exceeds_tolerance)
+        self.assertEqual(
+            (anomaly.cashier_rank, anomaly.config_rank, anomaly.currency_rank), (1, 1, 1)
+        )
+        self.assertFalse(any((rows - anomaly).mapped("exceeds_tolerance")))
+
+    def test_incremental_refresh(self):
+        self.Anomaly._refresh()
+        currency = self.foreign_currencies[0]
+        self.env["res.currency.rate"].create({
+            "currency_id": currency.id,
+            "name": fields.Date.today(),
+            "rate": self._get_rate(currency) * 1.1,
+            "company_id": self.env.company.id,
+        })
+        new_orders = self._create_multi_currency_orders(self.session, 2)
+        self.Anomaly._refresh()
+
+        rows = self._rows()
+        self.assertEqual(len(rows), len((self.orders | new_orders).payment_ids))
+        for row in rows.filtered(lambda row: row.currency_id == currency):
+            with self.subTest(payment=row.payment_id.id):
+                self.assertAlmostEqual(row.market_rate, self._get_rate(currency), 6)
+
+
+    def test_incremental_refresh_after_tolerance_change(self):
+        payment = self.orders[0].payment_ids[0]
+        payment.exchange_rate *= 2
+        self.Anomaly._refresh()
+        anomaly = self._rows().filtered(lambda row: row.payment_id == payment)
+        self.assertTrue(anomaly.exceeds_tolerance)
+
+        # Only the tolerance changed since the last refresh
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE pos_payment SET write_date = write_date - INTERVAL '1 day' WHERE id = ANY(%s)",
+            [self.orders.payment_ids.ids],
+        )
+        self.config.multi_currency_rate_tolerance = 150.0
+        self.Anomaly._refresh()
+        self.assertFalse(anomaly.exceeds_tolerance)
+        self.assertEqual(
+            (anomaly.cashier_rank, anomaly.config_rank, anomaly.currency_rank), (1, 1, 1)
+        )
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import base64
+import json
+from datetime import date
+
+from odoo import Command
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from ..tools import rate_import
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyRateImport(PosMultiCurrencyCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.Rate = self.env["res.currency.rate"]
+        self.company = self.env.company
+        self.changed, self.untouched = self.foreign_currencies[0], self.foreign_currencies[1]
+        # Rate versions are assigned right before commit
+        self.env.cr.flush()
+
+    def _import(self, content, file_format="csv"):
+        rows = rate_import.iter_rate_rows(content, file_format)
+        result = self.Rate._pos_multi_bulk_import(rows, company=self.company)
+        self.env.cr.flush()
+        return result
+
+    def _rates(self, currency):
+        return {
+            (rate.name, rate.company_id.id): rate.rate
+            for rate in self.Rate.search([("currency_id", "=", currency.id)])
+        }
+
+    def test_csv_upsert(self):
+        untouched_version = self.untouched.pos_rate_version
+        content = "\n".join([
+            "currency,date,rate,company_id",
+            f"{self.changed.name},2020-01-01,9.5,",
+            f"{self.changed.name},2021-01-01,10.0,",
+            f"{self.changed.name},2021-01-01,11.0,",
+            f"{self.changed.name},2021-01-02,12.0,",
+            f"{self.untouched.name},2020-01-01,{self._rates(self.untouched)[(date(2020, 1, 1), self.company.id)]},",
+            "ZZZ,2021-01-01,1.0,",
+        ])
+        result = self._import(content)
+
+        self.assertEqual(result["rows"], 6)
+        self.assertEqual(
+            (result["inserted"], result["updated"], result["unchanged"]), (2, 1, 1)
+        )
+        self.assertEqual(result["unknown_currencies"], ["ZZZ"])
+        self.assertEqual(result["currency_ids"], self.changed.ids)
+        self.assertEqual(self._rates(self.changed), {
+            (date(2020, 1, 1), self.company.id): 9.5,
+            # the last row wins for duplicate keys
+            (date(2021, 1, 1), self.company.id): 11.0,
+            (date(2021, 1, 2), self.company.id): 12.0,
+        })
+        self.assertEqual(self.untouched.pos_rate_version, untouched_version)
+        self.assertGreater(self.changed.pos_rate_version, untouched_version)
+
+        # Importing the same file again changes nothing
+        version = self.changed.pos_rate_version
+        result = self._import(content)
+        self.assertEqual((result["inserted"], result["updated"]), (0, 0))
+        self.assertEqual(self.changed.pos_rate_version, version)
+
+    def test_json_shared_rates(self):
+        content = json.dumps({"rates": [
+            {"currency": self.changed.name, "date": "2022-03-01", "rate": 4.0},
+        ]})
+        rows = rate_import.iter_rate_rows(content, "json")
+        self.Rate._pos_multi_bulk_import(rows)
+        self._import(content, "json")
+        self.assertEqual(self._rates(self.changed)[(date(2022, 3, 1), False)], 4.0)
+        self.assertEqual(self._rates(self.changed)[(date(2022, 3, 1), self.company.id)], 4.0)
+
+    def test_file_company_ids(self):
+        branch = self.env["res.company"].create({
+            "name": "POS Branch",
+            "parent_id": self.company.id,
+        })
+        content = "\n".join([
+            "currency,date,rate,company_id",
+            f"{self.changed.name},2022-05-01,6.0,{branch.id}",
+        ])
+        self._import(content)
+        # Rates of a branch are stored on its root company
+        self.assertEqual(self._rates(self.changed)[(date(2022, 5, 1), self.company.id)], 6.0)
+
+        missing_id = self.env["res.company"].search([], order="id desc", limit=1).id + 1
+        content += f"\n{self.changed.name},2022-05-02,6.5,{missing_id}"
+        with self.assertRaisesRegex(ValueError, "line 2"):
+            self._import(content)
+
+    def test_wizard(self):
+        wizard = self.env["pos.multi.currency.rate.import"].create({
+            "file": base64.b64encode(f"currency,date,rate\n{self.changed.name},2023-01-01,7.0\n".encode()),
+            "filename": "rates.csv",
+        })
+        wizard.action_import()
+        self.assertEqual(wizard.state, "done")
+        self.assertEqual(self._rates(self.changed)[(date(2023, 1, 1), self.company.id)], 7.0)
+
+        wizard = self.env["pos.multi.currency.rate.import"].create({
+            "file": base64.b64encode(b"currency,date\nEUR,2023-01-01\n"),
+            "filename": "rates.csv",
+        })
+        with self.assertRaises(UserError):
+            wizard.action_import()
+
+    def test_wizard_other_company(self):
+        other = self.env["res.company"].create({"name": "Other Company"})
+        self.env.user.write({"company_ids": [Command.unlink(other.id)]})
+        Wizard = self.env["pos.multi.currency.rate.import"]
+        content = f"currency,date,rate\n{self.changed.name},2023-01-01,7.0\n"
+
+        wizard = Wizard.create({
+            "file": base64.b64encode(content.encode()),
+            "filename": "rates.csv",
+            "company_id": other.id,
+        })
+        with self.assertRaises(UserError):
+            wizard.action_import()
+
+        wizard = Wizard.create({
+            "file": base64.b64encode(f"currency,date,rate,company_id\n{self.changed.name},2023-01-01,7.0,{other.id}\n".encode()),
+            "filename": "rates.csv",
+        })
+        with self.assertRaisesRegex(UserError, "line 2"):
+            wizard.action_import()
+        self.assertNotIn((date(2023, 1, 1), other.id), self._rates(self.changed))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+SLOW_DELAY = 3.0  # seconds
+
+
+class _StandInProviderHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for rate providers:
+    ``/rates/<base>?<CODE>=<rate>&...`` answers the given rates,
+    ``/slow/...`` the same after ``SLOW_DELAY``, ``/error`` a 500.
+    """
+
+    def do_GET(self):
+        path, _sep, query = self.path.partition("?")
+        parts = path.strip("/").split("/")
+        if parts[0] == "error":
+            self.send_error(500)
+            return
+        if parts[0] == "slow":
+            time.sleep(SLOW_DELAY)
+        rates = dict(pair.split("=") for pair in query.split("&") if pair)
+        body = json.dumps({
+            "base": parts[1],
+            "date": "2024-05-01",
+            "rates": {code: float(rate) for code, rate in rates.items()},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyRateProvider(PosMultiCurrencyCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInProviderHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    def setUp(self):
+        super().setUp()
+        self.company_code = self.env.company.currency_id.name
+        self.first, self.second, self.third = self.foreign_currencies
+
+    def _provider(self, name, path, sequence, timeout=1.0, **kwargs):
+        return self.env["pos.multi.currency.rate.provider"].create({
+            "name": name,
+            "provider_type": "json",
+            "url": f"{self.base_url}/{path}",
+            "sequence": sequence,
+            "timeout": timeout,
+            **kwargs,
+        })
+
+    def _rate(self, currency):
+        rate = self.env["res.currency.rate"].search([
+            ("currency_id", "=", currency.id),
+            ("name", "=", date(2024, 5, 1)),
+            ("company_id", "=", self.env.company.id),
+        ])
+        return rate.rate if rate else None
+
+    def test_priority_and_fallback(self):
+        primary = self._provider(
+            "Primary", f"rates/{self.company_code}?{self.first.name}=2.0", sequence=1,
+        )
+        # Quotes in another base are converted to the company currency
+        secondary = self._provider(
+            "Secondary",
+            f"rates/{self.second.name}?{self.company_code}=0.5"
+            f"&{self.first.name}=9.0&{self.third.name}=2.0",
+            sequence=2,
+            currency_ids=[(6, 0, (self.first | self.third).ids)],
+        )
+        (primary | secondary)._fetch_and_import()
+
+        self.assertAlmostEqual(self._rate(self.first), 2.0)
+        self.assertAlmostEqual(self._rate(self.third), 4.0)
+        # Not among the currencies of the secondary provider
+        self.assertIsNone(self._rate(self.second))
+        self.assertEqual((primary | secondary).mapped("last_status"), ["ok", "ok"])
+
+    def test_slow_provider_does_not_block(self):
+        slow = self._provider(
+            "Slow", f"slow/{self.company_code}?{self.first.name}=5.0", sequence=1, timeout=0.5,
+        )
+        broken = self._provider("Broken", "error", sequence=2)
+        fast = self._provider(
+            "Fast", f"rates/{self.company_code}?{self.first.name}=3.0", sequence=3,
+        )
+        start = time.monotonic()
+        (slow | broken | fast)._fetch_and_import()
+
+        self.assertLess(time.monotonic() - start, SLOW_DELAY)
+        self.assertAlmostEqual(self._rate(self.first), 3.0)
+        self.assertEqual(
+            (slow | broken | fast).mapped("last_status"), ["timeout", "error", "ok"]
+        )
+
+    def test_missing_company_currency(self):
+        provider = self._provider("Other base", f"rates/{self.second.name}?{self.first.name}=2.0", 1)
+        provider._fetch_and_import()
+        self.assertEqual(provider.last_status, "error")
+        self.assertIsNone(self._rate(self.first))
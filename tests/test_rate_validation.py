@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+from odoo import Command
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyRateValidation(PosMultiCurrencyCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.open_new_session()
+
+    def _tamper(self, ui_order, rate_factor=1.0, amount_factor=1.0):
+        for command in ui_order["payment_ids"]:
+            vals = command[2]
+            vals["exchange_rate"] *= rate_factor
+            vals["payment_currency_amount"] = vals["amount"] * vals["exchange_rate"] * amount_factor
+
+    def _synced_payments(self, ui_orders):
+        self.env["pos.order"].sync_from_ui(ui_orders)
+        return self.env["pos.payment"].search([
+            ("session_id", "=", self.session.id),
+            ("payment_currency_id", "!=", False),
+        ], order="id")
+
+    def test_flag_policy(self):
+        ui_orders = self._prepare_multi_currency_ui_orders(3)
+        self._tamper(ui_orders[1], rate_factor=3.0)
+        self._tamper(ui_orders[2], amount_factor=0.5)
+        payments = self._synced_payments(ui_orders)
+        self.assertEqual(payments.mapped("rate_deviation_flagged"), [False, True, True])
+        self.assertAlmostEqual(
+            payments[0].market_exchange_rate, self._get_rate(payments[0].payment_currency_id), 6
+        )
+        self.assertAlmostEqual(payments[1].rate_deviation, 200.0, 2)
+
+    def test_reject_policy(self):
+        self.config.multi_currency_rate_policy = "reject"
+        ui_orders = self._prepare_multi_currency_ui_orders(2)
+        self._tamper(ui_orders[0], rate_factor=0.1)
+        with self.assertRaises(ValidationError):
+            self.env["pos.order"].sync_from_ui(ui_orders)
+
+    def test_timeline_matches_get_rates(self):
+        company = self.env.company
+        currency = self.foreign_currencies[0]
+        self.env["res.currency.rate"].create([
+            {"currency_id": currency.id, "name": "2021-01-01", "rate": 2.0, "company_id": False},
+            {"currency_id": currency.id, "name": "2022-01-01", "rate": 3.0, "company_id": company.id},
+            {"currency_id": currency.id, "name": "2023-01-01", "rate": 4.0, "company_id": False},
+        ])
+        timelines = currency._get_rate_timelines(company, date(2019, 6, 1), date(2024, 1, 1))
+        for day in (date(2019, 6, 1), date(2020, 6, 1), date(2021, 6, 1),
+                    date(2022, 6, 1), date(2023, 6, 1), date(2024, 1, 1)):
+            with self.subTest(day=day):
+                self.assertEqual(
+                    self.env["res.currency"]._get_timeline_rate(timelines[currency.id], day),
+                    currency._get_rates(company, day)[currency.id],
+                )
+
+    def test_one_rate_query_per_batch(self):
+        currency = self.foreign_currencies[0]
+        timelines_before = []
+        Currency = type(self.env["res.currency"])
+        original = Currency._get_rate_timelines
+
+        def counting(records, *args, **kwargs):
+            timelines_before.append(records.ids)
+            return original(records, *args, **kwargs)
+
+        self.patch(Currency, "_get_rate_timelines", counting)
+        self._synced_payments(self._prepare_multi_currency_ui_orders(20, currency))
+        self.assertEqual(len(timelines_before), 1)
+
+    def test_orm_created_payments_not_validated(self):
+        self.env["pos.order"].create({
+            "session_id": self.session.id,
+            "amount_tax": 0.0,
+            "amount_total": 10.0,
+            "amount_paid": 10.0,
+            "amount_return": 0.0,
+            "payment_ids": [Command.create(
+                self._prepare_payment_vals(10.0, self.foreign_currencies[0])
+            )],
+        })
+        payment = self.env["pos.payment"].search([("session_id", "=", self.session.id)])
+        self.assertFalse(payment.market_exchange_rate)
+
+    def test_sync_result_is_up_to_date(self):
+        ui_orders = self._prepare_multi_currency_ui_orders(2)
+        self._tamper(ui_orders[1], rate_factor=3.0)
+        result = self.env["pos.order"].sync_from_ui(ui_orders)
+        # Values of the deferred aggregation, not those before it ran
+        for order_data in result["pos.order"]:
+            self.assertTrue(order_data["has_foreign_payments"])
+            self.assertEqual(order_data["foreign_currency_count"], 1)
+        payments_data = sorted(result["pos.payment"], key=lambda data: data["id"])
+        self.assertEqual(
+            [data["rate_deviation_flagged"] for data in payments_data], [False, True]
+        )
+        self.assertTrue(all(data["market_exchange_rate"] for data in payments_data))
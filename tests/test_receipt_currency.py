@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyReceiptCurrency(PosMultiCurrencyCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.receipt_currency = self.foreign_currencies[0]
+        self.config.multi_currency_receipt_currency_id = self.receipt_currency
+        self.session = self.open_new_session()
+
+    def test_reprint_matches_first_receipt(self):
+        result = self.env["pos.order"].sync_from_ui(self._prepare_multi_currency_ui_orders(1))
+        first_order = result["pos.order"][0]
+        first_lines = {line["id"]: line for line in result["pos.order.line"]}
+        self.assertEqual(first_order["receipt_currency_id"], self.receipt_currency.id)
+        self.assertTrue(first_order["receipt_amount_total"])
+        self.assertTrue(all(line["receipt_price_subtotal_incl"] for line in first_lines.values()))
+
+        # A later rate change must not alter what a reprint shows
+        self.env["res.currency.rate"].create({
+            "currency_id": self.receipt_currency.id,
+            "name": fields.Date.context_today(self.config),
+            "rate": self._get_rate(self.receipt_currency) * 2.0,
+            "company_id": self.env.company.id,
+        })
+        order = self.env["pos.order"].browse(first_order["id"])
+        order.invalidate_recordset()
+        reprint = order._export_multi_currency_for_ui()[order.id]
+        for field in ("receipt_currency_rate", "receipt_amount_total", "receipt_amount_tax",
+                      "receipt_amount_paid", "receipt_amount_return"):
+            self.assertEqual(reprint[field], first_order[field], field)
+        self.assertEqual(set(reprint["receipt_line_amounts"]), set(first_lines))
+        for line_id, amounts in reprint["receipt_line_amounts"].items():
+            self.assertEqual(amounts["price_subtotal"], first_lines[line_id]["receipt_price_subtotal"])
+            self.assertEqual(
+                amounts["price_subtotal_incl"], first_lines[line_id]["receipt_price_subtotal_incl"]
+            )
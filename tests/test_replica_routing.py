@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+
+from ..tools import replica
+from .common import PosMultiCurrencyCommon
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencyReplicaRouting(PosMultiCurrencyCommon):
+    """
+    The staleness guard is exercised by faking the replication delay.
+    To run against a real replica, start the server with
+    ``--db_replica_host``/``--db_replica_port`` pointing to a hot standby
+    of the test database.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.open_new_session()
+        self._create_multi_currency_orders(self.session, 3)
+        self.env.flush_all()
+
+    def _patch_lag(self, lag):
+        return patch.object(replica, "get_replica_lag", return_value=lag)
+
+    def test_primary_is_always_fresh(self):
+        self.assertIsNone(replica.get_replica_lag(self.env.cr))
+        self.assertTrue(replica.is_fresh(self.env, session_ids=[self.session.id]))
+
+    def test_staleness_guard(self):
+        self.env["ir.config_parameter"].sudo().set_param(replica.PARAM_MAX_LAG, "30")
+        with self._patch_lag(0.0):
+            self.assertTrue(replica.is_fresh(self.env, date_to=fields.Datetime.now()))
+            # Open (or not yet replicated as closed) sessions need the primary
+            self.assertFalse(replica.is_fresh(self.env, session_ids=[self.session.id]))
+        with self._patch_lag(120.0):
+            self.assertFalse(replica.is_fresh(self.env))
+        with self._patch_lag(10.0):
+            self.assertTrue(replica.is_fresh(
+                self.env, date_to=fields.Datetime.now() - timedelta(minutes=1)
+            ))
+            self.assertFalse(replica.is_fresh(self.env, date_to=fields.Datetime.now()))
+
+    def test_closed_session_is_fresh(self):
+        self.session.write({"state": "closed"})
+        self.env.flush_all()
+        with self._patch_lag(0.0):
+            self.assertTrue(replica.is_fresh(self.env, session_ids=[self.session.id]))
+
+    def test_statistics_fall_back_to_primary(self):
+        expected = self.config.get_multi_currency_statistics(self.session.id)
+        with self._patch_lag(120.0):
+            result = self.config.get_multi_currency_statistics(self.session.id)
+        self.assertEqual(result, expected)
+        self.assertEqual(len(result["statistics"]), len(self.foreign_currencies))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import PosMultiCurrencyCommon
+
+
+class PosMultiCurrencyClosingCommon(PosMultiCurrencyCommon):
+
+    def _assert_multi_currency_closing(self, order_count):
+        """
+        Close a session of ``order_count`` foreign orders, half on a split
+        method and half on a combined one that also takes local currency,
+        and check its per-currency receivable lines.
+        """
+        session = self.open_new_session()
+        half = order_count // 2
+        ui_orders = self._prepare_multi_currency_ui_orders(half, payment_method=self.bank_split_pm1)
+        # A combined method collecting every foreign currency and the local one
+        ui_orders += self._prepare_multi_currency_ui_orders(half, payment_method=self.bank_pm1)
+        ui_orders += [
+            self.create_ui_order_data([(self.mc_product, 1)], payments=[(self.bank_pm1, 10.0)])
+            for _index in range(len(self.foreign_currencies))
+        ]
+        self.env["pos.order"].sync_from_ui(ui_orders)
+        self._reset_caches()
+
+        with self._record_timing("pos.session currency move groups", order_count), \
+                self.assertQueryCount(5):
+            groups = session._get_multi_currency_combine_groups()
+        self.assertEqual(len(groups), len(self.foreign_currencies))
+
+        with self._record_timing("pos.session.close_session_from_ui", order_count):
+            result = session.close_session_from_ui()
+        self.assertTrue(result["successful"])
+        foreign_lines = session.move_id.line_ids.filtered(
+            lambda line: line.currency_id in self.foreign_currencies
+        )
+        payments = session.order_ids.payment_ids
+        # Split payments keep the standard label, combined currency lines
+        # carry the rate in theirs
+        combined_lines = foreign_lines.filtered(lambda line: " @ " in line.name)
+        for method, lines in (
+            (self.bank_split_pm1, foreign_lines - combined_lines),
+            (self.bank_pm1, combined_lines),
+        ):
+            for currency in self.foreign_currencies:
+                with self.subTest(method=method.name, currency=currency.name):
+                    currency_lines = lines.filtered(lambda line: line.currency_id == currency)
+                    if method == self.bank_pm1:
+                        self.assertEqual(len(currency_lines), 1)
+                    self.assertAlmostEqual(
+                        sum(currency_lines.mapped("amount_currency")),
+                        sum(payments.filtered(
+                            lambda p: p.payment_method_id == method and p.payment_currency_id == currency
+                        ).mapped("payment_currency_amount")),
+                        2,
+                    )
+        self.assertTrue(all(
+            foreign_lines.filtered(lambda line: line.account_id.reconcile).mapped("reconciled")
+        ))
+
+
+@tagged("post_install", "-at_install")
+class TestMultiCurrencySessionClosing(PosMultiCurrencyClosingCommon):
+
+    def test_per_currency_lines(self):
+        self._assert_multi_currency_closing(30)
+
+
+@tagged("post_install", "-at_install", "-standard", "pos_multi_benchmark")
+class TestMultiCurrencySessionClosingBenchmark(PosMultiCurrencyClosingCommon):
+    """Run with ``--test-tags pos_multi_benchmark``."""
+
+    def test_session_closing(self):
+        """Closing a 5,000-order session."""
+        self._assert_multi_currency_closing(5000)
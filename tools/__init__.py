@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+from . import instrumentation
+from . import replica
+from . import rate_import
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Lightweight instrumentation of the multi-currency hot paths.
+
+Decorated methods record, per database, metric and POS config: call count,
+SQL query count and a latency histogram.  Instrumentation is driven by the
+``pos_multi.instrumentation`` system parameter, holding the sample rate:
+empty or ``0`` disables it, ``1`` measures every call and e.g. ``0.1``
+one call out of ten.  When disabled the only cost is one ormcache lookup
+per call (see ``ir.config_parameter._get_pos_multi_sample_rate``).
+
+Metrics live in process memory: with several workers, every worker keeps
+and reports its own counters, tagged with its ``worker_pid``.  Each measured call is also logged as one
+JSON line on the ``odoo.addons.pos_multi.metrics`` logger (DEBUG level,
+INFO when slower than ``pos_multi.instrumentation_slow_ms``).
+"""
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+_logger = logging.getLogger("odoo.addons.pos_multi.metrics")
+
+PARAM_SAMPLE_RATE = "pos_multi.instrumentation"
+PARAM_SLOW_MS = "pos_multi.instrumentation_slow_ms"
+
+# Upper bounds (ms) of the latency histogram buckets; the last is open-ended.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_lock = threading.Lock()
+_metrics = {}  # {dbname: {(metric, config_id): {...}}}
+
+
+def get_sample_rate(env):
+    return env["ir.config_parameter"]._get_pos_multi_sample_rate()
+
+
+def parse_sample_rate(value):
+    if not value:
+        return 0.0
+    try:
+        return min(max(float(value), 0.0), 1.0)
+    except ValueError:
+        return 0.0
+
+
+def _resolve_config_id(records):
+    """Best-effort POS config of the measured records (0 when mixed or unknown)."""
+    if records._name == "pos.config":
+        configs = records
+    elif records._name == "pos.session":
+        configs = records.config_id
+    elif records._name == "pos.order":
+        configs = records.session_id.config_id
+    else:
+        return 0
+    return configs.id if len(configs) == 1 else 0
+
+
+def _new_entry():
+    return {
+        "calls": 0,
+        "queries": 0,
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+        "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+    }
+
+
+def _record(dbname, metric, config_id, elapsed_ms, queries):
+    bucket = len(LATENCY_BUCKETS_MS)
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if elapsed_ms <= bound:
+            bucket = index
+            break
+    with _lock:
+        entry = _metrics.setdefault(dbname, {}).setdefault(
+            (metric, config_id), _new_entry()
+        )
+        entry["calls"] += 1
+        entry["queries"] += queries
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["histogram"][bucket] += 1
+
+
+def instrumented(metric):
+    """
+    Decorate a model method so its calls are measured under ``metric``.
+
+    Must be the innermost decorator (right above ``def``) so that
+    ``api.model`` / ``api.depends`` still see the wrapped function.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            sample_rate = get_sample_rate(self.env)
+            if not sample_rate or (sample_rate < 1.0 and random.random() >= sample_rate):
+                return method(self, *args, **kwargs)
+
+            cr = self.env.cr
+            queries_before = cr.sql_log_count
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000.0
+                queries = cr.sql_log_count - queries_before
+                config_id = _resolve_config_id(self)
+                _record(cr.dbname, metric, config_id, elapsed_ms, queries)
+                _log_call(self.env, metric, config_id, len(self), elapsed_ms, queries)
+        return wrapper
+    return decorator
+
+
+def _log_call(env, metric, config_id, record_count, elapsed_ms, queries):
+    slow_ms = env["ir.config_parameter"].sudo().get_param(PARAM_SLOW_MS)
+    try:
+        is_slow = bool(slow_ms) and elapsed_ms >= float(slow_ms)
+    except ValueError:
+        is_slow = False
+    level = logging.INFO if is_slow else logging.DEBUG
+    if not _logger.isEnabledFor(level):
+        return
+    _logger.log(level, json.dumps({
+        "metric": metric,
+        "db": env.cr.dbname,
+        "config_id": config_id,
+        "uid": env.uid,
+        "records": record_count,
+        "elapsed_ms": round(elapsed_ms, 3),
+        "queries": queries,
+        "slow": is_slow,
+    }))
+
+
+def get_metrics(dbname, config_ids=None, reset=False):
+    """
+    Return this worker's metrics for ``dbname``: other workers keep their
+    own, and ``reset`` only clears this worker's.
+
+    Returns:
+        dict: {"worker_pid": int, "buckets_ms": [...], "metrics": [{metric,
+               config_id, calls, queries, total_ms, avg_ms, max_ms,
+               avg_queries, histogram}, ...]}
+    """
+    with _lock:
+        entries = _metrics.get(dbname, {})
+        snapshot = [
+            (key, dict(entry, histogram=list(entry["histogram"])))
+            for key, entry in entries.items()
+            if not config_ids or key[1] in config_ids
+        ]
+        if reset:
+            for key, _entry in snapshot:
+                entries.pop(key, None)
+
+    metrics = []
+    for (metric, config_id), entry in sorted(snapshot, key=lambda item: item[0]):
+        calls = entry["calls"] or 1
+        metrics.append({
+            "metric": metric,
+            "config_id": config_id,
+            "calls": entry["calls"],
+            "queries": entry["queries"],
+            "total_ms": round(entry["total_ms"], 3),
+            "avg_ms": round(entry["total_ms"] / calls, 3),
+            "max_ms": round(entry["max_ms"], 3),
+            "avg_queries": round(entry["queries"] / calls, 2),
+            "histogram": entry["histogram"],
+        })
+    return {
+        "worker_pid": os.getpid(),
+        "buckets_ms": list(LATENCY_BUCKETS_MS),
+        "metrics": metrics,
+    }
@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-terminal load test of the multi-currency endpoints.
+
+Simulates N concurrent POS clients, each in its own thread, calling the
+multi-currency endpoints:
+
+* ``rates``: ``pos.config.get_multi_currency_rates`` (/pos/multi_currency/rates),
+  polled every ``polling_interval`` seconds;
+* ``statistics``: ``pos.config.get_multi_currency_statistics``
+  (/pos/multi_currency/statistics), every ``statistics_interval`` seconds;
+* ``sync``: ``pos.order.sync_from_ui`` with one order paid in a foreign
+  currency picked from ``currency_mix``, ``order_rate`` times per minute.
+
+By default the clients call the model methods behind these endpoints
+in-process, each call in its own transaction on its own cursor.  The
+threads share one interpreter, so Python work is serialized by the GIL:
+this measures the database side (queries, lock contention), not how many
+terminals a worker pool can serve.  For that, pass ``base_url`` (plus
+``login`` / ``password``) to drive the real HTTP routes of a running
+multi-worker server; every client then has its own HTTP session and
+query counts are not available.
+
+Calls are committed: run it on a disposable copy of the database.  A
+sampler thread watches ``pg_stat_activity`` for backends waiting on locks
+and, in-process, attributes them to the endpoint running on that backend.
+Failed calls are logged at WARNING, with the traceback of the first
+failure of each endpoint.
+
+Usage, from ``odoo-bin shell -d <db>``::
+
+    from odoo.addons.pos_multi.tools.load_test import run_load_test, format_report
+    config = env["pos.config"].browse(1)   # needs an open session
+    print(format_report(run_load_test(env, config, clients=20, duration=120)))
+    # against the server running on this database, e.g. with --workers=8
+    print(format_report(run_load_test(
+        env, config, clients=50, duration=120,
+        base_url="http://localhost:8069", login="pos_user", password="...",
+    )))
+"""
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+
+import requests
+
+from odoo import api, fields
+from odoo.exceptions import UserError
+from odoo.modules.registry import Registry
+
+_logger = logging.getLogger(__name__)
+
+ENDPOINTS = ("rates", "statistics", "sync")
+LOCK_SAMPLE_INTERVAL = 0.2  # seconds
+HTTP_TIMEOUT = 60  # seconds
+
+
+def percentile(values, rank):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    index = max(0, math.ceil(rank / 100.0 * len(values)) - 1)
+    return values[index]
+
+
+class _Recorder:
+    """Thread-safe collection of call measurements and lock-wait samples."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {endpoint: [] for endpoint in ENDPOINTS}  # (ms, queries)
+        self.errors = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.lock_wait_samples = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.waiting_counts = []
+        self.active_backends = {}  # {backend pid: endpoint}
+
+    def record(self, endpoint, elapsed_ms, queries):
+        with self.lock:
+            self.calls[endpoint].append((elapsed_ms, queries))
+
+    def record_error(self, endpoint):
+        """Count a failed call; return whether it is the endpoint's first failure."""
+        with self.lock:
+            self.errors[endpoint] += 1
+            return self.errors[endpoint] == 1
+
+    def record_waiting(self, pids):
+        with self.lock:
+            self.waiting_counts.append(len(pids))
+            for pid in pids:
+                endpoint = self.active_backends.get(pid)
+                if endpoint:
+                    self.lock_wait_samples[endpoint] += 1
+
+
+class _SimulatedClient(threading.Thread):
+    """One POS terminal issuing rate polls, statistics calls and order syncs."""
+
+    def __init__(self, harness, index):
+        super().__init__(name=f"pos_multi_load_client_{index}", daemon=True)
+        self.harness = harness
+        self.random = random.Random(index)
+        self.http_session = None  # requests.Session, in HTTP mode
+
+    def run(self):
+        harness = self.harness
+        # Spread the first calls so clients do not all fire together
+        now = time.monotonic()
+        next_call = {
+            "rates": now + self.random.uniform(0, harness.polling_interval),
+            "statistics": now + self.random.uniform(0, harness.statistics_interval),
+            "sync": now + self.random.expovariate(harness.order_rate / 60.0)
+            if harness.order_rate else math.inf,
+        }
+        while not harness.stop_event.is_set():
+            endpoint = min(next_call, key=next_call.get)
+            delay = next_call[endpoint] - time.monotonic()
+            if delay > 0 and harness.stop_event.wait(delay):
+                break
+            harness.call(endpoint, self)
+            if endpoint == "rates":
+                next_call[endpoint] = time.monotonic() + harness.polling_interval
+            elif endpoint == "statistics":
+                next_call[endpoint] = time.monotonic() + harness.statistics_interval
+            else:
+                next_call[endpoint] = time.monotonic() + self.random.expovariate(
+                    harness.order_rate / 60.0
+                )
+
+
+class LoadTest:
+    """
+    Drive ``clients`` simulated terminals against one POS config.
+
+    Args:
+        env: Environment giving the database, user and config.
+        config: pos.config record with an open session.
+        clients (int): Number of simulated terminals.
+        duration (float): Test duration in seconds.
+        order_rate (float): Orders synced per minute and per client.
+        polling_interval (float): Seconds between rate polls of a client.
+        statistics_interval (float): Seconds between statistics calls of a client.
+        currency_mix (dict): {currency_id: weight} of the payment currencies;
+            defaults to the config's foreign currencies, evenly.
+        base_url (str): URL of a running server whose HTTP routes are
+            called instead of the model methods.
+        login (str): User the clients log in as, in HTTP mode.
+        password (str): Password of ``login``.
+    """
+
+    def __init__(self, env, config, clients=10, duration=60.0, order_rate=6.0,
+                 polling_interval=30.0, statistics_interval=60.0, currency_mix=None,
+                 base_url=None, login=None, password=None):
+        config.ensure_one()
+        session = config.current_session_id
+        if not session:
+            raise UserError("The load test needs an open session on %s." % config.name)
+        currencies = config.multi_currency_ids - config.currency_id
+        currency_mix = currency_mix or {currency.id: 1.0 for currency in currencies}
+        if not currency_mix:
+            raise UserError("The load test needs at least one foreign currency on %s." % config.name)
+        product = env["product.product"].search([
+            ("available_in_pos", "=", True),
+            ("list_price", ">", 0),
+        ], limit=1)
+        payment_method = session.payment_method_ids[:1]
+        if not product or not payment_method:
+            raise UserError("The load test needs a POS product and a payment method.")
+        if base_url and not (login and password):
+            raise UserError("The HTTP load test needs a login and a password.")
+
+        self.dbname = env.cr.dbname
+        self.uid = env.uid
+        self.context = dict(env.context)
+        self.config_id = config.id
+        self.config_currency_id = config.currency_id.id
+        self.session_id = session.id
+        self.product_id = product.id
+        self.price = product.lst_price
+        self.payment_method_id = payment_method.id
+        self.clients = clients
+        self.duration = duration
+        self.order_rate = order_rate
+        self.polling_interval = polling_interval
+        self.statistics_interval = statistics_interval
+        self.currency_ids = list(currency_mix)
+        self.currency_weights = list(currency_mix.values())
+        self.rates = config.get_multi_currency_rates()["rates"]
+        self.base_url = base_url and base_url.rstrip("/")
+        self.login = login
+        self.password = password
+        self.recorder = _Recorder()
+        self.stop_event = threading.Event()
+
+    # ─── Calls ──────────────────────────────────────────────────────
+
+    def call(self, endpoint, client):
+        try:
+            if self.base_url:
+                self._call_http(endpoint, client)
+            else:
+                self._call_local(endpoint, client.random)
+        except Exception:  # noqa: BLE001 - failures are part of the measurement
+            first = self.recorder.record_error(endpoint)
+            _logger.warning("Load test %s call failed", endpoint, exc_info=first)
+
+    def _call_local(self, endpoint, rng):
+        recorder = self.recorder
+        with Registry(self.dbname).cursor() as cr:
+            pid = cr._cnx.get_backend_pid()
+            with recorder.lock:
+                recorder.active_backends[pid] = endpoint
+            try:
+                env = api.Environment(cr, self.uid, self.context)
+                queries_before = cr.sql_log_count
+                start = time.perf_counter()
+                getattr(self, f"_call_{endpoint}")(env, rng)
+                cr.commit()
+                elapsed_ms = (time.perf_counter() - start) * 1000.0
+                recorder.record(endpoint, elapsed_ms, cr.sql_log_count - queries_before)
+            finally:
+                with recorder.lock:
+                    recorder.active_backends.pop(pid, None)
+
+    def _call_rates(self, env, rng):
+        env["pos.config"].browse(self.config_id).get_multi_currency_rates()
+
+    def _call_statistics(self, env, rng):
+        env["pos.config"].browse(self.config_id).get_multi_currency_statistics(self.session_id)
+
+    def _call_sync(self, env, rng):
+        env["pos.order"].sync_from_ui([self._prepare_order(rng)])
+
+    # ─── HTTP calls ─────────────────────────────────────────────────
+
+    def _call_http(self, endpoint, client):
+        if client.http_session is None:
+            http_session = requests.Session()
+            self._json_rpc(http_session, "/web/session/authenticate", {
+                "db": self.dbname,
+                "login": self.login,
+                "password": self.password,
+            })
+            client.http_session = http_session
+        path, params = getattr(self, f"_http_{endpoint}")(client.random)
+        start = time.perf_counter()
+        self._json_rpc(client.http_session, path, params)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        self.recorder.record(endpoint, elapsed_ms, None)
+
+    def _json_rpc(self, http_session, path, params):
+        response = http_session.post(
+            self.base_url + path,
+            json={"jsonrpc": "2.0", "method": "call", "params": params},
+            timeout=HTTP_TIMEOUT,
+        )
+        response.raise_for_status()
+        payload = response.json()
+        if "error" in payload:
+            error = payload["error"]
+            raise RuntimeError(
+                "%s: %s" % (path, error.get("data", {}).get("debug") or error.get("message"))
+            )
+        result = payload.get("result")
+        # The multi-currency routes answer {"error": ...} for bad requests
+        if isinstance(result, dict) and result.get("error"):
+            raise RuntimeError("%s: %s" % (path, result["error"]))
+        return result
+
+    def _http_rates(self, rng):
+        return "/pos/multi_currency/rates", {"config_id": self.config_id}
+
+    def _http_statistics(self, rng):
+        return "/pos/multi_currency/statistics", {"session_id": self.session_id}
+
+    def _http_sync(self, rng):
+        return "/web/dataset/call_kw/pos.order/sync_from_ui", {
+            "model": "pos.order",
+            "method": "sync_from_ui",
+            "args": [[self._prepare_order(rng)]],
+            "kwargs": {},
+        }
+
+    def _prepare_order(self, rng):
+        """Minimal order payload, as sent by the POS, paid in one foreign currency."""
+        currency_id = rng.choices(self.currency_ids, self.currency_weights)[0]
+        base_rate = self.rates.get(self.config_currency_id, 1.0)
+        rate = self.rates.get(currency_id, 1.0) / base_rate
+        qty = rng.randint(1, 5)
+        amount = round(self.price * qty, 2)
+        now = fields.Datetime.to_string(fields.Datetime.now())
+        order_uuid = str(uuid.uuid4())
+        return {
+            "uuid": order_uuid,
+            "name": f"Load test {order_uuid[:8]}",
+            "session_id": self.session_id,
+            "date_order": now,
+            "state": "paid",
+            "amount_total": amount,
+            "amount_tax": 0.0,
+            "amount_paid": amount,
+            "amount_return": 0.0,
+            "lines": [[0, 0, {
+                "product_id": self.product_id,
+                "qty": qty,
+                "price_unit": self.price,
+                "price_subtotal": amount,
+                "price_subtotal_incl": amount,
+                "discount": 0.0,
+                "tax_ids": [[6, 0, []]],
+            }]],
+            "payment_ids": [[0, 0, {
+                "amount": amount,
+                "payment_date": now,
+                "payment_method_id": self.payment_method_id,
+                "payment_currency_id": currency_id,
+                "payment_currency_amount": round(amount * rate, 2),
+                "exchange_rate": rate,
+                "rate_manually_edited": False,
+            }]],
+        }
+
+    # ─── Lock wait sampling ─────────────────────────────────────────
+
+    def _sample_lock_waits(self):
+        # One short-lived cursor per sample, so the sampler never holds a
+        # connection (or, in tests, the shared test cursor) for the run
+        while not self.stop_event.wait(LOCK_SAMPLE_INTERVAL):
+            with Registry(self.dbname).cursor() as cr:
+                cr.execute(
+                    """
+                    SELECT pid
+                      FROM pg_stat_activity
+                     WHERE datname = current_database()
+                       AND wait_event_type = 'Lock'
+                    """
+                )
+                self.recorder.record_waiting([pid for (pid,) in cr.fetchall()])
+
+    # ─── Run ────────────────────────────────────────────────────────
+
+    def run(self):
+        sampler = threading.Thread(
+            target=self._sample_lock_waits, name="pos_multi_load_sampler", daemon=True
+        )
+        clients = [_SimulatedClient(self, index) for index in range(self.clients)]
+        start = time.monotonic()
+        sampler.start()
+        for client in clients:
+            client.start()
+        self.stop_event.wait(self.duration)
+        self.stop_event.set()
+        for client in clients:
+            client.join()
+        sampler.join()
+        return self._report(time.monotonic() - start)
+
+    def _report(self, elapsed):
+        recorder = self.recorder
+        endpoints = {}
+        for endpoint in ENDPOINTS:
+            calls = recorder.calls[endpoint]
+            latencies = sorted(ms for ms, _queries in calls)
+            endpoints[endpoint] = {
+                "calls": len(calls),
+                "errors": recorder.errors[endpoint],
+                "throughput": len(calls) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": latencies[-1] if latencies else 0.0,
+                # Not measured in HTTP mode
+                "avg_queries": (
+                    None if self.base_url
+                    else (sum(queries for _ms, queries in calls) / len(calls) if calls else 0.0)
+                ),
+                # Approximate time spent waiting on locks
+                "lock_wait_s": recorder.lock_wait_samples[endpoint] * LOCK_SAMPLE_INTERVAL,
+            }
+        waiting = recorder.waiting_counts
+        return {
+            "clients": self.clients,
+            "mode": "http" if self.base_url else "local",
+            "duration_s": elapsed,
+            "endpoints": endpoints,
+            "lock_waits": {
+                "samples": len(waiting),
+                "samples_with_waiters": sum(1 for count in waiting if count),
+                "max_waiting_backends": max(waiting, default=0),
+            },
+        }
+
+
+def run_load_test(env, config, **kwargs):
+    """Run a load test (see ``LoadTest`` for the parameters) and return its report."""
+    return LoadTest(env, config, **kwargs).run()
+
+
+def format_report(report):
+    """Render a ``run_load_test`` report as a text table."""
+    lines = [
+        "pos_multi load test (%s): %d clients, %.1fs" % (
+            report["mode"], report["clients"], report["duration_s"],
+        ),
+        "%-11s %7s %6s %8s %9s %9s %9s %9s %8s %9s" % (
+            "endpoint", "calls", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms",
+            "max ms", "queries", "lock s",
+        ),
+    ]
+    for endpoint, stats in report["endpoints"].items():
+        queries = stats["avg_queries"]
+        lines.append("%-11s %7d %6d %8.2f %9.1f %9.1f %9.1f %9.1f %8s %9.1f" % (
+            endpoint, stats["calls"], stats["errors"], stats["throughput"],
+            stats["p50_ms"], stats["p95_ms"], stats["p99_ms"], stats["max_ms"],
+            "-" if queries is None else "%.1f" % queries, stats["lock_wait_s"],
+        ))
+    lock_waits = report["lock_waits"]
+    lines.append(
+        "lock waits: %d/%d samples with waiting backends, max %d at once" % (
+            lock_waits["samples_with_waiters"], lock_waits["samples"],
+            lock_waits["max_waiting_backends"],
+        )
+    )
+    return "\n".join(lines)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Parsing of exchange-rate files for the bulk rate importer
+(``res.currency.rate._pos_multi_bulk_import``).
+
+Two formats are accepted, both with one rate per currency and day:
+
+* CSV with a header row holding ``currency`` (ISO code), ``date``
+  (YYYY-MM-DD), ``rate`` and optionally ``company_id``;
+* JSON: a list of objects with the same keys, or ``{"rates": [...]}``.
+
+``rate`` follows ``res.currency.rate``: units of the currency for one unit
+of the company currency.  An empty ``company_id`` means the importer's
+default company; rates of a branch are stored on its root company.
+"""
+import csv
+import io
+import json
+
+from odoo import fields
+
+FORMATS = ("csv", "json")
+
+
+class RateFileError(ValueError):
+    """The file cannot be read at all (unknown format, missing columns)."""
+
+
+def guess_format(filename):
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension not in FORMATS:
+        raise RateFileError(f"Unsupported rate file {filename!r}: expected .csv or .json")
+    return extension
+
+
+def _iter_records(content, file_format):
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    if file_format == "csv":
+        reader = csv.DictReader(io.StringIO(content))
+        missing = {"currency", "date", "rate"} - set(reader.fieldnames or ())
+        if missing:
+            raise RateFileError(f"Missing CSV columns: {', '.join(sorted(missing))}")
+        yield from reader
+    elif file_format == "json":
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get("rates")
+        if not isinstance(data, list):
+            raise RateFileError('Expected a JSON list of rates or {"rates": [...]}')
+        yield from data
+    else:
+        raise RateFileError(f"Unsupported rate file format {file_format!r}")
+
+
+def iter_rate_rows(content, file_format):
+    """
+    Yield the rows of a rate file as ``(line, currency_code, date, rate,
+    company_id)`` tuples, with ``line`` the 1-based record number and
+    ``company_id`` None when not given.
+
+    Raises:
+        RateFileError: The file itself cannot be read.
+        ValueError: A record is invalid; the message names its line.
+    """
+    for line, record in enumerate(_iter_records(content, file_format), start=1):
+        try:
+            code = str(record["currency"]).strip().upper()
+            date = fields.Date.to_date(str(record["date"]).strip())
+            rate = float(record["rate"])
+            company_id = record.get("company_id")
+            company_id = int(company_id) if company_id not in (None, "") else None
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid rate on line {line}: {e}") from e
+        if not code or not date or rate <= 0:
+            raise ValueError(f"Invalid rate on line {line}: {record!r}")
+        yield line, code, date, rate, company_id
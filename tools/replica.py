@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Routing of the read-only multi-currency reporting paths to a replica.
+
+Odoo sends read-only requests (routes declared with ``readonly=True`` and
+methods decorated with ``api.readonly``) to the replica configured with
+``--db_replica_host`` / ``--db_replica_port``.  It falls back to the
+primary when the replica cannot be reached or when the request tries to
+write.  Without a configured replica, those requests run on the primary
+as before.
+
+The replica is asynchronous, so reporting paths also go through a
+staleness guard (``reporting_env``).  A read is answered from the replica
+only if the replica lags less than ``pos_multi.replica_max_lag`` seconds
+(system parameter, default 60), already has the requested date range,
+and already sees the requested sessions as closed.  Otherwise it runs on
+a primary cursor.  Open sessions always read from the primary, so a
+terminal sees the orders it just synced.
+"""
+import logging
+import math
+from contextlib import contextmanager
+from datetime import timedelta
+
+from odoo import fields
+
+_logger = logging.getLogger(__name__)
+
+PARAM_MAX_LAG = "pos_multi.replica_max_lag"
+DEFAULT_MAX_LAG = 60.0  # seconds
+
+
+def get_max_lag(env):
+    value = env["ir.config_parameter"].sudo().get_param(PARAM_MAX_LAG)
+    if not value:
+        return DEFAULT_MAX_LAG
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return DEFAULT_MAX_LAG
+
+
+def get_replica_lag(cr):
+    """
+    Replication delay of the server ``cr`` is connected to.
+
+    Returns:
+        float: Seconds behind the primary (0.0 when all received WAL is
+               replayed), or None when ``cr`` is on the primary.
+    """
+    cr.execute(
+        """
+        SELECT pg_is_in_recovery(),
+               pg_last_wal_receive_lsn() IS NOT DISTINCT FROM pg_last_wal_replay_lsn(),
+               EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp())
+        """
+    )
+    in_recovery, caught_up, lag = cr.fetchone()
+    if not in_recovery:
+        return None
+    if caught_up:
+        return 0.0
+    return float(lag) if lag is not None else math.inf
+
+
+def is_fresh(env, session_ids=None, date_to=None):
+    """
+    Staleness guard: whether ``env.cr`` can answer a reporting read over
+    ``session_ids`` and/or payments up to ``date_to``.  Always True on the
+    primary.
+    """
+    lag = get_replica_lag(env.cr)
+    if lag is None:
+        return True
+    if lag > get_max_lag(env):
+        return False
+    if date_to and lag and (
+        fields.Datetime.now() - timedelta(seconds=lag) < fields.Datetime.to_datetime(date_to)
+    ):
+        return False
+    if session_ids:
+        session_ids = list(set(session_ids))
+        env.cr.execute(
+            "SELECT COUNT(*) FROM pos_session WHERE id = ANY(%s) AND state = 'closed'",
+            [session_ids],
+        )
+        if env.cr.fetchone()[0] != len(session_ids):
+            return False
+    return True
+
+
+@contextmanager
+def reporting_env(env, session_ids=None, date_to=None):
+    """
+    Yield ``env`` when its cursor passes the staleness guard, else an
+    environment on a new primary cursor.
+    """
+    if is_fresh(env, session_ids=session_ids, date_to=date_to):
+        yield env
+        return
+    _logger.debug("Replica too stale for multi-currency reporting, reading from the primary")
+    with env.registry.cursor() as cr:
+        yield env(cr=cr)
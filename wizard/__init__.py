@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+from . import pos_multi_currency_rate_import
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import base64
+
+from odoo import models, fields
+from odoo.exceptions import UserError
+
+from ..tools import rate_import
+
+
+class PosMultiCurrencyRateImport(models.TransientModel):
+    """
+    Upload a CSV or JSON rate file and load it into res.currency.rate
+    with the bulk importer (see ``res.currency.rate._pos_multi_bulk_import``).
+    """
+    _name = "pos.multi.currency.rate.import"
+    _description = "POS Multi-Currency Rate Import"
+
+    file = fields.Binary(string="Rate File", required=True)
+    filename = fields.Char(string="File Name")
+    company_id = fields.Many2one(
+        "res.company",
+        string="Company",
+        default=lambda self: self.env.company,
+        help="Company of the rates without a company_id column. "
+             "Leave empty to import shared rates.",
+    )
+    state = fields.Selection(
+        [("draft", "Draft"), ("done", "Done")],
+        default="draft",
+    )
+    result = fields.Text(string="Result", readonly=True)
+
+    def action_import(self):
+        self.ensure_one()
+        # The importer writes with SQL: check the rights the ORM would
+        Rate = self.env["res.currency.rate"]
+        Rate.check_access("create")
+        Rate.check_access("write")
+        # ... and the companies its record rules would
+        allowed_company_ids = set(self.env.user.company_ids.ids)
+        if self.company_id and self.company_id.id not in allowed_company_ids:
+            raise UserError(f"You cannot import rates for {self.company_id.name}.")
+        try:
+            file_format = rate_import.guess_format(self.filename)
+            rows = rate_import.iter_rate_rows(base64.b64decode(self.file), file_format)
+            result = Rate._pos_multi_bulk_import(
+                self._check_rate_companies(rows, allowed_company_ids), company=self.company_id
+            )
+        except ValueError as e:
+            raise UserError(str(e)) from e
+
+        lines = [
+            f"{result['rows']} rates read: {result['inserted']} created, "
+            f"{result['updated']} updated, {result['unchanged']} unchanged.",
+        ]
+        if result["unknown_currencies"]:
+            lines.append(
+                "Skipped unknown currencies: %s" % ", ".join(result["unknown_currencies"])
+            )
+        self.write({"state": "done", "result": "\n".join(lines)})
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def _check_rate_companies(self, rows, allowed_company_ids):
+        """Pass the rows through, rejecting companies the user may not access."""
+        for row in rows:
+            line, _code, _date, _rate, company_id = row
+            if company_id is not None and company_id not in allowed_company_ids:
+                raise ValueError(f"Invalid rate on line {line}: you cannot import rates for company {company_id}")
+            yield row